@@ -0,0 +1,194 @@
+"""App factory: middlewares, routers and the startup/shutdown hooks.
+
+    uvicorn --factory app:create_app   (or uvicorn server:app)
+"""
+import logging
+import os
+import sys
+
+# FastAPI's OpenAPI models import email_validator only to type a contact email we
+# never set; hide it while FastAPI loads so the first address we validate loads it
+_hide_email_validator = "email_validator" not in sys.modules
+if _hide_email_validator:
+    sys.modules["email_validator"] = None
+import pymongo
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pymongo.errors import PyMongoError
+from starlette.middleware.cors import CORSMiddleware
+if _hide_email_validator:
+    del sys.modules["email_validator"]
+
+import archive
+import core
+import entry_caps
+import order_holds
+import payment_events
+from capture import TrafficCaptureMiddleware
+from compression import CompressionMiddleware
+from core import audit_writer, contact_writer, image_store, invalidation_bus
+from images import URL_PREFIX as MEDIA_PREFIX, ImmutableStaticFiles
+from logs import configure_logging, stop_logging
+from profiling import profiler
+from query_budget import track_queries, report_repeats
+from routers import admin, auth, competitions, content, orders, payments, queue
+from routers.competitions import refresh_search_index
+from routers.orders import hold_sweeper, reconcile_ticket_counts
+from routers.payments import payment_worker
+
+logger = logging.getLogger(__name__)
+
+class QueryBudgetMiddleware:
+    """With DB_QUERY_DEBUG, reports each request's database round-trips in X-DB-* headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not core.DB_QUERY_DEBUG:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_budget(message):
+            if message["type"] == "http.response.start":
+                extra = {name.lower().encode(): value.encode() for name, value in budget.headers().items()}
+                headers = [(n, v) for n, v in message.get("headers", []) if n.lower() not in extra]
+                message = {**message, "headers": headers + list(extra.items())}
+            await send(message)
+
+        with track_queries() as budget:
+            await self.app(scope, receive, send_with_budget)
+        report_repeats(budget, f"{scope['method']} {scope['path']}")
+
+class ProfilingMiddleware:
+    """Samples requests while an admin profiling session is active"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or profiler.session is None or not profiler.should_profile(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        # The sampler thread ends and saves the session once it is done
+        with profiler.sampling():
+            await self.app(scope, receive, send)
+
+class DbDeadlineMiddleware:
+    """Caps the database time of each request at REQUEST_DB_DEADLINE seconds"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not core.REQUEST_DB_DEADLINE:
+            await self.app(scope, receive, send)
+            return
+        # pymongo keeps the deadline in a context variable, which the endpoint inherits
+        with pymongo.timeout(core.REQUEST_DB_DEADLINE):
+            await self.app(scope, receive, send)
+
+async def mongo_error_handler(request: Request, exc: PyMongoError):
+    if not exc.timeout:
+        raise exc
+    logger.warning("Database deadline exceeded for %s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service temporarily busy, please try again"},
+        headers={"Retry-After": "1"}
+    )
+
+async def ensure_indexes():
+    db = core.db
+    await db.competitions.create_index("competition_id", unique=True)
+    await db.competitions.create_index([("is_visible", 1), ("category", 1), ("draw_date", 1)])
+    await db.competitions.create_index([("is_visible", 1), ("featured", 1), ("draw_date", 1)])
+    await db.competitions.create_index(
+        [("title", "text"), ("description", "text")],
+        weights={"title": 5, "description": 1},
+        name="competition_text"
+    )
+    await db.winners.create_index([("drawn_at", -1), ("winner_id", -1)])
+    await db.orders.create_index([("competition_id", 1), ("payment_status", 1)])
+    await db.orders.create_index("basket_id", sparse=True)
+    await db.orders.create_index("counter_pending", sparse=True)
+    await db.audit_log.create_index([("target", 1), ("at", -1)])
+    await payment_events.ensure_indexes(db)
+    await invalidation_bus.ensure_indexes(db)
+    await archive.ensure_indexes(db)
+    await entry_caps.ensure_indexes(db)
+    await order_holds.ensure_indexes(db)
+    await queue.waiting_room.ensure_indexes(db)
+
+async def startup():
+    try:
+        await ensure_indexes()
+        await reconcile_ticket_counts()
+    except Exception as e:
+        logger.error(f"Startup maintenance failed: {e}")
+    payment_worker.start(core.db)
+    hold_sweeper.start(core.db)
+    invalidation_bus.start(core.db)
+    contact_writer.start(core.db)
+    audit_writer.start(core.db)
+    try:
+        await refresh_search_index()
+    except Exception as e:
+        logger.error(f"Failed to build search index: {e}")
+
+async def shutdown_db_client():
+    await payment_worker.stop()
+    await hold_sweeper.stop()
+    await invalidation_bus.stop()
+    # Flush buffered writes before the client closes
+    await contact_writer.stop()
+    await audit_writer.stop()
+    core.client.close()
+    image_store.shutdown()
+    if core.traffic_capture is not None:
+        core.traffic_capture.stop()
+    stop_logging()
+
+def create_app() -> FastAPI:
+    configure_logging(core.LOG_LEVEL, core.LOG_FORMAT, core.LOG_POLICIES)
+    core.connect()
+    app = FastAPI(title="x67 Digital Competitions Platform")
+
+    app.add_middleware(QueryBudgetMiddleware)
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(DbDeadlineMiddleware)
+    app.add_exception_handler(PyMongoError, mongo_error_handler)
+
+    # Registration order is route precedence (e.g. /competitions/search before /competitions/{id})
+    for module in (auth, competitions, orders, queue, payments, admin, content):
+        app.include_router(module.router, prefix="/api")
+    # Resized upload variants; names carry a content digest, so they're cached for good
+    app.mount(MEDIA_PREFIX, ImmutableStaticFiles(directory=image_store.variants_dir, check_dir=False), name="media")
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if core.traffic_capture is not None:
+        app.add_middleware(
+            TrafficCaptureMiddleware,
+            writer=core.traffic_capture,
+            sample_rate=core.TRAFFIC_CAPTURE_SAMPLE_RATE,
+            max_body_bytes=core.TRAFFIC_CAPTURE_MAX_BODY_BYTES
+        )
+
+    # Outermost, so it compresses exactly the bytes that go on the wire
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')),
+        cache_bytes=int(os.environ.get('COMPRESSION_CACHE_BYTES', str(16 * 1024 * 1024)))
+    )
+
+    app.add_event_handler("startup", startup)
+    app.add_event_handler("shutdown", shutdown_db_client)
+    return app
@@ -0,0 +1,146 @@
+"""Move orders of long-finished competitions out of the hot ``orders`` collection.
+
+Competitions whose winner was drawn and whose draw_date is more than
+``--days`` old have all their orders moved into ``orders_archive``. Legacy
+ticket arrays are repacked on the way (see ``tickets``). Each batch is
+inserted into the archive and then deleted from ``orders``. Both steps key
+on ``_id``, so rerunning after a crash skips what was already copied and
+finishes the delete.
+
+Before any order moves, the competition's completed-order count and revenue
+are written to ``order_archive_totals``. Admin stats add these totals, so
+lifetime figures don't change when orders leave the hot collection.
+Archived orders are read-only. Read paths include them only when the caller
+asks (``include_archived``).
+
+    python -m archive [--days 30] [--batch-size 1000] [--dry-run]
+"""
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+import argparse
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from tickets import LEGACY_FIELD, PACK_FIELD, encode_tickets
+
+ARCHIVE_COLLECTION = "orders_archive"
+TOTALS_COLLECTION = "order_archive_totals"
+
+DUPLICATE_KEY = 11000
+
+
+async def ensure_indexes(db):
+    await db[ARCHIVE_COLLECTION].create_index([("user_id", 1), ("created_at", -1)])
+    await db[ARCHIVE_COLLECTION].create_index("competition_id")
+    await db[ARCHIVE_COLLECTION].create_index("created_at")
+
+
+async def find_orders(db, query: dict, sort: Optional[list] = None, limit: Optional[int] = None,
+                      include_archived: bool = False) -> List[dict]:
+    """Orders matching query, unioned with archived orders when asked"""
+    if not include_archived:
+        cursor = db.orders.find(query, {"_id": 0})
+        if sort:
+            cursor = cursor.sort(sort)
+        return await cursor.to_list(limit)
+    pipeline = [{"$match": query}, {"$unionWith": {"coll": ARCHIVE_COLLECTION, "pipeline": [{"$match": query}]}}]
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": {"_id": 0}})
+    return await db.orders.aggregate(pipeline).to_list(None)
+
+
+async def archived_totals(db) -> dict:
+    totals = await db[TOTALS_COLLECTION].aggregate([
+        {"$group": {"_id": None, "orders": {"$sum": "$orders"}, "revenue": {"$sum": "$revenue"}}}
+    ]).to_list(1)
+    return totals[0] if totals else {"orders": 0, "revenue": 0}
+
+
+def compact(order: dict) -> dict:
+    if LEGACY_FIELD in order:
+        order = {**order, PACK_FIELD: encode_tickets(order[LEGACY_FIELD])}
+        del order[LEGACY_FIELD]
+    return order
+
+
+async def record_totals(db, competition_id: str):
+    totals = await db.orders.aggregate([
+        {"$match": {"competition_id": competition_id, "payment_status": "completed"}},
+        {"$group": {"_id": None, "orders": {"$sum": 1}, "revenue": {"$sum": "$total_price"}}}
+    ]).to_list(1)
+    totals = totals[0] if totals else {"orders": 0, "revenue": 0}
+    # $setOnInsert: a resumed run must not recount from a partly emptied collection
+    await db[TOTALS_COLLECTION].update_one(
+        {"_id": competition_id},
+        {"$setOnInsert": {"orders": totals["orders"], "revenue": totals["revenue"],
+                          "archived_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+
+async def archive_competition(db, competition_id: str, batch_size: int) -> int:
+    await record_totals(db, competition_id)
+    # Orders still waiting on a ticket counter repair stay until reconcile clears them
+    query = {"competition_id": competition_id, "counter_pending": {"$exists": False}}
+    moved = 0
+    while True:
+        batch = await db.orders.find(query).sort("_id", 1).to_list(batch_size)
+        if not batch:
+            break
+        try:
+            await db[ARCHIVE_COLLECTION].insert_many([compact(order) for order in batch], ordered=False)
+        except BulkWriteError as e:
+            # Already copied by an interrupted run; anything else is a real failure
+            if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+        await db.orders.delete_many({"_id": {"$in": [order["_id"] for order in batch]}})
+        moved += len(batch)
+    if not await db.orders.find_one({"competition_id": competition_id}, {"_id": 1}):
+        await db.competitions.update_one(
+            {"competition_id": competition_id}, {"$set": {"orders_archived_at": datetime.now(timezone.utc)}}
+        )
+    return moved
+
+
+async def archivable_competitions(db, older_than: timedelta) -> List[str]:
+    cutoff = datetime.now(timezone.utc) - older_than
+    comps = await db.competitions.find(
+        {"winner_id": {"$nin": [None]}, "draw_date": {"$lt": cutoff}, "orders_archived_at": {"$exists": False}},
+        {"_id": 0, "competition_id": 1}
+    ).to_list(None)
+    return [c["competition_id"] for c in comps]
+
+
+async def archive_orders(db, older_than: timedelta, batch_size: int = 1000, dry_run: bool = False) -> dict:
+    moved = {}
+    for competition_id in await archivable_competitions(db, older_than):
+        if dry_run:
+            moved[competition_id] = await db.orders.count_documents({"competition_id": competition_id})
+        else:
+            moved[competition_id] = await archive_competition(db, competition_id, batch_size)
+        print(f"{'Would archive' if dry_run else 'Archived'} {moved[competition_id]} orders of {competition_id}")
+    return moved
+
+
+async def main():
+    from migrations import get_db
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    client, db = get_db()
+    try:
+        await ensure_indexes(db)
+        await archive_orders(db, timedelta(days=args.days), args.batch_size, args.dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
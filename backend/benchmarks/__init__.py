@@ -0,0 +1,68 @@
+"""Local performance benchmarks. Run from backend/, e.g. ``python -m benchmarks.basket``.
+
+They drive ``server:app`` in-process and need a disposable MongoDB at
+BENCH_MONGO_URL (default mongodb://localhost:27017); the database named by
+BENCH_DB_NAME is dropped before each run. Benchmarks that take
+``--backend fake`` can run against an in-memory stand-in instead (see
+``benchmarks.fake_mongo``).
+"""
+import os
+import statistics
+import time
+from contextlib import asynccontextmanager
+
+BENCH_MONGO_URL = os.environ.get("BENCH_MONGO_URL", "mongodb://localhost:27017")
+BENCH_DB_NAME = os.environ.get("BENCH_DB_NAME", "x67_digital_bench")
+
+# Must happen before server is imported so backend/.env can't point us at a real database
+os.environ["MONGO_URL"] = BENCH_MONGO_URL
+os.environ["DB_NAME"] = BENCH_DB_NAME
+
+
+@asynccontextmanager
+async def bench_client(backend: str = "mongo"):
+    """ASGI client for server:app against a freshly dropped benchmark database, plus ``core``
+
+    backend="fake" swaps the Motor client for an empty in-memory one.
+    """
+    import httpx
+    import core
+    import server
+    from routers import orders
+
+    if backend == "fake":
+        from benchmarks.fake_mongo import fake_client
+
+        core.client = fake_client()
+        core.db = core.client[BENCH_DB_NAME]
+        orders._transactions_supported = None
+    await core.client.drop_database(BENCH_DB_NAME)
+    core.local_cache.clear()
+    core.send_email = _no_email
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        yield core, client
+    await core.client.drop_database(BENCH_DB_NAME)
+
+
+async def _no_email(to, subject, html):
+    return None
+
+
+def summarize(samples_ms, digits=3):
+    ordered = sorted(samples_ms)
+    return {
+        "n": len(ordered),
+        "median_ms": round(statistics.median(ordered), digits),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], digits),
+        "mean_ms": round(statistics.fmean(ordered), digits),
+    }
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.ms = (time.perf_counter() - self.start) * 1000
@@ -0,0 +1,78 @@
+"""Basket checkout vs. one purchase + confirm per competition.
+
+    python -m benchmarks.basket [--competitions 5] [--rounds 50]
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone, timedelta
+
+from benchmarks import Timer, bench_client, summarize
+from security import create_token
+
+
+async def seed(core, competitions: int):
+    draw_date = datetime.now(timezone.utc) + timedelta(days=30)
+    await core.db.competitions.insert_many([{
+        "competition_id": f"comp_bench_{i}",
+        "title": f"Bench competition {i}",
+        "description": "Benchmark",
+        "category": "cash",
+        "prize_value": 1000,
+        "ticket_price": 1.0,
+        "total_tickets": 100000,
+        "tickets_sold": 0,
+        "draw_date": draw_date,
+        "image_url": "https://example.com/bench.jpg",
+        "featured": False,
+        "auto_draw": True,
+        "is_visible": True,
+        "created_at": datetime.now(timezone.utc)
+    } for i in range(competitions)])
+    user_id = "user_bench"
+    await core.db.users.insert_one({
+        "user_id": user_id, "email": "bench@example.com", "full_name": "Bench",
+        "role": "user", "email_verified": True, "created_at": datetime.now(timezone.utc).isoformat()
+    })
+    return {"Authorization": f"Bearer {create_token(user_id)}"}
+
+
+async def per_competition_flow(client, headers, competition_ids):
+    for comp_id in competition_ids:
+        order = (await client.post("/api/tickets/purchase", json={"competition_id": comp_id, "quantity": 2}, headers=headers)).json()
+        await client.post(f"/api/orders/{order['order_id']}/confirm", headers=headers)
+
+
+async def basket_flow(client, headers, competition_ids):
+    items = [{"competition_id": comp_id, "quantity": 2} for comp_id in competition_ids]
+    basket = (await client.post("/api/tickets/basket", json={"items": items}, headers=headers)).json()
+    await client.post(f"/api/tickets/basket/{basket['basket_id']}/confirm", headers=headers)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Basket vs per-competition checkout latency")
+    parser.add_argument("--competitions", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    from query_budget import track_queries
+
+    async with bench_client() as (core, client):
+        headers = await seed(core, args.competitions)
+        competition_ids = [f"comp_bench_{i}" for i in range(args.competitions)]
+        results = {}
+        for name, flow in (("per_competition", per_competition_flow), ("basket", basket_flow)):
+            await flow(client, headers, competition_ids)  # warm up
+            samples = []
+            with track_queries() as budget:
+                for _ in range(args.rounds):
+                    with Timer() as timer:
+                        await flow(client, headers, competition_ids)
+                    samples.append(timer.ms)
+            results[name] = {**summarize(samples), "db_commands_per_checkout": budget.commands / args.rounds}
+        speedup = results["per_competition"]["median_ms"] / results["basket"]["median_ms"]
+        print(json.dumps({"competitions": args.competitions, **results, "median_speedup": round(speedup, 2)}, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
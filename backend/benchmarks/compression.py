@@ -0,0 +1,99 @@
+"""CPU cost vs. bytes saved for response compression settings.
+
+    python -m benchmarks.compression [--rounds 50]
+
+CPU only: no database needed. Payloads mimic the public competitions
+listing and the admin orders table; each gzip level (and brotli quality,
+if installed) is timed per payload, alongside the cost of a cache hit
+(hashing the body) in ``CompressionMiddleware``.
+"""
+import argparse
+import hashlib
+import json
+from datetime import datetime, timezone, timedelta
+
+from benchmarks import Timer, summarize
+from compression import brotli, compress
+
+
+def competitions_payload(count: int = 100) -> bytes:
+    draw_date = datetime.now(timezone.utc) + timedelta(days=30)
+    return json.dumps([{
+        "competition_id": f"comp_{i:06d}",
+        "title": f"Win a brand new prize bundle #{i}",
+        "description": "Enter now for your chance to win. Free postal entry available. " * 8,
+        "category": ("cash", "cars", "tech", "lifestyle")[i % 4],
+        "prize_value": 1000 + i * 25,
+        "ticket_price": 0.99,
+        "total_tickets": 10000,
+        "tickets_sold": (i * 137) % 10000,
+        "draw_date": draw_date.isoformat(),
+        "image_url": f"https://cdn.example.com/competitions/{i}.jpg",
+        "featured": i % 10 == 0,
+        "auto_draw": True,
+        "is_visible": True,
+    } for i in range(count)]).encode()
+
+
+def orders_payload(count: int = 1000) -> bytes:
+    created = datetime.now(timezone.utc)
+    return json.dumps([{
+        "order_id": f"ord_{i:012x}",
+        "user_id": f"user_{i % 200:08x}",
+        "competition_id": f"comp_{i % 100:06d}",
+        "quantity": 1 + i % 5,
+        "total_amount": round((1 + i % 5) * 0.99, 2),
+        "ticket_numbers": list(range(i * 5, i * 5 + 1 + i % 5)),
+        "payment_status": ("completed", "pending", "failed")[i % 3],
+        "created_at": (created - timedelta(minutes=i)).isoformat(),
+    } for i in range(count)]).encode()
+
+
+def settings():
+    yield "gzip-1", "gzip", {"gzip_level": 1}
+    yield "gzip-6", "gzip", {"gzip_level": 6}
+    yield "gzip-9", "gzip", {"gzip_level": 9}
+    if brotli is not None:
+        for quality in (1, 4, 11):
+            yield f"br-{quality}", "br", {"brotli_quality": quality}
+
+
+def measure(body: bytes, rounds: int) -> dict:
+    results = {}
+    for name, encoding, options in settings():
+        samples = []
+        for _ in range(rounds):
+            with Timer() as timer:
+                compressed = compress(body, encoding, **options)
+            samples.append(timer.ms)
+        stats = summarize(samples)
+        saved = len(body) - len(compressed)
+        results[name] = {
+            **stats,
+            "bytes": len(compressed),
+            "ratio": round(len(compressed) / len(body), 4),
+            "bytes_saved_per_cpu_ms": round(saved / stats["median_ms"]) if stats["median_ms"] else None,
+        }
+    samples = []
+    for _ in range(rounds):
+        with Timer() as timer:
+            hashlib.blake2b(body, digest_size=16).digest()
+        samples.append(timer.ms)
+    results["cache_hit"] = summarize(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response compression CPU vs. bytes saved")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    payloads = {"competitions": competitions_payload(), "admin_orders": orders_payload()}
+    print(json.dumps({
+        name: {"raw_bytes": len(body), **measure(body, args.rounds)}
+        for name, body in payloads.items()
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
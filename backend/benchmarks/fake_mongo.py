@@ -0,0 +1,112 @@
+"""In-memory stand-in for the Motor client, so benchmarks can run without a mongod.
+
+Built on mongomock-motor, with the gaps this app runs into filled in:
+
+* ``find_one_and_update(..., return_document=AFTER)`` re-ran the original
+  filter to fetch the new document, which misses once the update changed a
+  filtered field (every order transition does);
+* ``db.with_options(...)`` returned an unwrapped synchronous database;
+* ``cursor.to_list(n)`` ignored ``n``;
+* ``admin.command("hello")`` isn't implemented; it now reports a standalone
+  server, so the app takes its non-transactional paths;
+* the ``$bitsAllClear`` query operator and the ``$bit`` update operator
+  (ticket claims) aren't implemented; both are added for integer fields;
+* the ``$substrBytes`` aggregation operator (rebuilding winner stats, and
+  so ``POST /api/seed``) isn't implemented; it's added for ASCII strings;
+* the ``$unionWith`` stage (``include_archived``, ticket count reconciles)
+  isn't implemented; it's added with an optional sub-pipeline.
+
+Still unsupported: ``$text`` search. Timings measure the app's Python work
+plus mongomock's, not MongoDB; compare them with each other, not with runs
+against a real server.
+"""
+from itertools import islice
+
+from pymongo import ReturnDocument
+
+try:
+    import mongomock.aggregate
+    import mongomock.collection
+    import mongomock.filtering
+    import mongomock_motor
+except ImportError:  # pragma: no cover
+    mongomock_motor = None
+
+_patched = False
+
+
+def _patch():
+    global _patched
+    if _patched:
+        return
+    _patched = True
+
+    find_and_modify = mongomock.collection.Collection._find_and_modify
+
+    def _find_and_modify(self, query, projection=None, update=None, upsert=False, sort=None,
+                         return_document=ReturnDocument.BEFORE, session=None, **kwargs):
+        if return_document is ReturnDocument.AFTER and update is not None:
+            matched = self.find_one(query, projection={"_id": 1}, sort=sort)
+            if matched:
+                query = {"_id": matched["_id"]}
+        return find_and_modify(self, query, projection, update, upsert, sort, return_document, session, **kwargs)
+
+    mongomock.collection.Collection._find_and_modify = _find_and_modify
+
+    # Read preferences and concerns mean nothing in memory
+    mongomock_motor.AsyncMongoMockDatabase.with_options = lambda self, **options: self
+
+    command = mongomock_motor.AsyncMongoMockDatabase.command
+
+    async def _command(self, name, *args, **kwargs):
+        if name == "hello":
+            return {"isWritablePrimary": True, "ok": 1.0}
+        return await command(self, name, *args, **kwargs)
+
+    mongomock_motor.AsyncMongoMockDatabase.command = _command
+
+    async def _to_list(self, length=None, *args, **kwargs):
+        return list(islice(self._AsyncCursor__cursor, length or None))
+
+    mongomock_motor.AsyncCursor.to_list = _to_list
+
+    def _bits_all_clear(doc_val, bits):
+        if not isinstance(doc_val, int):
+            return False
+        mask = bits if isinstance(bits, int) else sum(1 << bit for bit in set(bits))
+        return doc_val & mask == 0
+
+    mongomock.filtering._filterer_inst._operator_map["$bitsAllClear"] = _bits_all_clear
+
+    def _bit_updater(doc, field_name, value):
+        (operation, operand), = value.items()
+        key = int(field_name) if isinstance(doc, list) else field_name
+        current = doc[key] if isinstance(doc, list) else doc.get(key, 0)
+        # Python ints are two's complement, so signed Int64 operands combine correctly
+        doc[key] = {"and": current & operand, "or": current | operand, "xor": current ^ operand}[operation]
+
+    mongomock.collection._updaters["$bit"] = _bit_updater
+
+    handle_string_operator = mongomock.aggregate._Parser._handle_string_operator
+
+    def _handle_string_operator(self, operator, values):
+        if operator == "$substrBytes":
+            string, start, length = self.parse_many(values)
+            return "" if string is None else string[start:start + length]
+        return handle_string_operator(self, operator, values)
+
+    mongomock.aggregate._Parser._handle_string_operator = _handle_string_operator
+
+    def _handle_union_with_stage(in_collection, database, options):
+        other = database.get_collection(options["coll"]).aggregate(options.get("pipeline", []))
+        return list(in_collection) + list(other)
+
+    mongomock.aggregate._PIPELINE_HANDLERS["$unionWith"] = _handle_union_with_stage
+
+
+def fake_client():
+    """A fresh, empty in-memory client with the same surface as AsyncIOMotorClient"""
+    if mongomock_motor is None:
+        raise SystemExit("The fake backend needs mongomock-motor: pip install mongomock-motor")
+    _patch()
+    return mongomock_motor.AsyncMongoMockClient()
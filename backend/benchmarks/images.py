@@ -0,0 +1,94 @@
+"""Variant generation throughput for uploaded images.
+
+    python -m benchmarks.images [--images 24] [--size 3000x2000] [--workers 1,2,4]
+
+Renders ``--images`` synthetic photos (noise over a fractal, so they
+compress like real pictures) to every IMAGE_WIDTHS width as WebP and JPEG,
+through ``render_variants`` in a spawn process pool of each size in
+``--workers``. Reports images and variants per second, per-image latency,
+and the original vs. variant bytes. No database needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from benchmarks import summarize
+from images import render_variants
+
+
+def make_originals(directory: str, count: int, width: int, height: int) -> list:
+    from PIL import Image
+
+    paths = []
+    for i in range(count):
+        base = Image.effect_mandelbrot((width, height), (-2 + i * 0.01, -1, 1, 1), 60).convert("RGB")
+        noise = Image.effect_noise((width, height), 40).convert("RGB")
+        path = os.path.join(directory, f"original_{i}.jpg")
+        Image.blend(base, noise, 0.3).save(path, "JPEG", quality=92)
+        paths.append(path)
+    return paths
+
+
+async def run(paths: list, out_root: str, widths: list, quality: int, workers: int) -> dict:
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Start the workers first, so the timing doesn't include interpreter startup
+        await asyncio.gather(*[loop.run_in_executor(pool, time.sleep, 0.2) for _ in range(workers)])
+        latencies = []
+
+        async def render(i, path):
+            started = time.perf_counter()
+            result = await loop.run_in_executor(
+                pool, render_variants, path, os.path.join(out_root, f"w{workers}", str(i)), widths, quality
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            return result
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*[render(i, path) for i, path in enumerate(paths)])
+        elapsed = time.perf_counter() - started
+    variants = [variant for result in results for variant in result["variants"]]
+    return {
+        "workers": workers,
+        "images_per_s": round(len(paths) / elapsed, 2),
+        "variants_per_s": round(len(variants) / elapsed, 2),
+        "per_image": summarize(latencies),
+        "variant_kb": {
+            f"{width}.{image_format}": round(sum(v["bytes"] for v in variants if v["width"] == width and v["format"] == image_format)
+                                         / len(results) / 1024, 1)
+            for width in widths for image_format in ("webp", "jpeg")
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of resized WebP/JPEG variant generation")
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--size", default="3000x2000")
+    parser.add_argument("--widths", default=os.environ.get("IMAGE_WIDTHS", "320,640,1280"))
+    parser.add_argument("--quality", type=int, default=int(os.environ.get("IMAGE_QUALITY", "80")))
+    parser.add_argument("--workers", default=f"1,{max(1, (os.cpu_count() or 1) // 2)},{os.cpu_count() or 1}")
+    args = parser.parse_args()
+    width, height = (int(n) for n in args.size.split("x"))
+    widths = [int(w) for w in args.widths.split(",")]
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_originals(directory, args.images, width, height)
+        report = {
+            "images": args.images,
+            "size": args.size,
+            "original_kb": round(sum(os.path.getsize(p) for p in paths) / len(paths) / 1024, 1),
+            "runs": [
+                asyncio.run(run(paths, directory, widths, args.quality, workers))
+                for workers in sorted({int(w) for w in args.workers.split(",")})
+            ],
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Cold import cost of ``server`` (what a worker pays before it can serve).
+
+    python -m benchmarks.importtime [--runs 5] [--budget-ms 800] [--top 10]
+
+Runs ``python -X importtime -c "import server"`` in fresh interpreters and
+reports the median total plus the slowest top-level imports. Exits non-zero
+when the median exceeds ``--budget-ms`` or when a dependency that should be
+imported lazily shows up at import time, so CI can gate on it. No database
+needed: building the app creates the Motor client but doesn't connect.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Set, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Only needed by specific endpoints; importing them at boot is a regression
+LAZY_MODULES = ("resend", "httpx", "bcrypt", "jwt", "PIL", "email_validator")
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Cumulative microseconds per module (including what it imported) from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():  # skip the header row
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def measure(module: str = "server") -> Tuple[str, Set[str]]:
+    """-X importtime output of importing module in a fresh interpreter, and the modules it left loaded"""
+    # importtime also logs imports that failed, so ask sys.modules what actually loaded
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys, {module}; print('\\n'.join(sys.modules))"],
+        cwd=BACKEND_DIR, env=os.environ, capture_output=True, text=True, check=True
+    )
+    return result.stderr, set(result.stdout.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget for server")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    measured = [measure() for _ in range(args.runs)]
+    runs = [parse_importtime(stderr) for stderr, _ in measured]
+    median_ms = statistics.median(run["server"] / 1000 for run in runs)
+    # Cumulative, so a package's dependencies also count towards it
+    slowest = sorted(
+        ((name, us) for name, us in runs[-1].items() if name != "server"), key=lambda item: item[1], reverse=True
+    )[:args.top]
+    eager = sorted({name.split(".")[0] for name in measured[-1][1]} & set(LAZY_MODULES))
+
+    print(json.dumps({
+        "runs": args.runs,
+        "median_ms": round(median_ms, 1),
+        "budget_ms": args.budget_ms,
+        "slowest": {name: round(us / 1000, 1) for name, us in slowest},
+        "eager_lazy_modules": eager,
+    }, indent=2))
+    if median_ms > args.budget_ms or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Event loop lag with logging off, written inline, and queued.
+
+    python -m benchmarks.logging_latency [--seconds 3] [--rate 2000] [--write-delay-ms 1]
+
+No database needed. A ticker coroutine sleeps 1ms at a time and records how
+late it wakes up while a producer logs ``--rate`` records/second from the
+loop. The output stream sleeps ``--write-delay-ms`` per write to stand in for
+a slow or back-pressured stderr. Modes:
+
+- off: records are dropped by level, the floor for loop lag
+- direct: a StreamHandler on the loop thread (the old basicConfig setup)
+- queue: ``logs.configure_logging`` without policies
+- queue+policy: the same with a 10% sample and a rate limit on the logger
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from benchmarks import summarize
+from logs import TEXT_FORMAT, LogPolicy, configure_logging, stop_logging
+
+LOGGER = "bench.hot"
+
+
+class SlowStream:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, text: str):
+        self.writes += 1
+        time.sleep(self.delay)
+
+    def flush(self):
+        pass
+
+
+def setup(mode: str, stream: SlowStream):
+    """Configure logging for the mode; returns a teardown callable"""
+    root = logging.getLogger()
+    if mode == "off":
+        root.setLevel(logging.WARNING)
+        return lambda: None
+    if mode == "direct":
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        return lambda: root.removeHandler(handler)
+    policies = {LOGGER: LogPolicy(sample_rate=0.1, per_second=100)} if mode == "queue+policy" else {}
+    configure_logging("INFO", "json", policies, stream=stream)
+    return stop_logging
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append((time.perf_counter() - start) * 1000 - 1)
+
+
+async def producer(stop: asyncio.Event, rate: int) -> int:
+    logger = logging.getLogger(LOGGER)
+    sent, start = 0, time.perf_counter()
+    while not stop.is_set():
+        due = int((time.perf_counter() - start) * rate)
+        for _ in range(due - sent):
+            logger.info("Served %s for %s in %.2fms", "/api/competitions", "user_bench", 1.5)
+        sent = max(sent, due)
+        await asyncio.sleep(0.001)
+    return sent
+
+
+async def run_mode(mode: str, args) -> dict:
+    stream = SlowStream(args.write_delay_ms / 1000)
+    teardown = setup(mode, stream)
+    stop, lags = asyncio.Event(), []
+    try:
+        tick = asyncio.create_task(ticker(stop, lags))
+        produce = asyncio.create_task(producer(stop, args.rate))
+        await asyncio.sleep(args.seconds)
+        stop.set()
+        await tick
+        sent = await produce
+    finally:
+        # Stopping the listener drains the queue, so writes counts everything kept
+        teardown()
+    summary = summarize(lags)
+    summary["max_ms"] = round(max(lags), 3)
+    summary["logged"] = sent
+    summary["written"] = stream.writes
+    return summary
+
+
+async def main_async(args) -> dict:
+    return {mode: await run_mode(mode, args) for mode in args.modes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event loop lag under logging load")
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--rate", type=int, default=2000, help="records/second from the loop")
+    parser.add_argument("--write-delay-ms", type=float, default=1, help="time each stream write blocks")
+    parser.add_argument("--modes", nargs="+", default=["off", "direct", "queue", "queue+policy"])
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Microbenchmarks: hot helpers and each endpoint handler on its own.
+
+    python -m benchmarks.micro [--backend fake|mongo] [--rounds 200] [--only NAME]
+                               [--save PATH] [--baseline PATH] [--update-baseline]
+
+Functions (status, JWT encode/decode, response model, ticket allocation,
+ticket map encoding, draw selection) are timed in batches of ``--inner`` calls and reported per
+call. Endpoints go through ``server:app`` over an ASGI transport, one at a
+time, with the local cache cleared before every request so the handler and
+its queries are measured rather than a cache hit. Per-request setup (e.g.
+the pending order a confirm needs) runs outside the timer.
+
+``--backend fake`` (the default) needs no database; ``mongo`` uses
+BENCH_MONGO_URL. Every run is saved to ``--save`` and, when the baseline file
+exists, compared with it median by median; the exit status is 1 if anything
+got slower than ``--threshold``. Results are machine-specific, so baselines
+live in the untracked ``benchmarks/results/``.
+"""
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import sys
+import uuid
+
+from benchmarks import Timer, bench_client, summarize
+from core import get_competition_status
+from models import CompetitionResponse
+from routers.admin import pick_winning_entry
+from routers.orders import pick_numbers
+from security import create_token, get_current_user
+from ticket_map import TicketMap
+from tickets import PACK_FIELD, encode_tickets
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+BIG_COMPETITION = "comp_micro_big"
+
+
+def competition_doc(i: int, total_tickets: int = 1000, **fields) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "competition_id": f"comp_micro_{i}",
+        "title": f"Micro competition {i}",
+        "description": "Benchmark prize " * 20,
+        "category": ("cars", "electronics", "cash")[i % 3],
+        "prize_value": 1000 + i,
+        "ticket_price": 1.99,
+        "total_tickets": total_tickets,
+        "tickets_sold": 0,
+        "draw_date": now + timedelta(days=2 + i),
+        "image_url": "https://example.com/micro.jpg",
+        "featured": i % 4 == 0,
+        "auto_draw": True,
+        "is_visible": True,
+        "created_at": now,
+        **fields
+    }
+
+
+def order_doc(user_id: str, competition_id: str, numbers: list, status: str = "completed") -> dict:
+    return {
+        "order_id": f"order_{uuid.uuid4().hex[:12]}",
+        "user_id": user_id,
+        "competition_id": competition_id,
+        "competition_title": "Micro competition",
+        PACK_FIELD: encode_tickets(numbers),
+        "quantity": len(numbers),
+        "total_price": 1.99 * len(numbers),
+        "payment_status": status,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+
+
+async def seed(core) -> dict:
+    db = core.db
+    competitions = [competition_doc(i) for i in range(20)]
+    competitions.append(competition_doc(0, total_tickets=100000, competition_id=BIG_COMPETITION, featured=False))
+    await db.competitions.insert_many(competitions)
+
+    users = {}
+    for role in ("user", "admin"):
+        user_id = f"user_micro_{role}"
+        await db.users.insert_one({
+            "user_id": user_id, "email": f"{role}@micro.example.com", "full_name": f"Micro {role}",
+            "role": role, "email_verified": True, "created_at": datetime.now(timezone.utc).isoformat()
+        })
+        users[role] = {"Authorization": f"Bearer {create_token(user_id, role)}"}
+
+    # 10k tickets sold in the big competition, 100 orders on the benchmark user's account
+    sold = random.sample(range(1, 100001), 10000)
+    orders = [order_doc("user_micro_user", BIG_COMPETITION, sorted(sold[i:i + 50])) for i in range(0, len(sold), 50)]
+    orders += [order_doc("user_micro_user", f"comp_micro_{i % 20}", [i + 1]) for i in range(100)]
+    await db.orders.insert_many(orders)
+
+    now = datetime.now(timezone.utc)
+    await db.winners.insert_many([{
+        "winner_id": f"win_micro_{i:03d}", "competition_id": f"comp_old_{i}", "competition_title": f"Old prize {i}",
+        "user_id": "user_micro_user", "user_name": "Micro user", "winning_ticket": i + 1, "prize_value": 500,
+        "drawn_at": (now - timedelta(days=i)).isoformat()
+    } for i in range(60)])
+    await db.winner_stats.insert_one({"_id": "totals", "winners": 60, "prize_value": 30000})
+    await db.content.insert_one({"type": "faq", "items": [{"question": f"Q{i}?", "answer": "A" * 200} for i in range(10)]})
+    return users
+
+
+def static(method: str, url: str, auth: str = None, **kwargs):
+    async def prepare(core, users):
+        return method, url, {"headers": users[auth] if auth else {}, **kwargs}
+    return prepare
+
+
+async def pending_order(core, users):
+    order = order_doc("user_micro_user", "comp_micro_1", [random.randint(1, 1000)], status="pending")
+    await core.db.orders.insert_one(dict(order))
+    return "POST", f"/api/orders/{order['order_id']}/confirm", {"headers": users["user"]}
+
+
+ENDPOINTS = {
+    "GET /api/competitions": static("GET", "/api/competitions"),
+    "GET /api/competitions?category": static("GET", "/api/competitions?category=cars"),
+    "GET /api/competitions/featured": static("GET", "/api/competitions/featured"),
+    "GET /api/competitions/{id}": static("GET", "/api/competitions/comp_micro_3"),
+    "GET /api/competitions/{id}/tickets": static("GET", f"/api/competitions/{BIG_COMPETITION}/tickets"),
+    "GET /api/winners/feed": static("GET", "/api/winners/feed?limit=20"),
+    "GET /api/winners/stats": static("GET", "/api/winners/stats"),
+    "GET /api/content/faq": static("GET", "/api/content/faq"),
+    "GET /api/auth/me": static("GET", "/api/auth/me", "user"),
+    "GET /api/orders/my": static("GET", "/api/orders/my", "user"),
+    "GET /api/tickets/my": static("GET", "/api/tickets/my", "user"),
+    "POST /api/tickets/purchase": static(
+        "POST", "/api/tickets/purchase", "user", json={"competition_id": BIG_COMPETITION, "quantity": 10}
+    ),
+    "POST /api/orders/{id}/confirm": pending_order,
+    "GET /api/admin/stats": static("GET", "/api/admin/stats", "admin"),
+    "GET /api/admin/orders": static("GET", "/api/admin/orders", "admin"),
+}
+
+
+def function_cases(users: dict) -> dict:
+    comp = competition_doc(1)
+    sold = set(random.sample(range(1, 100001), 50000))
+    big = competition_doc(0, total_tickets=100000, competition_id=BIG_COMPETITION)
+    draw_orders = [{"order_id": f"order_{i}", "user_id": f"user_{i}", "quantity": random.randint(1, 20)} for i in range(10000)]
+    authorization = users["user"]["Authorization"]
+    ticket_bits = bytearray(12500)
+    for number in sold:
+        ticket_bits[(number - 1) >> 3] |= 1 << ((number - 1) & 7)
+    return {
+        "get_competition_status": lambda: get_competition_status(comp),
+        "create_token": lambda: create_token("user_micro_user"),
+        # Decode plus a user cache hit, i.e. what every authenticated request pays
+        "get_current_user (JWT)": lambda: get_current_user(authorization=authorization, request=None),
+        "CompetitionResponse": lambda: CompetitionResponse(**comp, status="live"),
+        "pick_numbers (50 of 100k, half sold)": lambda: pick_numbers(big, 50, sold),
+        # Uncached: a new version forces the bitmap to be recompressed
+        "TicketMap.payload (100k, half sold)": lambda: TicketMap(
+            BIG_COMPETITION, 100000, 1, bytearray(ticket_bits), []
+        ).payload(),
+        "pick_winning_entry (10k orders)": lambda: pick_winning_entry(draw_orders),
+    }
+
+
+async def time_function(call, rounds: int, inner: int) -> list:
+    samples = []
+    for _ in range(rounds):
+        with Timer() as timer:
+            for _ in range(inner):
+                result = call()
+                if asyncio.iscoroutine(result):
+                    await result
+        samples.append(timer.ms / inner)
+    return samples
+
+
+async def time_endpoint(core, client, users, prepare, rounds: int, warmup: int) -> list:
+    samples = []
+    for i in range(warmup + rounds):
+        method, url, kwargs = await prepare(core, users)
+        core.local_cache.clear()
+        with Timer() as timer:
+            response = await client.request(method, url, **kwargs)
+        if response.status_code >= 400:
+            raise SystemExit(f"{method} {url} returned {response.status_code}: {response.text[:200]}")
+        if i >= warmup:
+            samples.append(timer.ms)
+    return samples
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """(name, baseline median, current median, relative change) for names in both runs"""
+    rows = []
+    for name, summary in results.items():
+        before = baseline.get(name)
+        if before and before["median_ms"]:
+            rows.append((name, before["median_ms"], summary["median_ms"], summary["median_ms"] / before["median_ms"] - 1))
+    return rows
+
+
+async def run(args) -> dict:
+    results = {}
+    async with bench_client(args.backend) as (core, client):
+        users = await seed(core)
+        for name, call in function_cases(users).items():
+            if args.only in name:
+                # Per-call times are tiny, so keep extra precision
+                results[name] = summarize(await time_function(call, args.rounds, args.inner), digits=5)
+        for name, prepare in ENDPOINTS.items():
+            if args.only in name:
+                results[name] = summarize(await time_endpoint(core, client, users, prepare, args.rounds, args.warmup))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Helper and per-endpoint microbenchmarks")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="fake")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--inner", type=int, default=100, help="calls per timed batch for helper functions")
+    parser.add_argument("--only", default="", help="run only benchmarks whose name contains this")
+    parser.add_argument("--save", type=Path, default=RESULTS_DIR / "micro-latest.json")
+    parser.add_argument("--baseline", type=Path, default=RESULTS_DIR / "micro-baseline.json")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    random.seed(0)
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request otherwise
+    results = asyncio.run(run(args))
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "rounds": args.rounds,
+        "results": results,
+    }
+    print(json.dumps(results, indent=2))
+
+    for path in [args.save] + ([args.baseline] if args.update_baseline else []):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2))
+
+    if args.update_baseline or not args.baseline.exists():
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("backend") != args.backend:
+        print(f"Baseline was recorded with --backend {baseline.get('backend')}; not comparing")
+        return
+    regressions = 0
+    print(f"\n{'benchmark':<40} {'baseline ms':>12} {'now ms':>12} {'change':>8}")
+    for name, before, now, change in compare(results, baseline["results"]):
+        slower = change > args.threshold
+        regressions += slower
+        print(f"{name:<40} {before:>12.5f} {now:>12.5f} {change:>+8.1%}{'  REGRESSION' if slower else ''}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Replay captured traffic and report latency per route.
+
+    python -m benchmarks.replay capture.ndjson [--url http://localhost:8001] [--speed 1] [--token JWT]
+    python -m benchmarks.replay capture.ndjson --backend fake --speed 0 --out after.json --baseline before.json
+
+Reads a TRAFFIC_CAPTURE_PATH file (see ``capture``) and re-issues each
+request at its original offset from the first one, divided by ``--speed``
+(``0`` sends as fast as ``--concurrency`` allows). Without ``--backend``
+requests go to ``--url``, e.g. a local ``uvicorn server:app`` running the
+build under test. Point that server at a copy of the data the capture was
+taken against, or ids in paths won't resolve. With ``--backend`` they go to
+``server:app`` in-process, against the benchmark database filled by
+``POST /api/seed``.
+
+Secrets and personal data were redacted at capture time. Requests that were authenticated
+are sent with ``--token`` (in-process: a token for the seeded admin),
+and body fields that were redacted are sent as the placeholder. Requests
+whose body wasn't captured are skipped. Results are grouped by method and
+route template. ``--baseline`` takes the ``--out`` of an earlier run
+(e.g. the previous build) and adds median/p95 change per route.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+
+from benchmarks import Timer, bench_client, summarize
+from capture import REDACTED
+
+# Not replayed as recorded: set by the client, or secrets that were redacted
+_DROP_HEADERS = {"host", "content-length", "connection", "transfer-encoding", "authorization", "cookie"}
+
+
+def load_capture(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda r: r["ts"])
+
+
+def route_key(record: dict) -> str:
+    return f"{record['method']} {record.get('route') or record['path']}"
+
+
+def build_request(record: dict, token: str = None):
+    """httpx request arguments for a captured record, or None if it can't be replayed"""
+    if record.get("body_bytes") and "body" not in record:
+        return None
+    headers = {
+        name: value for name, value in record["headers"].items()
+        if name not in _DROP_HEADERS and value != REDACTED
+    }
+    authenticated = REDACTED in (record["headers"].get("authorization"), record["headers"].get("cookie"))
+    if authenticated and token:
+        headers["authorization"] = f"Bearer {token}"
+    url = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+    request = {"method": record["method"], "url": url, "headers": headers}
+    if "body" in record:
+        request["content"] = json.dumps(record["body"]).encode()
+    return request
+
+
+async def replay(client, records: list, speed: float, concurrency: int, token: str = None) -> dict:
+    limit = asyncio.Semaphore(concurrency)
+    latencies, statuses, errors = defaultdict(list), defaultdict(lambda: defaultdict(int)), defaultdict(int)
+    lag = []
+    skipped = 0
+    origin = records[0]["ts"] if records else 0
+
+    async def send(record, request, due):
+        async with limit:
+            lag.append(max(0.0, time.perf_counter() - due) * 1000)
+            key = route_key(record)
+            try:
+                with Timer() as timer:
+                    response = await client.request(**request)
+            except Exception as e:  # connection errors etc. count against the route, they don't stop the run
+                errors[key] += 1
+                statuses[key][type(e).__name__] += 1
+                return
+            latencies[key].append(timer.ms)
+            statuses[key][response.status_code] += 1
+
+    started = time.perf_counter()
+    tasks = []
+    for record in records:
+        request = build_request(record, token)
+        if request is None:
+            skipped += 1
+            continue
+        due = started + ((record["ts"] - origin) / speed if speed else 0)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(record, request, due)))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - started
+
+    every = [ms for samples in latencies.values() for ms in samples]
+    return {
+        "requests": len(tasks),
+        "skipped": skipped,
+        "wall_s": round(wall, 2),
+        # How late requests went out; if this grows, the client, not the server, set the pace
+        "start_lag": summarize(lag) if lag else None,
+        "overall": summarize(every) if every else None,
+        "routes": {
+            key: {**(summarize(latencies[key]) if latencies[key] else {"n": 0}),
+                  "status": dict(statuses[key]), "errors": errors[key]}
+            for key in sorted(statuses)
+        },
+    }
+
+
+def compare(result: dict, baseline: dict) -> dict:
+    """Median and p95 change per route, in percent of the baseline"""
+    changes = {}
+    for key, current in result["routes"].items():
+        before = baseline.get("routes", {}).get(key)
+        if not before or not current["n"] or not before["n"]:
+            continue
+        changes[key] = {
+            stat: round((current[stat] - before[stat]) / before[stat] * 100, 1) if before[stat] else None
+            for stat in ("median_ms", "p95_ms")
+        }
+    return changes
+
+
+async def main_async(args) -> dict:
+    records = load_capture(args.capture)
+    if args.backend:
+        from security import create_token
+
+        async with bench_client(args.backend) as (core, client):
+            await client.post("/api/seed")
+            admin = await core.db.users.find_one({"role": "admin"}, {"_id": 0, "user_id": 1})
+            token = args.token or create_token(admin["user_id"], "admin")
+            return await replay(client, records, args.speed, args.concurrency, token)
+    import httpx
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+        return await replay(client, records, args.speed, args.concurrency, args.token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a traffic capture and report latency per route")
+    parser.add_argument("capture", help="NDJSON file written by TRAFFIC_CAPTURE_PATH")
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--backend", choices=["fake", "mongo"], help="replay against server:app in-process instead")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression; 0 sends without pauses")
+    parser.add_argument("--concurrency", type=int, default=64, help="requests in flight at most")
+    parser.add_argument("--token", help="bearer token for requests that were authenticated")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--out", help="also write the result here, for a later --baseline")
+    parser.add_argument("--baseline", help="result of an earlier run to compare against")
+    args = parser.parse_args()
+    result = asyncio.run(main_async(args))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            result["change_percent"] = compare(result, json.load(f))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""A launch rush: many buyers purchasing from one competition at once.
+
+    python -m benchmarks.rush [--buyers 1000] [--limit 8] [--max-waiting 64] [--queue-rate 0]
+
+Fires ``--buyers`` concurrent purchases, first with the purchase limiter
+effectively off (every request goes straight to the database), then with
+``--limit`` / ``--max-waiting``. For each run it reports the latency of
+requests that were served, how many were shed with 503, the most purchases
+that were in the database at once, and how long each of those took. With
+``--queue-rate`` the competition gets a waiting room instead: buyers join,
+wait for their ETA and then purchase, and the run also reports join latency
+and how long buyers waited.
+
+Needs MongoDB (``--backend fake`` runs, but mongomock never yields to the
+event loop, so requests don't overlap there).
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone, timedelta
+
+from benchmarks import Timer, bench_client, summarize
+from security import create_token
+
+COMPETITION = "comp_rush"
+
+
+async def seed(core, buyers: int, queue_rate: float) -> list:
+    now = datetime.now(timezone.utc)
+    await core.db.competitions.insert_one({
+        "competition_id": COMPETITION, "title": "Launch rush", "description": "Benchmark", "category": "cars",
+        "prize_value": 50000, "ticket_price": 2.5, "total_tickets": 100000, "tickets_sold": 0,
+        "draw_date": now + timedelta(days=7), "image_url": "https://example.com/rush.jpg", "featured": True,
+        "auto_draw": True, "is_visible": True, "created_at": now, "queue_rate": queue_rate or None
+    })
+    await core.db.users.insert_many([{
+        "user_id": f"user_rush_{i}", "email": f"rush{i}@example.com", "full_name": f"Rush {i}",
+        "role": "user", "email_verified": True, "created_at": now.isoformat()
+    } for i in range(buyers)])
+    return [{"Authorization": f"Bearer {create_token(f'user_rush_{i}')}"} for i in range(buyers)]
+
+
+class Downstream:
+    """Wraps place_order to see how much purchase work reaches the database at once"""
+
+    def __init__(self, place_order):
+        self.place_order = place_order
+        self.in_flight = 0
+        self.peak = 0
+        self.samples = []
+
+    async def __call__(self, purchase, user):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            with Timer() as timer:
+                return await self.place_order(purchase, user)
+        finally:
+            self.in_flight -= 1
+            self.samples.append(timer.ms)
+
+
+async def buyer(client, headers: dict, queue: bool, stats: dict):
+    if queue:
+        with Timer() as timer:
+            joined = await client.post(f"/api/queue/{COMPETITION}/join", headers=headers)
+        stats["join"].append(timer.ms)
+        if joined.status_code != 200:
+            stats["status"][joined.status_code] = stats["status"].get(joined.status_code, 0) + 1
+            return
+        state = joined.json()
+        headers = {**headers, "X-Queue-Token": state["token"]}
+        stats["queued"].append(state["eta_seconds"] * 1000)
+        await asyncio.sleep(state["eta_seconds"])
+    with Timer() as timer:
+        response = await client.post("/api/tickets/purchase", json={"competition_id": COMPETITION, "quantity": 1}, headers=headers)
+    stats["status"][response.status_code] = stats["status"].get(response.status_code, 0) + 1
+    if response.status_code == 200:
+        stats["served"].append(timer.ms)
+
+
+async def run(args, limit: int, max_waiting: int) -> dict:
+    from routers import orders, queue
+
+    async with bench_client(args.backend) as (core, client):
+        all_headers = await seed(core, args.buyers, args.queue_rate)
+        queue.purchase_limiter.limit, queue.purchase_limiter.max_waiting = limit, max_waiting
+        downstream = Downstream(orders.place_order)
+        orders.place_order = downstream
+        stats = {"served": [], "join": [], "queued": [], "status": {}}
+        try:
+            with Timer() as timer:
+                await asyncio.gather(*[buyer(client, headers, bool(args.queue_rate), stats) for headers in all_headers])
+        finally:
+            orders.place_order = downstream.place_order
+    result = {
+        "limit": limit,
+        "max_waiting": max_waiting,
+        "wall_s": round(timer.ms / 1000, 2),
+        "status_codes": stats["status"],
+        "peak_in_database": downstream.peak,
+        "served": summarize(stats["served"]) if stats["served"] else None,
+        "in_database": summarize(downstream.samples) if downstream.samples else None,
+    }
+    if args.queue_rate:
+        result["join"] = summarize(stats["join"])
+        result["queued"] = summarize(stats["queued"]) if stats["queued"] else None
+    return result
+
+
+async def main_async(args) -> dict:
+    unlimited = await run(args, limit=args.buyers, max_waiting=args.buyers)
+    limited = await run(args, limit=args.limit, max_waiting=args.max_waiting)
+    return {"buyers": args.buyers, "unlimited": unlimited, "limited": limited}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Purchase latency and load shedding under a launch rush")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="mongo")
+    parser.add_argument("--buyers", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=8, help="purchases per competition in flight")
+    parser.add_argument("--max-waiting", type=int, default=64, help="purchases queued behind them before shedding")
+    parser.add_argument("--queue-rate", type=float, default=0, help="admit buyers through a waiting room at this rate")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Order document size and entry scan cost: ticket_numbers arrays vs ticket_pack.
+
+    python -m benchmarks.tickets [--orders 2000] [--quantity 50] [--total 100000]
+
+CPU only: no database needed. Orders are BSON-encoded the way Mongo returns
+them, then decoded and folded into the used-number set the way
+ticket_map.build does when it first builds a competition's map.
+"""
+import argparse
+import json
+import random
+
+import bson
+
+from benchmarks import Timer, summarize
+from tickets import encode_tickets, order_tickets
+
+
+def scan(encoded_orders) -> set:
+    used = set()
+    for raw in encoded_orders:
+        used.update(order_tickets(bson.decode(raw)))
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ticket storage size and scan speed")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--quantity", type=int, default=50)
+    parser.add_argument("--total", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    tickets = random.sample(range(1, args.total + 1), args.orders * args.quantity)
+    orders = [sorted(tickets[i:i + args.quantity]) for i in range(0, len(tickets), args.quantity)]
+    formats = {
+        "ticket_numbers": [bson.encode({"competition_id": "comp_1", "ticket_numbers": o}) for o in orders],
+        "ticket_pack": [bson.encode({"competition_id": "comp_1", "ticket_pack": encode_tickets(o)}) for o in orders],
+    }
+    results = {}
+    for name, encoded in formats.items():
+        samples = []
+        for _ in range(args.rounds):
+            with Timer() as timer:
+                scan(encoded)
+            samples.append(timer.ms)
+        results[name] = {"bytes": sum(map(len, encoded)), "scan": summarize(samples)}
+    assert scan(formats["ticket_numbers"]) == scan(formats["ticket_pack"])
+    results["size_ratio"] = round(results["ticket_pack"]["bytes"] / results["ticket_numbers"]["bytes"], 3)
+    print(json.dumps({"orders": args.orders, "quantity": args.quantity, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
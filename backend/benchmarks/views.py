@@ -0,0 +1,94 @@
+"""Bytes and latency of the competition list views.
+
+    python -m benchmarks.views [--backend fake|mongo] [--competitions 100] [--rounds 50]
+
+Lists ``--competitions`` competitions, each with a description about as
+long as the seeded ones, through ``GET /api/competitions`` and
+``GET /api/admin/competitions`` as the full view, ``?view=summary`` and a
+three-field ``?fields=``. It reports response bytes, with and without
+gzip, and request latency. The public list is served from the local cache
+after the first request, so its latency is mostly serialization. The admin
+list isn't cached, so its latency includes the (projected) read.
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime, timezone, timedelta
+
+from benchmarks import Timer, bench_client, summarize
+from security import create_token
+
+VIEWS = {
+    "full": "",
+    "summary": "view=summary",
+    "fields": "fields=competition_id,title,status",
+}
+WORDS = (
+    "win stunning prize specification delivery history model special engine interior leather warranty "
+    "mileage colour edition performance luxury sound system seats wheels hybrid power cash tax free"
+).split()
+
+
+def description(i: int) -> str:
+    """About 600 characters of text that doesn't compress away"""
+    rng = random.Random(i)
+    return " ".join(rng.choice(WORDS) for _ in range(90))
+
+
+async def seed(core, competitions: int) -> dict:
+    now = datetime.now(timezone.utc)
+    await core.db.competitions.insert_many([{
+        "competition_id": f"comp_view_{i}", "title": f"Competition {i}", "description": description(i),
+        "category": "cars", "prize_value": 50000, "ticket_price": 2.5, "total_tickets": 10000,
+        "tickets_sold": i * 10, "draw_date": now + timedelta(days=7 + i), "image_url": f"https://example.com/{i}.jpg",
+        "featured": i % 5 == 0, "auto_draw": True, "is_visible": True, "max_tickets_per_user": 50,
+        "created_at": now - timedelta(minutes=i)
+    } for i in range(competitions)])
+    await core.db.users.insert_one({
+        "user_id": "user_view_admin", "email": "views@example.com", "full_name": "Views",
+        "role": "admin", "email_verified": True, "created_at": now.isoformat()
+    })
+    return {"Authorization": f"Bearer {create_token('user_view_admin', 'admin')}"}
+
+
+async def measure(client, url: str, headers: dict, rounds: int) -> dict:
+    raw = await client.get(url, headers={**headers, "Accept-Encoding": "identity"})
+    compressed = await client.get(url, headers={**headers, "Accept-Encoding": "gzip"})
+    samples = []
+    for _ in range(rounds):
+        with Timer() as timer:
+            response = await client.get(url, headers={**headers, "Accept-Encoding": "identity"})
+        assert response.status_code == 200, response.text
+        samples.append(timer.ms)
+    return {
+        "bytes": len(raw.content),
+        # httpx decodes gzip, so the wire size comes from the header
+        "gzip_bytes": int(compressed.headers.get("content-length", len(compressed.content))),
+        **summarize(samples),
+    }
+
+
+async def main_async(args) -> dict:
+    async with bench_client(args.backend) as (core, client):
+        admin_headers = await seed(core, args.competitions)
+        results = {}
+        for path, headers in (("/api/competitions?limit=100", {}), ("/api/admin/competitions", admin_headers)):
+            results[path] = {}
+            for name, query in VIEWS.items():
+                url = path + ("&" if "?" in path else "?") + query if query else path
+                results[path][name] = await measure(client, url, headers, args.rounds)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Competition list payload size and latency per view")
+    parser.add_argument("--backend", choices=["fake", "mongo"], default="mongo")
+    parser.add_argument("--competitions", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""In-process caching with cross-worker invalidation.
+
+Each worker keeps its own ``LocalCache``. Writes that make cached data stale
+call ``InvalidationBus.publish``, which clears the local entry straight away
+and records the change in the ``invalidations`` collection. Every worker's
+bus listens on a change stream over that collection, or polls it when
+mongod is standalone, and applies the invalidations it did not originate.
+
+Components that keep derived state (e.g. the autocomplete index) can
+``subscribe`` to a namespace and receive the ids a write ``changed``, or
+None when they should rebuild from scratch.
+
+If a worker loses events (change stream history gone, or a polling outage
+longer than the collection's retention) it clears its whole cache. Entries
+also carry a TTL so staleness stays bounded even while the bus is down.
+``invalidated_within`` tells loaders that a namespace changed recently, so
+they can refill from the primary instead of a secondary that may still
+have the old data.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+import logging
+import time
+import uuid
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Server error codes meaning change streams are unavailable (standalone mongod)
+CHANGE_STREAM_UNSUPPORTED = {40573, 40324}
+# Resume token no longer in the oplog
+CHANGE_STREAM_HISTORY_LOST = {280, 286}
+
+# Invalidation records are kept this long; outages beyond it force a full resync
+RETENTION = timedelta(hours=1)
+# Polling re-reads this far back to tolerate clock skew between publishers
+POLL_OVERLAP = timedelta(seconds=5)
+
+_MISSING = object()
+
+
+class LocalCache:
+    def __init__(self):
+        self._data: Dict[str, Dict[Hashable, Tuple[float, Any]]] = {}
+        self._invalidated: Dict[str, float] = {}
+        self._all_invalidated = float("-inf")
+
+    def get(self, namespace: str, key: Hashable, default=None):
+        entry = self._data.get(namespace, {}).get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return default
+        return entry[1]
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: float):
+        self._data.setdefault(namespace, {})[key] = (time.monotonic() + ttl, value)
+
+    async def get_or_load(self, namespace: str, key: Hashable, ttl: float,
+                          loader: Callable[[], Awaitable[Any]]):
+        value = self.get(namespace, key, _MISSING)
+        if value is _MISSING:
+            invalidated = (self._invalidated.get(namespace), self._all_invalidated)
+            value = await loader()
+            # An invalidation while loading may mean the value is already stale
+            if (self._invalidated.get(namespace), self._all_invalidated) == invalidated:
+                self.set(namespace, key, value, ttl)
+        return value
+
+    def invalidate(self, namespace: str, key: Optional[Hashable] = None):
+        self._invalidated[namespace] = time.monotonic()
+        if key is None:
+            self._data.pop(namespace, None)
+        else:
+            self._data.get(namespace, {}).pop(key, None)
+
+    def invalidate_all(self):
+        self._all_invalidated = time.monotonic()
+        self._data.clear()
+
+    def clear(self):
+        """Forget everything, including when namespaces were invalidated"""
+        self._data.clear()
+        self._invalidated.clear()
+        self._all_invalidated = float("-inf")
+
+    def invalidated_within(self, namespace: str, seconds: float) -> bool:
+        """Whether anything in namespace was invalidated in the last seconds"""
+        last = max(self._invalidated.get(namespace, float("-inf")), self._all_invalidated)
+        return time.monotonic() - last < seconds
+
+
+class InvalidationBus:
+    def __init__(self, cache: LocalCache, poll_interval: float = 1.0):
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.origin = uuid.uuid4().hex
+        self.db = None
+        self.use_change_stream = True
+        self._resume_token = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_poll: Optional[datetime] = None
+        self._seen: Dict[Any, datetime] = {}
+        self._subscribers: Dict[str, List[Callable[[Optional[list]], Awaitable[None]]]] = {}
+        self._callback_tasks = set()
+
+    def subscribe(self, namespace: str, callback: Callable[[Optional[list]], Awaitable[None]]):
+        self._subscribers.setdefault(namespace, []).append(callback)
+
+    async def publish(self, namespace: str, key: Optional[Hashable] = None, changed: Optional[list] = None):
+        """Invalidate locally, then tell the other workers"""
+        self.cache.invalidate(namespace, key)
+        for callback in self._subscribers.get(namespace, []):
+            await self._run_callback(callback, changed)
+        if self.db is None:
+            return
+        try:
+            await self.db.invalidations.insert_one({
+                "namespace": namespace,
+                "key": key,
+                "changed": changed,
+                "origin": self.origin,
+                "at": datetime.now(timezone.utc)
+            })
+        except PyMongoError as e:
+            # Other workers fall back to their cache TTLs
+            logger.error(f"Failed to publish invalidation for {namespace}: {e}")
+
+    async def ensure_indexes(self, db):
+        await db.invalidations.create_index("at", expireAfterSeconds=int(RETENTION.total_seconds()))
+
+    def start(self, db):
+        self.db = db
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_callback(self, callback, changed: Optional[list]):
+        try:
+            await callback(changed)
+        except Exception as e:
+            logger.error(f"Invalidation subscriber failed: {e}")
+
+    def _notify(self, namespace: str, changed: Optional[list]):
+        for callback in self._subscribers.get(namespace, []):
+            task = asyncio.create_task(self._run_callback(callback, changed))
+            # The loop only keeps weak references to tasks
+            self._callback_tasks.add(task)
+            task.add_done_callback(self._callback_tasks.discard)
+
+    def _apply(self, doc: dict):
+        if doc.get("origin") == self.origin:
+            return
+        self.cache.invalidate(doc["namespace"], doc.get("key"))
+        self._notify(doc["namespace"], doc.get("changed"))
+
+    def _resync(self, reason: str):
+        logger.warning(f"Cache invalidations may have been missed ({reason}); clearing local cache")
+        self.cache.invalidate_all()
+        for namespace in self._subscribers:
+            self._notify(namespace, None)
+
+    async def _run(self):
+        backoff = self.poll_interval
+        while True:
+            try:
+                if self.use_change_stream:
+                    await self._watch()
+                else:
+                    await self._poll()
+                backoff = self.poll_interval
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if self.use_change_stream and e.code in CHANGE_STREAM_UNSUPPORTED:
+                    logger.info("Change streams unavailable, polling for cache invalidations")
+                    self.use_change_stream = False
+                    self._last_poll = datetime.now(timezone.utc)
+                    continue
+                if e.code in CHANGE_STREAM_HISTORY_LOST:
+                    self._resume_token = None
+                    self._resync("change stream history lost")
+                    continue
+                logger.error(f"Invalidation bus error: {e}")
+            except PyMongoError as e:
+                logger.error(f"Invalidation bus disconnected: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    async def _watch(self):
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        async with self.db.invalidations.watch(
+            pipeline, resume_after=self._resume_token, max_await_time_ms=int(self.poll_interval * 1000)
+        ) as stream:
+            while True:
+                change = await stream.try_next()
+                # Post-batch resume tokens advance even when nothing changed
+                self._resume_token = stream.resume_token
+                if change is not None:
+                    self._apply(change["fullDocument"])
+
+    async def _poll(self):
+        while True:
+            started = datetime.now(timezone.utc)
+            since = self._last_poll or started
+            if started - since > RETENTION:
+                self._resync("polling gap exceeded retention")
+                since = started
+            docs = await self.db.invalidations.find(
+                {"at": {"$gte": since - POLL_OVERLAP}}, {"namespace": 1, "key": 1, "changed": 1, "origin": 1, "at": 1}
+            ).to_list(None)
+            for doc in docs:
+                if doc["_id"] not in self._seen:
+                    self._seen[doc["_id"]] = started
+                    self._apply(doc)
+            cutoff = started - POLL_OVERLAP * 2
+            self._seen = {doc_id: seen_at for doc_id, seen_at in self._seen.items() if seen_at >= cutoff}
+            self._last_poll = started
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,176 @@
+"""Traffic capture for replaying real request mixes locally.
+
+``TrafficCaptureMiddleware`` records a sample of requests as NDJSON, one
+object per line: start time, method, path, query, the matched route
+template, headers, the JSON body, status, response size and duration.
+Secrets and personal data never reach the file. Header values named in
+SECRET_HEADERS, and query parameters or JSON body fields whose name
+contains one of SECRET_KEYS or PII_KEYS, are replaced with REDACTED. Only
+the fact that a secret was sent is kept, which is enough to replay the
+request with a test token; requests that need real personal details, such
+as sign-ups and contact messages, replay as validation failures.
+Bodies that aren't JSON, or are bigger than ``max_body_bytes``, are
+recorded by size only.
+
+Lines go to a queue that a writer thread drains, so a slow disk never
+stalls requests. If the queue backs up past ``max_pending`` records, new
+ones are dropped and counted. ``python -m benchmarks.replay`` plays a
+capture back.
+"""
+from queue import SimpleQueue
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode
+import json
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "[redacted]"
+SECRET_HEADERS = {
+    "authorization", "cookie", "x-queue-token", "x-webhook-signature", "x-api-key",
+    # Client addresses and the page they came from are personal data too
+    "x-forwarded-for", "x-real-ip", "forwarded", "referer",
+}
+# Matched as substrings of lowercased field names, e.g. "password" covers "new_password"
+SECRET_KEYS = ("password", "token", "secret", "signature", "session", "card", "cvv", "cvc", "api_key")
+# Personal data, e.g. "name" covers full_name and customer_name, "message" the text of contact messages
+PII_KEYS = ("email", "name", "phone", "address", "postcode", "birth", "message")
+
+
+def _is_secret(name: str) -> bool:
+    name = name.lower()
+    return any(key in name for key in SECRET_KEYS + PII_KEYS)
+
+
+def redact(value):
+    """Copy of a decoded JSON value with secret and personal fields replaced, at any depth"""
+    if isinstance(value, dict):
+        return {k: REDACTED if _is_secret(k) else redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+def redact_query(query: str) -> str:
+    return urlencode([(k, REDACTED if _is_secret(k) else v) for k, v in parse_qsl(query, keep_blank_values=True)])
+
+
+def redact_headers(headers) -> dict:
+    redacted = {}
+    for name, value in headers:
+        name = name.decode("latin-1").lower()
+        redacted[name] = REDACTED if name in SECRET_HEADERS else value.decode("latin-1")
+    return redacted
+
+
+class CaptureWriter:
+    """Appends lines to a file from a background thread"""
+
+    def __init__(self, path: str, max_pending: int = 10000):
+        self.path = path
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._queue = SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+            self._thread.start()
+
+    def write(self, record: dict):
+        if self._queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        if self.dropped:
+            record["dropped_before"], self.dropped = self.dropped, 0
+        self._queue.put(record)
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as out:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                try:
+                    out.write(json.dumps(record, default=str) + "\n")
+                except (TypeError, ValueError) as e:
+                    logger.warning("Could not write captured request: %s", e)
+                if self._queue.empty():
+                    out.flush()
+
+
+class TrafficCaptureMiddleware:
+    def __init__(self, app, writer: CaptureWriter, sample_rate: float = 0.01,
+                 path_prefix: str = "/api", max_body_bytes: int = 16 * 1024):
+        self.app = app
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.path_prefix = path_prefix
+        self.max_body_bytes = max_body_bytes
+        writer.start()
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not scope["path"].startswith(self.path_prefix)
+                or random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        body_size = 0
+        response = {"status": None, "bytes": 0}
+
+        async def capture_receive():
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                body_size += len(chunk)
+                if body_size <= self.max_body_bytes:
+                    body.extend(chunk)
+            return message
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        started, clock = time.time(), time.perf_counter()
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            self.writer.write(self._record(scope, started, time.perf_counter() - clock, body, body_size, response))
+
+    def _record(self, scope, started: float, elapsed: float, body: bytearray, body_size: int, response: dict) -> dict:
+        headers = redact_headers(scope["headers"])
+        record = {
+            "ts": round(started, 6),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": redact_query(scope["query_string"].decode("latin-1")),
+            # Set by the router once a route matched, e.g. /api/competitions/{competition_id}
+            "route": getattr(scope.get("route"), "path", None),
+            "headers": headers,
+            "status": response["status"],
+            "response_bytes": response["bytes"],
+            "duration_ms": round(elapsed * 1000, 3),
+        }
+        if body_size:
+            record["body_bytes"] = body_size
+            if body_size <= self.max_body_bytes and headers.get("content-type", "").startswith("application/json"):
+                try:
+                    record["body"] = redact(json.loads(body))
+                except ValueError:
+                    pass
+        return record
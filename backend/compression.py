@@ -0,0 +1,219 @@
+"""Response compression with a cache of already-compressed bodies.
+
+``CompressionMiddleware`` gzips (or brotli-encodes, when the ``brotli``
+package is installed and the client accepts ``br``) responses above a
+minimum size whose content type is on the allowlist. Everything else
+(media files, already encoded bodies) passes through as it is sent, without
+being buffered. Compressed GET bodies are kept in a byte-bounded LRU keyed
+by a digest of the uncompressed bytes, so when hot listing endpoints serve
+the same payload again only a hash is computed, not another compression
+pass. Bodies of ``thread_threshold`` bytes or more are compressed in a
+worker thread, and streamed responses are compressed chunk by chunk.
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+import asyncio
+import gzip
+import hashlib
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "text/plain",
+    "text/html",
+    "text/css",
+    "text/csv",
+    "application/javascript",
+)
+
+
+def accepted_encodings(header: str) -> dict:
+    """Parse Accept-Encoding into {encoding: q}"""
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """The supported encoding with the highest q; brotli wins ties"""
+    encodings = accepted_encodings(header)
+    wildcard = encodings.get("*", 0)
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    best = max(supported, key=lambda name: encodings.get(name, wildcard))
+    return best if encodings.get(best, wildcard) > 0 else None
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 keeps output deterministic, so equal bodies give equal bytes
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compression for responses sent in several chunks"""
+
+    def __init__(self, encoding: str, gzip_level: int = 6, brotli_quality: int = 4):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+            self._flush = self._compressor.finish
+            self._compress = self._compressor.process
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+            self._flush = self._compressor.flush
+            self._compress = self._compressor.compress
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compress(chunk)
+
+    def finish(self) -> bytes:
+        return self._flush()
+
+
+class CompressedBodyCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4, cache_bytes: int = 16 * 1024 * 1024,
+                 thread_threshold: int = 256 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_threshold = thread_threshold
+        self.cache = CompressedBodyCache(cache_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressing = False
+        chunks = []
+        stream = None
+
+        async def buffered_send(message):
+            nonlocal start_message, compressing, stream
+            if message["type"] == "http.response.start":
+                compressing = self._compressible(message.get("headers", []))
+                if compressing:
+                    start_message = message
+                else:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or not compressing:
+                await send(message)
+                return
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if stream is not None:
+                await send({"type": "http.response.body", "more_body": more_body,
+                            "body": stream.compress(body) + (b"" if more_body else stream.finish())})
+                return
+            chunks.append(body)
+            if not more_body:
+                await self._send_response(scope, start_message, b"".join(chunks), encoding, send)
+            elif sum(map(len, chunks)) >= self.minimum_size:
+                # Streamed: compress as it goes rather than holding the whole body
+                stream = StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+                await send({**start_message, "headers": self._encoded_headers(start_message, encoding)})
+                await send({"type": "http.response.body", "body": stream.compress(b"".join(chunks)), "more_body": True})
+                chunks.clear()
+
+        await self.app(scope, receive, buffered_send)
+
+    def _compressible(self, headers) -> bool:
+        content_type = ""
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered == b"content-encoding":
+                return False
+            if lowered == b"content-type":
+                content_type = value.decode("latin-1").split(";")[0].strip().lower()
+            elif lowered == b"content-length" and int(value) < self.minimum_size:
+                return False
+        return content_type in COMPRESSIBLE_TYPES
+
+    def _encoded_headers(self, start_message, encoding: str, length: Optional[int] = None) -> list:
+        headers = list(start_message.get("headers", []))
+        vary = [v for n, v in headers if n.lower() == b"vary"]
+        headers = [(n, v) for n, v in headers if n.lower() not in (b"content-length", b"vary")]
+        headers += [(b"content-encoding", encoding.encode()), (b"vary", b", ".join(vary + [b"Accept-Encoding"]))]
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        return headers
+
+    async def _compress(self, body: bytes, encoding: str) -> bytes:
+        if len(body) >= self.thread_threshold:
+            return await asyncio.to_thread(compress, body, encoding, self.gzip_level, self.brotli_quality)
+        return compress(body, encoding, self.gzip_level, self.brotli_quality)
+
+    async def _send_response(self, scope, start_message, body: bytes, encoding: str, send):
+        if len(body) < self.minimum_size:
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        cacheable = scope["method"] == "GET" and start_message["status"] == 200
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest()) if cacheable else None
+        compressed = self.cache.get(key) if cacheable else None
+        if compressed is None:
+            compressed = await self._compress(body, encoding)
+            if cacheable:
+                self.cache.put(key, compressed)
+
+        await send({**start_message, "headers": self._encoded_headers(start_message, encoding, len(compressed))})
+        await send({"type": "http.response.body", "body": compressed})
@@ -0,0 +1,266 @@
+"""Configuration and state shared by the app factory and the routers.
+
+Importing this module has no side effects beyond reading the environment:
+the Mongo client is created by ``connect()`` (called from ``create_app``),
+and heavy optional dependencies (resend) are imported on first use.
+Names that are rebound at runtime or by tests (``db``, ``client``,
+``send_email``, ``search_index``, ``PAYMENT_WEBHOOK_SECRET``) are read as
+``core.<name>``; everything else can be imported directly.
+"""
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Optional
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+
+from cache import LocalCache, InvalidationBus
+from capture import CaptureWriter
+from images import ImageStore
+from logs import LogPolicy, parse_policies
+from query_budget import QueryBudgetListener
+from search import PrefixIndex
+from ticket_map import TicketMapCache
+from write_buffer import WriteBehindBuffer, BufferFull
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Logging goes through a queue to a writer thread (see logs), set up by
+# create_app. Hot loggers are sampled or rate-limited; LOG_POLICIES entries
+# (logger=sample_rate[:per_second], comma separated) override these.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # or "text"
+LOG_POLICIES = {
+    "uvicorn.access": LogPolicy(per_second=200),
+    "core.email": LogPolicy(sample_rate=0.1, per_second=20),
+    "app": LogPolicy(per_second=20),  # deadline warnings arrive in bursts when Mongo is slow
+    "query_budget": LogPolicy(per_second=5),
+    **parse_policies(os.environ.get('LOG_POLICIES', '')),
+}
+logger = logging.getLogger(__name__)
+email_logger = logger.getChild("email")
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+# Pool sizing and timeouts; unset options keep the driver defaults
+MONGO_CLIENT_OPTIONS = {
+    option: int(os.environ[env])
+    for option, env in (
+        ("maxPoolSize", "MONGO_MAX_POOL_SIZE"),
+        ("minPoolSize", "MONGO_MIN_POOL_SIZE"),
+        ("maxConnecting", "MONGO_MAX_CONNECTING"),
+        ("waitQueueTimeoutMS", "MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        ("serverSelectionTimeoutMS", "MONGO_SERVER_SELECTION_TIMEOUT_MS"),
+        ("connectTimeoutMS", "MONGO_CONNECT_TIMEOUT_MS"),
+    )
+    if os.environ.get(env)
+}
+# Set by connect(); the driver starts its monitor threads as soon as a client exists
+client = None
+db = None
+
+def connect():
+    global client, db
+    if client is None:
+        client = AsyncIOMotorClient(mongo_url, event_listeners=[QueryBudgetListener()], **MONGO_CLIENT_OPTIONS)
+        db = client[os.environ['DB_NAME']]
+    return db
+
+# Every Mongo operation a request makes shares this budget: the driver sends
+# the remaining time as maxTimeMS and fails fast once it runs out, so a slow
+# query can't hold pool connections indefinitely. 0 disables it.
+REQUEST_DB_DEADLINE = float(os.environ.get('REQUEST_DB_DEADLINE_SECONDS', '10'))
+
+# Public listings tolerate replication lag, so they may be served by
+# secondaries. Anything that must see the caller's own writes (auth/me,
+# orders/my, purchase, admin) keeps using db, which reads from the primary.
+# Mongo rejects maxStalenessSeconds below 90.
+READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+PUBLIC_READ_MODE = os.environ.get('PUBLIC_READ_PREFERENCE', 'secondaryPreferred')
+PUBLIC_READ_MAX_STALENESS = int(os.environ.get('PUBLIC_READ_MAX_STALENESS_SECONDS', '90'))
+PUBLIC_READ_PREFERENCE = (
+    READ_PREFERENCES[PUBLIC_READ_MODE](max_staleness=PUBLIC_READ_MAX_STALENESS)
+    if PUBLIC_READ_MODE in READ_PREFERENCES else Primary()
+)
+
+def public_reads(namespace: Optional[str] = None):
+    """db routed by PUBLIC_READ_PREFERENCE, for reads that may be slightly stale.
+
+    Loaders for a local_cache namespace pass it: for PUBLIC_READ_MAX_STALENESS
+    seconds after the namespace was invalidated they read the primary, so a
+    lagging secondary can't put the old data back in the cache.
+    """
+    if namespace is not None and local_cache.invalidated_within(namespace, PUBLIC_READ_MAX_STALENESS):
+        return db
+    return db.with_options(read_preference=PUBLIC_READ_PREFERENCE)
+
+# Expose per-request query counts as X-DB-* response headers (debug only)
+DB_QUERY_DEBUG = os.environ.get('DB_QUERY_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+# Append a redacted sample of /api requests to this NDJSON file, for
+# benchmarks.replay; off when unset
+TRAFFIC_CAPTURE_PATH = os.environ.get('TRAFFIC_CAPTURE_PATH')
+TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.environ.get('TRAFFIC_CAPTURE_SAMPLE_RATE', '0.01'))
+TRAFFIC_CAPTURE_MAX_BODY_BYTES = int(os.environ.get('TRAFFIC_CAPTURE_MAX_BODY_BYTES', '16384'))
+traffic_capture = CaptureWriter(TRAFFIC_CAPTURE_PATH) if TRAFFIC_CAPTURE_PATH else None
+
+# Resend Config
+RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
+SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
+
+# Per-worker cache; writes publish invalidations to the other workers
+local_cache = LocalCache()
+invalidation_bus = InvalidationBus(local_cache, poll_interval=float(os.environ.get('CACHE_INVALIDATION_POLL_SECONDS', '1')))
+USER_CACHE_TTL = 30
+COMPETITION_CACHE_TTL = 5  # bounds how stale tickets_sold can be
+CONTENT_CACHE_TTL = 300
+WINNERS_CACHE_TTL = 60
+
+# Taken ticket numbers per competition, revalidated against the stored
+# version at most this often (purchases retry against a fresh copy on conflict)
+ticket_maps = TicketMapCache(local_cache, refresh_interval=float(os.environ.get('TICKET_MAP_REFRESH_SECONDS', '1')))
+
+# Uploaded competition images: originals plus resized WebP/JPEG variants
+# rendered by a process pool and served from /api/media
+image_store = ImageStore(
+    Path(os.environ.get('IMAGE_STORAGE_DIR', ROOT_DIR / 'media')),
+    widths=[int(w) for w in os.environ.get('IMAGE_WIDTHS', '320,640,1280').split(',')],
+    quality=int(os.environ.get('IMAGE_QUALITY', '80')),
+    workers=int(os.environ.get('IMAGE_WORKERS', '2'))
+)
+IMAGE_MAX_UPLOAD_BYTES = int(os.environ.get('IMAGE_MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))
+
+# Title autocomplete, kept current through "competitions" invalidations
+search_index = PrefixIndex()
+
+# Payment webhook signing secret; without it the webhook is disabled and
+# orders are confirmed directly by the (mocked) checkout flow
+PAYMENT_WEBHOOK_SECRET = os.environ.get('PAYMENT_WEBHOOK_SECRET')
+
+# Unpaid orders hold their ticket numbers and cap slots this long
+ORDER_HOLD = timedelta(minutes=float(os.environ.get('ORDER_HOLD_MINUTES', '15')))
+
+# Contact messages and audit events are written behind the response in
+# batches; a crash loses at most WRITE_BUFFER_MAX_PENDING documents
+WRITE_BUFFER_OPTIONS = dict(
+    max_batch=int(os.environ.get('WRITE_BUFFER_MAX_BATCH', '500')),
+    flush_interval=float(os.environ.get('WRITE_BUFFER_FLUSH_SECONDS', '1')),
+    max_pending=int(os.environ.get('WRITE_BUFFER_MAX_PENDING', '10000'))
+)
+contact_writer = WriteBehindBuffer("contacts", **WRITE_BUFFER_OPTIONS)
+audit_writer = WriteBehindBuffer("audit_log", **WRITE_BUFFER_OPTIONS)
+
+# ==========================
+# HELPER FUNCTIONS
+# ==========================
+
+def parse_datetime(value) -> datetime:
+    """ISO string or naive BSON datetime (stored as UTC) to an aware datetime"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def to_iso(value):
+    if isinstance(value, datetime):
+        return parse_datetime(value).isoformat()
+    return value
+
+def get_competition_status(comp: dict) -> str:
+    if comp.get("winner_id"):
+        return "completed"
+    if comp.get("tickets_sold", 0) >= comp.get("total_tickets", 0):
+        return "sold_out"
+    draw_date = parse_datetime(comp.get("draw_date"))
+    now = datetime.now(timezone.utc)
+    if draw_date <= now:
+        return "completed"
+    time_left = draw_date - now
+    if time_left <= timedelta(hours=24):
+        return "ending_soon"
+    return "live"
+
+COMPETITION_STATUSES = ("live", "ending_soon", "sold_out", "completed")
+# live + ending_soon, i.e. still on sale
+OPEN_STATUS = "open"
+
+def competition_status_query(status: str, now: datetime) -> dict:
+    """Mongo filter equivalent to get_competition_status(comp) == status (needs BSON draw_date)"""
+    no_winner = {"winner_id": {"$in": [None, ""]}}
+    tickets_sold = {"$ifNull": ["$tickets_sold", 0]}
+    sold_out = {"$expr": {"$gte": [tickets_sold, "$total_tickets"]}}
+    not_sold_out = {"$expr": {"$lt": [tickets_sold, "$total_tickets"]}}
+    ending_soon_at = now + timedelta(hours=24)
+    if status == "sold_out":
+        return {**no_winner, **sold_out}
+    if status == "ending_soon":
+        return {**no_winner, **not_sold_out, "draw_date": {"$gt": now, "$lte": ending_soon_at}}
+    if status == "live":
+        return {**no_winner, **not_sold_out, "draw_date": {"$gt": ending_soon_at}}
+    if status == OPEN_STATUS:
+        return {**no_winner, **not_sold_out, "draw_date": {"$gt": now}}
+    if status == "completed":
+        return {"$or": [
+            {"winner_id": {"$nin": [None, ""]}},
+            {**no_winner, **not_sold_out, "draw_date": {"$lte": now}}
+        ]}
+    raise ValueError(f"Unknown competition status: {status}")
+
+async def save_profile(session):
+    if session is None:
+        return None
+    doc = session.to_doc()
+    await db.profiles.insert_one(doc)
+    doc.pop("_id", None)
+    return doc
+
+async def audit(admin: dict, action: str, target: Optional[str] = None, **details):
+    """Record an admin action; never fails the request that performed it"""
+    try:
+        await audit_writer.add({
+            "action": action,
+            "admin_id": admin["user_id"],
+            "target": target,
+            "details": details,
+            "at": datetime.now(timezone.utc)
+        })
+    except BufferFull as e:
+        logger.error(f"Audit event {action} on {target} not recorded: {e}")
+
+_resend = None
+
+def resend_client():
+    """The resend SDK, imported on first send (it pulls in requests)"""
+    global _resend
+    if _resend is None:
+        import resend
+        resend.api_key = RESEND_API_KEY
+        _resend = resend
+    return _resend
+
+async def send_email(to: str, subject: str, html: str):
+    """Send email using Resend (non-blocking)"""
+    try:
+        params = {
+            "from": SENDER_EMAIL,
+            "to": [to],
+            "subject": subject,
+            "html": html
+        }
+        result = await asyncio.to_thread(resend_client().Emails.send, params)
+        email_logger.info("Email sent to %s: %s", to, result)
+        return result
+    except Exception as e:
+        email_logger.error("Failed to send email to %s: %s", to, e)
+        return None
@@ -0,0 +1,72 @@
+"""Per-person ticket caps, enforced with one conditional write.
+
+``entry_counts`` holds one document per (competition, user) with the number
+of tickets the user holds: pending, failed and completed orders, since
+failed orders can still be paid. A purchase reserves its quantity with an
+``$inc`` whose filter only matches while the count stays within the cap, so
+concurrent purchases can't both pass a stale check. Refunds release their
+tickets, and so do unpaid orders once their hold expires (``order_holds``).
+
+A crash between reserving and inserting the order leaves the count too
+high, never too low. ``rebuild_counts`` recomputes a competition from its
+orders, e.g. when a cap is added to a competition that already has sales.
+"""
+from typing import List
+
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+# Order states whose tickets count against the cap
+HELD_STATUSES = ["pending", "failed", "completed"]
+
+
+async def ensure_indexes(db):
+    await db.entry_counts.create_index([("competition_id", 1), ("user_id", 1)], unique=True)
+
+
+async def reserve(db, competition_id: str, user_id: str, quantity: int, cap: int) -> bool:
+    """Add quantity to the user's count; False if that would exceed the cap"""
+    if quantity > cap:
+        return False
+    key = {"competition_id": competition_id, "user_id": user_id}
+    within_cap = {**key, "tickets": {"$lte": cap - quantity}}
+    try:
+        await db.entry_counts.update_one(within_cap, {"$inc": {"tickets": quantity}}, upsert=True)
+        return True
+    except DuplicateKeyError:
+        # The counter exists but didn't match: either over the cap, or another
+        # request created it between our filter and our insert
+        result = await db.entry_counts.update_one(within_cap, {"$inc": {"tickets": quantity}})
+        return result.modified_count == 1
+
+
+async def release(db, orders: List[dict]):
+    """Give back the tickets of orders that no longer hold them"""
+    released = {}
+    for order in orders:
+        key = (order["competition_id"], order["user_id"])
+        released[key] = released.get(key, 0) + order["quantity"]
+    if not released:
+        return
+    # No upsert: uncapped competitions never had a counter
+    await db.entry_counts.bulk_write([
+        UpdateOne({"competition_id": comp_id, "user_id": user_id}, {"$inc": {"tickets": -quantity}})
+        for (comp_id, user_id), quantity in released.items()
+    ], ordered=False)
+
+
+async def rebuild_counts(db, competition_id: str):
+    held = await db.orders.aggregate([
+        {"$match": {"competition_id": competition_id, "payment_status": {"$in": HELD_STATUSES}}},
+        {"$group": {"_id": "$user_id", "tickets": {"$sum": "$quantity"}}}
+    ]).to_list(None)
+    await db.entry_counts.delete_many({"competition_id": competition_id, "user_id": {"$nin": [h["_id"] for h in held]}})
+    if held:
+        await db.entry_counts.bulk_write([
+            ReplaceOne(
+                {"competition_id": competition_id, "user_id": h["_id"]},
+                {"competition_id": competition_id, "user_id": h["_id"], "tickets": h["tickets"]},
+                upsert=True
+            )
+            for h in held
+        ], ordered=False)
@@ -0,0 +1,180 @@
+"""Uploaded competition images and their resized variants.
+
+An upload is stored once under the first 24 hex digits of its SHA-256
+(``originals/<digest>``). It is then rendered to every width in
+``widths`` as WebP and JPEG (``variants/<digest>/<width>.webp|jpg``),
+never upscaled. Rendering runs in a process pool, so Pillow's CPU work
+neither blocks the event loop nor holds the GIL. The pool uses the spawn
+start method, because forking a process that already runs threads
+(logging, Motor) isn't safe. A pool whose worker died (e.g. killed for
+memory) refuses all further work, so it is replaced and the render retried
+once. Uploading the same bytes again is a no-op
+apart from rendering any variants that are missing, e.g. after
+IMAGE_WIDTHS changed.
+
+Variant URLs contain the content digest, so their bytes never change and
+``ImmutableStaticFiles`` serves them with a one-year ``immutable``
+Cache-Control. A competition whose ``image_url`` is one of our variants
+gets the whole set as ``image_variants`` (``ImageStore.variants_for``),
+computed from the URL alone.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List, Optional, Sequence
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import re
+
+from starlette.staticfiles import StaticFiles
+
+URL_PREFIX = "/api/media"
+FORMATS = (("webp", "webp"), ("jpeg", "jpg"))  # (Pillow format, file extension), preferred first
+_VARIANT_URL = re.compile(re.escape(URL_PREFIX) + r"/([0-9a-f]{24})/\d+\.(?:webp|jpg)$")
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:24]
+
+
+def render_variants(original: str, out_dir: str, widths: Sequence[int], quality: int = 80,
+                    max_pixels: int = 40_000_000) -> dict:
+    """Write the missing variants of one original; runs in a pool worker.
+
+    Returns the original's size and the variants (nominal width, format and bytes written)."""
+    # Imported here so importing this module (and so the app) doesn't load Pillow
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with Image.open(original) as source:
+            source = ImageOps.exif_transpose(source)
+            source.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise InvalidImage(str(e)) from None
+    if source.mode not in ("RGB", "RGBA"):
+        source = source.convert("RGBA" if "A" in source.getbands() or "transparency" in source.info else "RGB")
+
+    os.makedirs(out_dir, exist_ok=True)
+    variants = []
+    for width in widths:
+        scaled = None
+        for image_format, extension in FORMATS:
+            path = os.path.join(out_dir, f"{width}.{extension}")
+            if not os.path.exists(path):
+                if scaled is None:
+                    scaled = source if source.width <= width else source.resize(
+                        (width, max(1, round(source.height * width / source.width))), Image.LANCZOS
+                    )
+                image = scaled.convert("RGB") if image_format == "jpeg" and scaled.mode != "RGB" else scaled
+                # Written next to the final name and renamed, so a half-written file is never served
+                partial = f"{path}.{os.getpid()}.partial"
+                image.save(partial, image_format, quality=quality, optimize=image_format == "jpeg",
+                           **({"method": 4} if image_format == "webp" else {}))
+                os.replace(partial, path)
+            variants.append({"width": width, "format": image_format, "bytes": os.path.getsize(path)})
+    return {"width": source.width, "height": source.height, "variants": variants}
+
+
+class ImageStore:
+    def __init__(self, root: Path, widths: Sequence[int] = (320, 640, 1280), quality: int = 80,
+                 workers: int = 2, max_pixels: int = 40_000_000):
+        self.root = Path(root)
+        self.widths = tuple(sorted(widths))
+        self.quality = quality
+        self.workers = workers
+        self.max_pixels = max_pixels
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def variants_dir(self) -> Path:
+        return self.root / "variants"
+
+    def url(self, digest: str, width: int, image_format: str) -> str:
+        return f"{URL_PREFIX}/{digest}/{width}.{dict(FORMATS)[image_format]}"
+
+    def default_url(self, digest: str) -> str:
+        """Largest JPEG: what goes in image_url, for clients that ignore image_variants"""
+        return self.url(digest, self.widths[-1], "jpeg")
+
+    def variants_for(self, image_url: Optional[str]) -> Optional[List[dict]]:
+        """All variants of an uploaded image, given the URL of any of them; None for other URLs"""
+        match = _VARIANT_URL.search(image_url or "")
+        if match is None:
+            return None
+        return [
+            {"url": self.url(match.group(1), width, image_format), "width": width, "format": image_format}
+            for width in self.widths for image_format, _ in FORMATS
+        ]
+
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        # Another upload may already have replaced it
+        if self._pool is pool:
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _render(self, original: Path, digest: str) -> dict:
+        for attempt in range(2):
+            pool = self.pool()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    pool, render_variants, str(original), str(self.variants_dir / digest),
+                    self.widths, self.quality, self.max_pixels
+                )
+            except BrokenProcessPool:
+                self._discard_pool(pool)
+                if attempt:
+                    raise
+
+    async def ingest(self, data: bytes) -> dict:
+        """Store the original and render its variants; InvalidImage if Pillow can't read it"""
+        digest = content_digest(data)
+        original = self.root / "originals" / digest
+        created = await asyncio.to_thread(_write_once, original, data)
+        try:
+            rendered = await self._render(original, digest)
+        except InvalidImage:
+            if created:
+                original.unlink(missing_ok=True)
+            raise
+        for variant in rendered["variants"]:
+            variant["url"] = self.url(digest, variant["width"], variant["format"])
+        return {"image_id": digest, "image_url": self.default_url(digest), "bytes": len(data), **rendered}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def _write_once(path: Path, data: bytes) -> bool:
+    """Write the file unless it exists (same name, same content); whether it was written"""
+    if path.exists():
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f"{path.name}.{os.getpid()}.partial")
+    partial.write_bytes(data)
+    os.replace(partial, path)
+    return True
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static files whose names change with their content, so clients may cache them for good"""
+
+    CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = self.CACHE_CONTROL
+        return response
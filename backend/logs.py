@@ -0,0 +1,164 @@
+"""Logging that stays off the event loop.
+
+Handlers on the loop thread only put records on a queue; a listener thread
+formats them (JSON by default) and writes them out, so a slow or blocked
+stderr never stalls requests. Records are queued unformatted, so
+``logger.info("... %s", value)`` arguments are only rendered if the record
+is actually written. Prefer that over f-strings on hot paths.
+
+Before a record is queued, a per-logger ``LogPolicy`` can sample it (only
+below WARNING) and rate-limit it (any level). The next record that gets
+through carries a ``suppressed`` count, so dropped volume stays visible.
+Policies apply to a logger and its children, e.g. ``core`` covers
+``core.email``.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Dict, Optional
+import json
+import logging
+import random
+import sys
+import threading
+import time
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, plus any extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+@dataclass
+class LogPolicy:
+    sample_rate: float = 1.0  # share of records below WARNING that are kept
+    per_second: Optional[float] = None  # sustained records/second; bursts up to the same number
+
+
+class SamplingFilter(logging.Filter):
+    """Applies the most specific LogPolicy for each record's logger"""
+
+    def __init__(self, policies: Dict[str, LogPolicy]):
+        super().__init__()
+        self.policies = policies
+        self._resolved = {}
+        self._buckets = {}  # policy name -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+
+    def _policy_name(self, logger_name: str) -> Optional[str]:
+        if logger_name not in self._resolved:
+            name = logger_name
+            while name and name not in self.policies:
+                name = name.rpartition(".")[0]
+            self._resolved[logger_name] = name or None
+        return self._resolved[logger_name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        name = self._policy_name(record.name)
+        if name is None:
+            return True
+        policy = self.policies[name]
+        if policy.sample_rate < 1 and record.levelno < logging.WARNING:
+            if random.random() >= policy.sample_rate:
+                return False
+            record.sample_rate = policy.sample_rate
+        if policy.per_second:
+            with self._lock:
+                now = time.monotonic()
+                bucket = self._buckets.setdefault(name, [policy.per_second, now, 0])
+                bucket[0] = min(policy.per_second, bucket[0] + (now - bucket[1]) * policy.per_second)
+                bucket[1] = now
+                if bucket[0] < 1:
+                    bucket[2] += 1
+                    return False
+                bucket[0] -= 1
+                if bucket[2]:
+                    record.suppressed, bucket[2] = bucket[2], 0
+        return True
+
+
+class LocalQueueHandler(QueueHandler):
+    """Queues the record as-is; the listener thread does all the formatting.
+
+    The stock QueueHandler formats on the calling thread so records can be
+    pickled for other processes; this queue never leaves the process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _CurrentStderr:
+    """Whatever sys.stderr is at write time (it may be swapped later, e.g. by pytest)"""
+
+    def write(self, text: str):
+        sys.stderr.write(text)
+
+    def flush(self):
+        sys.stderr.flush()
+
+
+def parse_policies(spec: str) -> Dict[str, LogPolicy]:
+    """``"core.email=0.1,app=1:20"``: logger=sample_rate[:per_second], comma separated"""
+    policies = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        rate, _, per_second = value.partition(":")
+        policies[name.strip()] = LogPolicy(float(rate or 1), float(per_second) if per_second else None)
+    return policies
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", policies: Optional[Dict[str, LogPolicy]] = None,
+                      stream=None) -> QueueListener:
+    """Route the root logger (and uvicorn's loggers) through a queue to a writer thread"""
+    global _listener, _handler
+    stop_logging()
+    output = logging.StreamHandler(stream or _CurrentStderr())
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    queue = SimpleQueue()
+    _handler = LocalQueueHandler(queue)
+    _handler.addFilter(SamplingFilter(policies or {}))
+    _listener = QueueListener(queue, output, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(level)
+    # uvicorn writes its own logs synchronously; send them through the queue as well
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and detach the queue handler"""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
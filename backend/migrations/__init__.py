@@ -0,0 +1,13 @@
+"""One-off data migrations. Run from backend/, e.g. ``python -m migrations.competition_dates``."""
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv(Path(__file__).resolve().parents[1] / '.env')
+
+
+def get_db():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return client, client[os.environ['DB_NAME']]
@@ -0,0 +1,68 @@
+"""Store competitions' draw_date and created_at as BSON dates instead of ISO strings.
+
+Status filters in get_competitions are range queries on draw_date, so they
+only see migrated documents. Each batch selects documents that still hold a
+string, which makes the migration idempotent and safe to resume.
+
+    python -m migrations.competition_dates [--batch-size 500] [--dry-run]
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from migrations import get_db
+
+DATE_FIELDS = ("draw_date", "created_at")
+
+
+def parse_iso(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def migrate(db, batch_size: int, dry_run: bool = False) -> int:
+    pending = {"$or": [{field: {"$type": "string"}} for field in DATE_FIELDS]}
+    projection = {field: 1 for field in DATE_FIELDS}
+    migrated = 0
+    last_id = None
+    while True:
+        query = pending if last_id is None else {**pending, "_id": {"$gt": last_id}}
+        batch = await db.competitions.find(query, projection).sort("_id", 1).to_list(batch_size)
+        if not batch:
+            return migrated
+        last_id = batch[-1]["_id"]
+        updates = []
+        for doc in batch:
+            fields = {}
+            for field in DATE_FIELDS:
+                if isinstance(doc.get(field), str):
+                    try:
+                        fields[field] = parse_iso(doc[field])
+                    except ValueError:
+                        print(f"Skipping {doc['_id']}: unparseable {field} {doc[field]!r}")
+            if fields:
+                updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        if updates and not dry_run:
+            await db.competitions.bulk_write(updates, ordered=False)
+        migrated += len(updates)
+        print(f"{'Would migrate' if dry_run else 'Migrated'} {migrated} competitions")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    client, db = get_db()
+    try:
+        await migrate(db, args.batch_size, args.dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
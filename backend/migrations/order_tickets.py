@@ -0,0 +1,59 @@
+"""Repack orders' ticket_numbers arrays into the compact ticket_pack field.
+
+Readers accept both formats (``tickets.order_tickets``), so this can run
+while the app is serving. Each batch selects orders that still have the
+array, which makes the migration idempotent and safe to resume.
+
+    python -m migrations.order_tickets [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import asyncio
+
+import bson
+from pymongo import UpdateOne
+
+from migrations import get_db
+from tickets import LEGACY_FIELD, PACK_FIELD, encode_tickets
+
+
+async def migrate(db, batch_size: int, dry_run: bool = False) -> dict:
+    pending = {LEGACY_FIELD: {"$exists": True}}
+    stats = {"orders": 0, "bytes_before": 0, "bytes_after": 0}
+    last_id = None
+    while True:
+        query = pending if last_id is None else {**pending, "_id": {"$gt": last_id}}
+        batch = await db.orders.find(query, {LEGACY_FIELD: 1}).sort("_id", 1).to_list(batch_size)
+        if not batch:
+            return stats
+        last_id = batch[-1]["_id"]
+        updates = []
+        for doc in batch:
+            packed = encode_tickets(doc[LEGACY_FIELD])
+            stats["bytes_before"] += len(bson.encode({LEGACY_FIELD: doc[LEGACY_FIELD]}))
+            stats["bytes_after"] += len(bson.encode({PACK_FIELD: packed}))
+            # Guard on the array we read, in case the order changed since
+            updates.append(UpdateOne(
+                {"_id": doc["_id"], LEGACY_FIELD: doc[LEGACY_FIELD]},
+                {"$set": {PACK_FIELD: packed}, "$unset": {LEGACY_FIELD: ""}}
+            ))
+        if not dry_run:
+            await db.orders.bulk_write(updates, ordered=False)
+        stats["orders"] += len(updates)
+        print(f"{'Would repack' if dry_run else 'Repacked'} {stats['orders']} orders "
+              f"({stats['bytes_before']} -> {stats['bytes_after']} ticket bytes)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    client, db = get_db()
+    try:
+        await migrate(db, args.batch_size, args.dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
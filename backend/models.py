@@ -0,0 +1,331 @@
+"""Request and response models for the API."""
+from functools import lru_cache
+from typing import Annotated, FrozenSet, List, Optional, Literal, Type, Union
+
+from pydantic import AfterValidator, BaseModel, Field, ConfigDict, WithJsonSchema, create_model, field_validator, model_validator
+from pydantic.networks import validate_email
+
+import core
+from core import to_iso
+from tickets import PACK_FIELD, order_tickets
+
+# Same checks as EmailStr, but email_validator is only imported by the first request that sends an address
+Email = Annotated[str, AfterValidator(lambda value: validate_email(value)[1]),
+                  WithJsonSchema({"type": "string", "format": "email"})]
+
+# User Models
+class UserCreate(BaseModel):
+    email: Email
+    password: str = Field(min_length=6)
+    full_name: str = Field(min_length=2)
+    phone: Optional[str] = None
+
+class UserLogin(BaseModel):
+    email: Email
+    password: str
+
+class UserResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    user_id: str
+    email: str
+    full_name: str
+    phone: Optional[str] = None
+    role: str = "user"
+    email_verified: bool = False
+    created_at: str
+
+class UserProfileUpdate(BaseModel):
+    full_name: Optional[str] = None
+    phone: Optional[str] = None
+
+# Auth Response
+class AuthResponse(BaseModel):
+    token: str
+    user: UserResponse
+
+# Competition Models
+class CompetitionCreate(BaseModel):
+    title: str
+    description: str
+    category: str  # cars, electronics, cash
+    prize_value: float
+    ticket_price: float
+    total_tickets: int
+    draw_date: str  # ISO format
+    image_url: str
+    featured: bool = False
+    auto_draw: bool = True
+    is_visible: bool = True
+    max_tickets_per_user: Optional[int] = Field(default=None, ge=1)
+    queue_rate: Optional[float] = Field(default=None, gt=0)  # buyers admitted per second; None means no waiting room
+
+class CompetitionUpdate(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    category: Optional[str] = None
+    prize_value: Optional[float] = None
+    ticket_price: Optional[float] = None
+    total_tickets: Optional[int] = None
+    draw_date: Optional[str] = None
+    image_url: Optional[str] = None
+    featured: Optional[bool] = None
+    auto_draw: Optional[bool] = None
+    is_visible: Optional[bool] = None
+    max_tickets_per_user: Optional[int] = Field(default=None, ge=1)
+    queue_rate: Optional[float] = Field(default=None, gt=0)
+
+class BulkCreate(BaseModel):
+    op: Literal["create"]
+    data: CompetitionCreate
+
+class BulkUpdate(BaseModel):
+    op: Literal["update"]
+    competition_id: str
+    data: CompetitionUpdate
+
+class BulkDelete(BaseModel):
+    op: Literal["delete"]
+    competition_id: str
+
+class BulkSetVisibility(BaseModel):
+    op: Literal["set_visibility"]
+    competition_id: str
+    is_visible: bool
+
+# Validated (and documented) per op; a malformed item rejects the request with 422
+BulkCompetitionOperation = Annotated[
+    Union[BulkCreate, BulkUpdate, BulkDelete, BulkSetVisibility], Field(discriminator="op")
+]
+
+class BulkCompetitionRequest(BaseModel):
+    operations: List[BulkCompetitionOperation] = Field(min_length=1, max_length=500)
+
+class BulkItemResult(BaseModel):
+    index: int
+    op: str
+    competition_id: Optional[str] = None
+    status: str  # created, updated, deleted, not_found, invalid, error
+    detail: Optional[str] = None
+
+class ImageVariant(BaseModel):
+    url: str
+    width: int  # nominal; images narrower than this aren't upscaled
+    format: str  # webp or jpeg
+
+class ImageUpload(BaseModel):
+    image_id: str
+    image_url: str  # use as a competition's image_url
+    width: int
+    height: int
+    bytes: int
+    variants: List[ImageVariant]
+
+def with_image_variants(model: type, data):
+    """Fill image_variants from image_url, when the model has it and the URL is one of our uploads"""
+    if isinstance(data, dict) and "image_variants" in model.model_fields and "image_variants" not in data:
+        data = {**data, "image_variants": core.image_store.variants_for(data.get("image_url"))}
+    return data
+
+class CompetitionResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    competition_id: str
+    title: str
+    description: str
+    category: str
+    prize_value: float
+    ticket_price: float
+    total_tickets: int
+    tickets_sold: int = 0
+    draw_date: str
+    image_url: str
+    featured: bool
+    auto_draw: bool
+    is_visible: bool
+    max_tickets_per_user: Optional[int] = None
+    queue_rate: Optional[float] = None
+    status: str  # live, ending_soon, sold_out, completed
+    winner_id: Optional[str] = None
+    winner_ticket: Optional[int] = None
+    created_at: str
+    image_variants: Optional[List[ImageVariant]] = None  # only for uploaded images
+    
+    @field_validator("draw_date", "created_at", mode="before")
+    @classmethod
+    def _datetime_to_iso(cls, value):
+        return to_iso(value)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _image_variants(cls, data):
+        return with_image_variants(cls, data)
+
+class CompetitionFields(BaseModel):
+    """Base of the slimmer competition views; only fields that were asked for are loaded and sent"""
+    model_config = ConfigDict(extra="ignore")
+    competition_id: str
+
+    @field_validator("draw_date", "created_at", mode="before", check_fields=False)
+    @classmethod
+    def _datetime_to_iso(cls, value):
+        return to_iso(value)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _image_variants(cls, data):
+        return with_image_variants(cls, data)
+
+class CompetitionSummary(CompetitionFields):
+    """List/card view (?view=summary): no description or admin settings"""
+    title: str
+    category: str
+    prize_value: float
+    ticket_price: float
+    total_tickets: int
+    tickets_sold: int = 0
+    draw_date: str
+    image_url: str
+    image_variants: Optional[List[ImageVariant]] = None
+    featured: bool
+    status: str
+
+@lru_cache(maxsize=128)
+def competition_fields_model(fields: FrozenSet[str]) -> Type[CompetitionFields]:
+    """Model with just these CompetitionResponse fields (plus competition_id), for ?fields="""
+    return create_model("CompetitionFields", __base__=CompetitionFields, **{
+        name: (info.annotation, info) for name, info in CompetitionResponse.model_fields.items() if name in fields
+    })
+
+# Ticket/Order Models
+class TicketPurchase(BaseModel):
+    competition_id: str
+    quantity: int = Field(ge=1, le=100)
+    # Specific numbers instead of random ones; one per ticket
+    ticket_numbers: Optional[List[int]] = Field(default=None, min_length=1, max_length=100)
+    
+    @model_validator(mode="after")
+    def _check_ticket_numbers(self):
+        numbers = self.ticket_numbers
+        if numbers is not None:
+            if len(numbers) != self.quantity or len(set(numbers)) != len(numbers):
+                raise ValueError("ticket_numbers must list quantity distinct numbers")
+            if min(numbers) < 1:
+                raise ValueError("ticket numbers start at 1")
+        return self
+
+class BasketItem(BaseModel):
+    competition_id: str
+    quantity: int = Field(ge=1, le=100)
+
+class BasketPurchase(BaseModel):
+    items: List[BasketItem] = Field(min_length=1, max_length=20)
+
+class OrderResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    order_id: str
+    user_id: str
+    competition_id: str
+    ticket_numbers: List[int]
+    quantity: int
+    total_price: float
+    payment_status: str  # pending, completed, failed, refunded, expired
+    payment_id: Optional[str] = None
+    created_at: str
+    hold_expires_at: Optional[str] = None  # unpaid orders give their tickets back after this
+    
+    @field_validator("hold_expires_at", mode="before")
+    @classmethod
+    def _datetime_to_iso(cls, value):
+        return to_iso(value)
+    
+    @model_validator(mode="before")
+    @classmethod
+    def unpack_tickets(cls, data):
+        if isinstance(data, dict) and PACK_FIELD in data:
+            data = {**data, "ticket_numbers": order_tickets(data)}
+        return data
+
+class TicketAvailability(BaseModel):
+    """Either the whole map (bitmap) or, for ?since=, the numbers that changed"""
+    competition_id: str
+    version: int
+    total_tickets: Optional[int] = None
+    taken: Optional[int] = None
+    bitmap: Optional[str] = None  # zlib + base64; bit n - 1, least significant first, is ticket n
+    claimed: Optional[List[int]] = None
+    released: Optional[List[int]] = None
+
+class QueueStatus(BaseModel):
+    competition_id: str
+    token: Optional[str] = None  # only when joining; send it as X-Queue-Token
+    admitted: bool
+    expired: bool
+    position: int  # buyers still ahead
+    eta_seconds: float
+
+class BasketResponse(BaseModel):
+    basket_id: str
+    orders: List[OrderResponse]
+    total_price: float
+
+# Winner Model
+class WinnerResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    winner_id: str
+    competition_id: str
+    competition_title: str
+    user_id: str
+    user_name: str
+    winning_ticket: int
+    prize_value: float
+    drawn_at: str
+
+class WinnersPage(BaseModel):
+    items: List[WinnerResponse]
+    next_cursor: Optional[str] = None
+
+class WinnerStats(BaseModel):
+    total_winners: int
+    total_prize_value: float
+    month: str
+    winners_this_month: int
+    prize_value_this_month: float
+
+# Payment Models (Viva Payments - MOCKED)
+class PaymentCreateRequest(BaseModel):
+    order_id: str
+    amount: float
+    customer_email: str
+    customer_name: str
+
+class PaymentResponse(BaseModel):
+    payment_id: str
+    order_code: str
+    checkout_url: str
+    status: str
+
+# Admin Stats
+class AdminStats(BaseModel):
+    total_users: int
+    total_competitions: int
+    active_competitions: int
+    total_orders: int
+    total_revenue: float
+    tickets_sold_today: int
+
+# Profiling Models
+class ProfileStart(BaseModel):
+    path_prefix: str = "/api"
+    sample_rate: float = Field(default=1.0, gt=0, le=1)
+    duration_seconds: int = Field(default=60, ge=1, le=3600)
+    interval_ms: float = Field(default=5, ge=1, le=100)
+    max_requests: Optional[int] = Field(default=None, ge=1)
+
+# Contact/FAQ Models
+class FAQItem(BaseModel):
+    question: str
+    answer: str
+
+class ContactMessage(BaseModel):
+    name: str
+    email: Email
+    message: str
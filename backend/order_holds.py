@@ -0,0 +1,98 @@
+"""Expiry of unpaid orders, so abandoned checkouts give their tickets back.
+
+A new order holds its ticket numbers (``ticket_map``) and its share of the
+per-person cap (``entry_caps``) until ``hold_expires_at``. ``HoldSweeper``
+moves pending and failed orders still unpaid by then to ``expired`` and
+releases both. The status change is a guarded batch write, so an order that
+is paid at the same moment is either completed or expired, never both, and
+two sweepers never release the same order twice. Orders from before holds
+had an expiry time are expired ``hold`` after ``created_at``.
+
+A crash between expiring orders and releasing them leaves their numbers
+taken and their caps counted, never handed out twice;
+``entry_caps.rebuild_counts`` repairs the caps.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+import asyncio
+import logging
+import uuid
+
+import entry_caps
+import ticket_map
+
+logger = logging.getLogger(__name__)
+
+# Unpaid order states that still hold tickets until their hold expires
+UNPAID_STATUSES = ["pending", "failed"]
+
+
+def expired_holds(now: datetime, hold: timedelta) -> dict:
+    return {
+        "payment_status": {"$in": UNPAID_STATUSES},
+        "$or": [
+            {"hold_expires_at": {"$lt": now}},
+            # created_at is an ISO string, which sorts like the time it holds
+            {"hold_expires_at": {"$exists": False}, "created_at": {"$lt": (now - hold).isoformat()}},
+        ]
+    }
+
+
+async def ensure_indexes(db):
+    await db.orders.create_index([("payment_status", 1), ("hold_expires_at", 1)])
+
+
+async def expire_orders(db, hold: timedelta, limit: int = 500, now: Optional[datetime] = None) -> List[dict]:
+    """Expire up to limit unpaid orders past their hold and release their tickets"""
+    due = expired_holds(now or datetime.now(timezone.utc), hold)
+    candidates = await db.orders.find(due, {"_id": 0, "order_id": 1}).to_list(limit)
+    if not candidates:
+        return []
+    order_ids = [c["order_id"] for c in candidates]
+    expire_batch = uuid.uuid4().hex
+    # Re-check the hold in the update so a payment landing meanwhile wins
+    await db.orders.update_many(
+        {"order_id": {"$in": order_ids}, **due},
+        {"$set": {"payment_status": "expired", "expire_batch": expire_batch}}
+    )
+    expired = await db.orders.find({"order_id": {"$in": order_ids}, "expire_batch": expire_batch}, {"_id": 0}).to_list(None)
+    await entry_caps.release(db, expired)
+    await ticket_map.release(db, expired)
+    return expired
+
+
+class HoldSweeper:
+    def __init__(self, hold: timedelta, interval: float = 60.0, batch_size: int = 500):
+        self.hold = hold
+        self.interval = interval
+        self.batch_size = batch_size
+        self.db = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db):
+        self.db = db
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                expired = await expire_orders(self.db, self.hold, self.batch_size)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Expiring unpaid orders failed: {e}")
+                expired = []
+            if expired:
+                logger.info("Expired %d unpaid orders", len(expired))
+            # A full batch means more are probably waiting
+            if len(expired) < self.batch_size:
+                await asyncio.sleep(self.interval)
@@ -0,0 +1,277 @@
+"""Payment webhook ingestion and batched order confirmation.
+
+The webhook handler only verifies the signature and inserts the raw event
+into ``payment_events`` (unique on ``event_id``, so provider retries are
+no-ops), then acks. ``PaymentEventWorker`` drains pending events in batches,
+moving orders out of pending with guarded batch writes and applying all
+ticket counter increments in one ``bulk_write`` per batch. Confirmed orders
+carry a ``counter_pending`` marker until that write lands, so a worker that
+dies in between leaves them for ``reconcile_ticket_counts`` to recount.
+Completed events whose amount doesn't match the order's ``total_price``
+are rejected and leave the order unpaid; those for orders that can no
+longer be paid (expired or unknown) are recorded as unmatched.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, List, Optional
+import asyncio
+import hashlib
+import hmac
+import logging
+import uuid
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+import order_holds
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+EVENT_COMPLETED = "payment.completed"
+EVENT_FAILED = "payment.failed"
+
+# Viva Wallet event type ids mapped to our event types
+VIVA_EVENT_TYPES = {1796: EVENT_COMPLETED, 1798: EVENT_FAILED}
+
+# Events claimed by a worker that died are retried after this long
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    if not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+def normalize_event(body: dict) -> Optional[dict]:
+    """Map our generic event shape or a Viva notification to one event dict"""
+    if "event_id" in body:
+        event_id = body.get("event_id")
+        event_type = body.get("type")
+        order_id = body.get("order_id")
+        payment_id = body.get("payment_id")
+        amount = body.get("amount")
+    else:
+        data = body.get("EventData") or {}
+        event_id = data.get("TransactionId")
+        event_type = VIVA_EVENT_TYPES.get(body.get("EventTypeId"))
+        order_id = data.get("MerchantTrns")
+        payment_id = data.get("TransactionId")
+        amount = data.get("Amount")
+    if not event_id or not event_type or not order_id:
+        return None
+    return {
+        "event_id": str(event_id),
+        "type": event_type,
+        "order_id": order_id,
+        "payment_id": payment_id,
+        "amount": amount
+    }
+
+
+def amount_matches(amount, total_price: float) -> bool:
+    """Whether a paid amount covers the order's total, to the cent"""
+    try:
+        return round(float(amount), 2) == round(total_price, 2)
+    except (TypeError, ValueError):
+        return False
+
+
+async def ensure_indexes(db):
+    await db.payment_events.create_index("event_id", unique=True)
+    await db.payment_events.create_index([("status", ASCENDING), ("received_at", ASCENDING)])
+    await db.orders.create_index("order_id", unique=True)
+
+
+async def ingest_event(db, event: dict, raw: dict) -> bool:
+    """Persist a webhook event; returns False if it was already received"""
+    try:
+        await db.payment_events.insert_one({
+            **event,
+            "raw": raw,
+            "status": "pending",
+            "received_at": datetime.now(timezone.utc)
+        })
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def apply_ticket_counts(db, orders: List[dict]):
+    """Add newly completed orders to their competitions' tickets_sold in one bulk_write"""
+    tickets_by_comp = {}
+    for order in orders:
+        comp_id = order["competition_id"]
+        tickets_by_comp[comp_id] = tickets_by_comp.get(comp_id, 0) + order["quantity"]
+    if not tickets_by_comp:
+        return
+    await db.competitions.bulk_write([
+        UpdateOne({"competition_id": comp_id}, {"$inc": {"tickets_sold": quantity}})
+        for comp_id, quantity in tickets_by_comp.items()
+    ], ordered=False)
+
+
+class PaymentEventWorker:
+    def __init__(self, batch_size: int = 500, poll_interval: float = 1.0,
+                 on_confirmed: Optional[Callable[[List[dict]], Awaitable[None]]] = None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.on_confirmed = on_confirmed
+        self.db = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db):
+        self.db = db
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Payment event batch failed: {e}")
+                processed = 0
+            # A full batch means more are probably waiting
+            if processed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _claim_batch(self) -> List[dict]:
+        db = self.db
+        now = datetime.now(timezone.utc)
+        claimable = {"$or": [
+            {"status": "pending"},
+            {"status": "processing", "claimed_at": {"$lt": now - CLAIM_TIMEOUT}}
+        ]}
+        candidates = await db.payment_events.find(claimable, {"_id": 0, "event_id": 1}) \
+            .sort("received_at", 1).to_list(self.batch_size)
+        if not candidates:
+            return []
+        claim_id = uuid.uuid4().hex
+        # Re-check the status in the update so two workers never claim the same event
+        await db.payment_events.update_many(
+            {"event_id": {"$in": [c["event_id"] for c in candidates]}, **claimable},
+            {"$set": {"status": "processing", "claim_id": claim_id, "claimed_at": now}}
+        )
+        return await db.payment_events.find(
+            {"event_id": {"$in": [c["event_id"] for c in candidates]}, "claim_id": claim_id},
+            {"_id": 0, "raw": 0}
+        ).to_list(None)
+
+    async def _check_amounts(self, events: List[dict]):
+        """Completed events by order_id, and those whose amount doesn't match their order"""
+        if not events:
+            return {}, []
+        totals = {
+            o["order_id"]: o["total_price"] for o in await self.db.orders.find(
+                {"order_id": {"$in": [e["order_id"] for e in events]}}, {"_id": 0, "order_id": 1, "total_price": 1}
+            ).to_list(None)
+        }
+        completed, rejected = {}, []
+        for event in events:
+            if event["order_id"] in totals and not amount_matches(event.get("amount"), totals[event["order_id"]]):
+                rejected.append(event)
+            else:
+                completed[event["order_id"]] = event
+        return completed, rejected
+
+    async def _unpayable(self, order_ids: set) -> set:
+        """Orders a completed event didn't confirm that aren't already paid either"""
+        if not order_ids:
+            return set()
+        paid = await self.db.orders.find(
+            {"order_id": {"$in": list(order_ids)}, "payment_status": "completed"}, {"_id": 0, "order_id": 1}
+        ).to_list(None)
+        return order_ids - {o["order_id"] for o in paid}
+
+    async def process_batch(self) -> int:
+        events = await self._claim_batch()
+        if not events:
+            return 0
+        db = self.db
+        batch_id = uuid.uuid4().hex
+        failed = [e["order_id"] for e in events if e["type"] == EVENT_FAILED]
+        completed, rejected = await self._check_amounts([e for e in events if e["type"] == EVENT_COMPLETED])
+
+        confirmed_orders = []
+        unmatched_orders = set()
+        if completed:
+            # Only unpaid orders transition, so replays and manual confirms never double count
+            await db.orders.bulk_write([
+                UpdateOne(
+                    {"order_id": order_id, "payment_status": {"$in": order_holds.UNPAID_STATUSES}},
+                    {"$set": {"payment_status": "completed", "payment_id": event.get("payment_id"),
+                              "confirm_batch": batch_id, "counter_pending": datetime.now(timezone.utc)}}
+                )
+                for order_id, event in completed.items()
+            ], ordered=False)
+            confirmed_orders = await db.orders.find(
+                {"order_id": {"$in": list(completed)}, "confirm_batch": batch_id}, {"_id": 0}
+            ).to_list(None)
+            await apply_ticket_counts(db, confirmed_orders)
+            await db.orders.update_many(
+                {"order_id": {"$in": list(completed)}, "confirm_batch": batch_id},
+                {"$unset": {"counter_pending": ""}}
+            )
+            unmatched_orders = await self._unpayable(set(completed) - {o["order_id"] for o in confirmed_orders})
+        if failed:
+            await db.orders.update_many(
+                {"order_id": {"$in": failed}, "payment_status": "pending"},
+                {"$set": {"payment_status": "failed"}}
+            )
+
+        rejected_ids = {e["event_id"] for e in rejected}
+        if rejected:
+            logger.error(f"Payment amount mismatch for orders {sorted(e['order_id'] for e in rejected)}")
+            await db.payment_events.update_many(
+                {"event_id": {"$in": list(rejected_ids)}},
+                {"$set": {"status": "rejected", "error": "amount_mismatch", "processed_at": datetime.now(timezone.utc)},
+                 "$unset": {"claim_id": ""}}
+            )
+        unmatched_ids = {
+            e["event_id"] for e in events
+            if e["type"] == EVENT_COMPLETED and e["order_id"] in unmatched_orders and e["event_id"] not in rejected_ids
+        }
+        if unmatched_ids:
+            logger.error(f"Payment completed for orders that can't be paid {sorted(unmatched_orders)}")
+            await db.payment_events.update_many(
+                {"event_id": {"$in": list(unmatched_ids)}},
+                {"$set": {"status": "unmatched", "error": "order_not_payable", "processed_at": datetime.now(timezone.utc)},
+                 "$unset": {"claim_id": ""}}
+            )
+        await db.payment_events.update_many(
+            {"event_id": {"$in": [e["event_id"] for e in events if e["event_id"] not in rejected_ids | unmatched_ids]}},
+            {"$set": {"status": "processed", "processed_at": datetime.now(timezone.utc)},
+             "$unset": {"claim_id": ""}}
+        )
+        if confirmed_orders and self.on_confirmed:
+            try:
+                await self.on_confirmed(confirmed_orders)
+            except Exception as e:
+                logger.error(f"Payment confirmation callback failed: {e}")
+        return len(events)
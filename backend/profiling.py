@@ -0,0 +1,175 @@
+"""Admin-triggered sampling profiler.
+
+While a session is active, a background thread samples the event loop
+thread's stack every few milliseconds during profiled requests and folds the
+samples into collapsed-stack lines ("frame;frame;frame count") that
+flamegraph.pl and speedscope read directly. With no session the middleware
+costs one attribute check per request. The sampler thread also ends the
+session once it expires, or once ``max_requests`` requests were profiled and
+none is still running, and hands it to ``on_done`` on the event loop (the
+app stores it).
+
+Sessions are per process: with several workers each one profiles the
+requests it serves and stores its own result.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Optional
+import asyncio
+import os
+import random
+import sys
+import threading
+import uuid
+
+# Deep recursion is rare here; cap stacks so one sample can't bloat the profile
+MAX_STACK_DEPTH = 128
+# Keeps the stored document well under Mongo's 16MB limit
+MAX_STACK_LINES = 20000
+
+
+@dataclass
+class ProfileSession:
+    profile_id: str
+    path_prefix: str
+    sample_rate: float
+    interval: float
+    started_at: datetime
+    expires_at: datetime
+    max_requests: Optional[int] = None
+    created_by: Optional[str] = None
+    requests_profiled: int = 0
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+
+    def expired(self) -> bool:
+        return datetime.now(timezone.utc) >= self.expires_at
+
+    def is_full(self) -> bool:
+        return self.max_requests is not None and self.requests_profiled >= self.max_requests
+
+    def is_done(self) -> bool:
+        return self.expired() or self.is_full()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common(MAX_STACK_LINES))
+
+    def to_doc(self) -> dict:
+        return {
+            "profile_id": self.profile_id,
+            "path_prefix": self.path_prefix,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "max_requests": self.max_requests,
+            "created_by": self.created_by,
+            "pid": os.getpid(),
+            "started_at": self.started_at.isoformat(),
+            "ended_at": datetime.now(timezone.utc).isoformat(),
+            "requests_profiled": self.requests_profiled,
+            "samples": self.samples,
+            "collapsed": self.collapsed()
+        }
+
+
+def collapse_frame(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Profiler:
+    def __init__(self):
+        self.session: Optional[ProfileSession] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._target_thread_id: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._on_done: Optional[Callable[[ProfileSession], Awaitable]] = None
+        self._finishing = set()
+
+    def start(self, path_prefix: str, sample_rate: float, duration_seconds: int,
+              interval_ms: float, max_requests: Optional[int] = None,
+              created_by: Optional[str] = None,
+              on_done: Optional[Callable[[ProfileSession], Awaitable]] = None) -> ProfileSession:
+        """Start a session; must be called on the event loop whose requests are profiled"""
+        if self.session is not None:
+            raise RuntimeError("A profiling session is already running")
+        now = datetime.now(timezone.utc)
+        session = ProfileSession(
+            profile_id=f"prof_{uuid.uuid4().hex[:12]}",
+            path_prefix=path_prefix,
+            sample_rate=sample_rate,
+            interval=interval_ms / 1000,
+            started_at=now,
+            expires_at=now + timedelta(seconds=duration_seconds),
+            max_requests=max_requests,
+            created_by=created_by
+        )
+        # Requests run on the event loop thread, which is the one calling start()
+        self._target_thread_id = threading.get_ident()
+        self._loop = asyncio.get_running_loop()
+        self._on_done = on_done
+        # Each sampler gets its own stop event, so a stopped one can't outlive its session
+        self._stop = threading.Event()
+        self.session = session
+        threading.Thread(target=self._run, args=(session, self._stop), name="profile-sampler", daemon=True).start()
+        return session
+
+    def stop(self) -> Optional[ProfileSession]:
+        """End the session; the sampler exits at its next wakeup, without being waited for"""
+        session, self.session = self.session, None
+        self._stop.set()
+        return session
+
+    def should_profile(self, path: str) -> bool:
+        session = self.session
+        if session is None or not path.startswith(session.path_prefix) or session.is_done():
+            return False
+        return random.random() < session.sample_rate
+
+    @contextmanager
+    def sampling(self):
+        session = self.session
+        with self._lock:
+            self._in_flight += 1
+            if session is not None:
+                session.requests_profiled += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _finish(self, session: ProfileSession):
+        """Runs on the event loop: end the session unless it was stopped meanwhile, then hand it over"""
+        if self.session is not session:
+            return
+        self.stop()
+        if self._on_done is not None:
+            task = asyncio.ensure_future(self._on_done(session))
+            self._finishing.add(task)
+            task.add_done_callback(self._finishing.discard)
+
+    def _run(self, session: ProfileSession, stop: threading.Event):
+        while not stop.wait(session.interval):
+            if session.expired() or (session.is_full() and self._in_flight == 0):
+                try:
+                    self._loop.call_soon_threadsafe(self._finish, session)
+                except RuntimeError:
+                    pass  # the loop already closed, e.g. at shutdown
+                return
+            if self._in_flight == 0:
+                continue
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is None:
+                continue
+            session.stacks[collapse_frame(frame)] += 1
+            session.samples += 1
+
+
+profiler = Profiler()
@@ -0,0 +1,121 @@
+"""Per-request MongoDB query budget tracking.
+
+A pymongo ``CommandListener`` feeds every command into the ``QueryBudget``
+stored in a context variable, so each request (or test block) sees only the
+round-trips it caused. Motor copies the context into its executor threads,
+which is what makes the context variable visible to the listener.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+import logging
+
+import bson
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Same command shape repeated this many times in one request is reported as N+1
+REPEAT_THRESHOLD = 3
+
+# Commands issued by the driver itself that should not count against a budget
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions", "killCursors"}
+
+_current_budget: ContextVar[Optional["QueryBudget"]] = ContextVar("query_budget", default=None)
+
+
+@dataclass
+class QueryBudget:
+    commands: int = 0
+    documents: int = 0
+    bytes: int = 0
+    shapes: Dict[Tuple, int] = field(default_factory=dict)
+    parent: Optional["QueryBudget"] = None
+
+    def record_command(self, shape: Tuple):
+        budget = self
+        while budget is not None:
+            budget.commands += 1
+            budget.shapes[shape] = budget.shapes.get(shape, 0) + 1
+            budget = budget.parent
+
+    def record_reply(self, documents: int, size: int):
+        budget = self
+        while budget is not None:
+            budget.documents += documents
+            budget.bytes += size
+            budget = budget.parent
+
+    def repeated_shapes(self, threshold: int = REPEAT_THRESHOLD) -> Dict[Tuple, int]:
+        return {shape: count for shape, count in self.shapes.items() if count >= threshold}
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-DB-Commands": str(self.commands),
+            "X-DB-Documents": str(self.documents),
+            "X-DB-Bytes": str(self.bytes),
+        }
+
+
+def command_shape(command_name: str, command: dict) -> Tuple:
+    """Collection plus filter keys, so repeated lookups with different values match"""
+    collection = command.get(command_name)
+    query = command.get("filter") or command.get("query") or {}
+    if command_name in ("update", "delete") and command.get(f"{command_name}s"):
+        query = command[f"{command_name}s"][0].get("q", {})
+    if not isinstance(collection, str):
+        collection = None
+    return (command_name, collection, tuple(sorted(query.keys())) if isinstance(query, dict) else ())
+
+
+def reply_document_count(reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if cursor:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if reply.get("value") is not None:
+        return 1
+    return 0
+
+
+class QueryBudgetListener(monitoring.CommandListener):
+    def started(self, event):
+        budget = _current_budget.get()
+        if budget is None or event.command_name in IGNORED_COMMANDS:
+            return
+        budget.record_command(command_shape(event.command_name, event.command))
+
+    def succeeded(self, event):
+        budget = _current_budget.get()
+        if budget is None or event.command_name in IGNORED_COMMANDS:
+            return
+        budget.record_reply(reply_document_count(event.reply), len(bson.encode(event.reply)))
+
+    def failed(self, event):
+        pass
+
+
+@contextmanager
+def track_queries():
+    """Collect query stats for the enclosed block; nests inside an outer budget"""
+    budget = QueryBudget(parent=_current_budget.get())
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def report_repeats(budget: QueryBudget, label: str):
+    for shape, count in budget.repeated_shapes().items():
+        logger.warning("Possible N+1 in %s: %s on %s by %s ran %d times", label, shape[0], shape[1], list(shape[2]), count)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """Pytest helper: fail if the enclosed block issues more than ``limit`` commands"""
+    with track_queries() as budget:
+        yield budget
+    assert budget.commands <= limit, (
+        f"Expected at most {limit} database commands, got {budget.commands}: {budget.shapes}"
+    )
@@ -0,0 +1 @@
+"""API routers, mounted under /api by ``app.create_app``."""
@@ -0,0 +1,379 @@
+"""Admin dashboard: stats, competition management, draws, users, orders and profiling."""
+from datetime import datetime, timezone
+from typing import List, Optional
+import secrets
+import uuid
+
+from fastapi import APIRouter, HTTPException, Depends, File, Query, UploadFile
+from fastapi.responses import PlainTextResponse
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
+
+import archive
+import core
+import entry_caps
+import ticket_map
+from core import audit, get_competition_status, invalidation_bus, parse_datetime, save_profile
+from images import InvalidImage
+from models import (
+    AdminStats, BulkCompetitionRequest, BulkItemResult, CompetitionCreate, CompetitionResponse,
+    CompetitionUpdate, ImageUpload, OrderResponse, ProfileStart, UserResponse
+)
+from profiling import profiler
+from routers.competitions import (
+    FIELDS_QUERY, CompetitionView, competition_projection, competition_view, competitions_response, record_winner_stats
+)
+from routers.orders import transition_order
+from security import require_admin
+from tickets import TICKET_PROJECTION, order_tickets
+
+router = APIRouter()
+
+# ==========================
+# ADMIN ENDPOINTS
+# ==========================
+
+@router.get("/admin/stats", response_model=AdminStats)
+async def get_admin_stats(admin: dict = Depends(require_admin)):
+    total_users = await core.db.users.count_documents({})
+    total_competitions = await core.db.competitions.count_documents({})
+    active_competitions = await core.db.competitions.count_documents({"is_visible": True})
+    
+    # Order count, revenue and today's tickets in a single aggregation
+    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    order_stats = await core.db.orders.aggregate([
+        {"$match": {"payment_status": "completed"}},
+        {"$group": {
+            "_id": None,
+            "total_orders": {"$sum": 1},
+            "total_revenue": {"$sum": "$total_price"},
+            "tickets_today": {"$sum": {"$cond": [
+                {"$gte": ["$created_at", today_start.isoformat()]}, "$quantity", 0
+            ]}}
+        }}
+    ]).to_list(1)
+    order_stats = order_stats[0] if order_stats else {}
+    # Archived orders are counted from per-competition totals kept by the archiver
+    archived = await archive.archived_totals(core.db)
+    total_orders = order_stats.get("total_orders", 0) + archived["orders"]
+    total_revenue = order_stats.get("total_revenue", 0) + archived["revenue"]
+    tickets_today = order_stats.get("tickets_today", 0)
+    
+    return AdminStats(
+        total_users=total_users,
+        total_competitions=total_competitions,
+        active_competitions=active_competitions,
+        total_orders=total_orders,
+        total_revenue=total_revenue,
+        tickets_sold_today=tickets_today
+    )
+
+def parse_draw_date(value: str) -> datetime:
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="draw_date must be an ISO 8601 datetime")
+
+def build_competition_doc(comp: CompetitionCreate) -> dict:
+    return {
+        "competition_id": f"comp_{uuid.uuid4().hex[:12]}",
+        **comp.model_dump(),
+        "draw_date": parse_draw_date(comp.draw_date),
+        "tickets_sold": 0,
+        "status": "live",
+        "created_at": datetime.now(timezone.utc)
+    }
+
+def build_competition_update(updates: CompetitionUpdate) -> dict:
+    update_data = {k: v for k, v in updates.model_dump().items() if v is not None}
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No updates provided")
+    if "draw_date" in update_data:
+        update_data["draw_date"] = parse_draw_date(update_data["draw_date"])
+    return update_data
+
+@router.post("/admin/competitions", response_model=CompetitionResponse)
+async def create_competition(comp: CompetitionCreate, admin: dict = Depends(require_admin)):
+    comp_doc = build_competition_doc(comp)
+    competition_id = comp_doc["competition_id"]
+    
+    await core.db.competitions.insert_one(comp_doc)
+    await invalidation_bus.publish("competitions", changed=[competition_id])
+    await audit(admin, "competition.create", competition_id)
+    comp_doc["status"] = get_competition_status(comp_doc)
+    return CompetitionResponse(**comp_doc)
+
+@router.put("/admin/competitions/{competition_id}", response_model=CompetitionResponse)
+async def update_competition(competition_id: str, updates: CompetitionUpdate, admin: dict = Depends(require_admin)):
+    update_data = build_competition_update(updates)
+    
+    result = await core.db.competitions.update_one({"competition_id": competition_id}, {"$set": update_data})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Competition not found")
+    
+    if "max_tickets_per_user" in update_data:
+        await entry_caps.rebuild_counts(core.db, competition_id)
+    await invalidation_bus.publish("competitions", changed=[competition_id])
+    await audit(admin, "competition.update", competition_id, fields=sorted(update_data))
+    comp = await core.db.competitions.find_one({"competition_id": competition_id}, {"_id": 0})
+    comp["status"] = get_competition_status(comp)
+    return CompetitionResponse(**comp)
+
+@router.delete("/admin/competitions/{competition_id}")
+async def delete_competition(competition_id: str, admin: dict = Depends(require_admin)):
+    result = await core.db.competitions.delete_one({"competition_id": competition_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Competition not found")
+    await invalidation_bus.publish("competitions", changed=[competition_id])
+    await audit(admin, "competition.delete", competition_id)
+    return {"message": "Competition deleted"}
+
+@router.post("/admin/competitions/bulk", response_model=List[BulkItemResult])
+async def bulk_competitions(request: BulkCompetitionRequest, admin: dict = Depends(require_admin)):
+    """Apply many creates/updates/deletes/visibility toggles with one unordered bulk_write"""
+    results = [BulkItemResult(index=i, op=o.op, competition_id=getattr(o, "competition_id", None), status="pending")
+               for i, o in enumerate(request.operations)]
+    
+    # One read tells us which targets exist, since bulk_write only reports totals
+    target_ids = [o.competition_id for o in request.operations if o.op != "create"]
+    existing = await core.db.competitions.find({"competition_id": {"$in": target_ids}}, {"_id": 0, "competition_id": 1}).to_list(None) if target_ids else []
+    existing_ids = {c["competition_id"] for c in existing}
+    
+    writes, write_items, targeted, recount = [], [], set(), set()
+    for result, operation in zip(results, request.operations):
+        try:
+            if operation.op == "create":
+                doc = build_competition_doc(operation.data)
+                result.competition_id = doc["competition_id"]
+                writes.append(InsertOne(doc))
+                result.status = "created"
+            else:
+                if operation.competition_id in targeted:
+                    raise HTTPException(status_code=400, detail="Competition targeted twice in one batch")
+                targeted.add(operation.competition_id)
+                if operation.competition_id not in existing_ids:
+                    result.status = "not_found"
+                    continue
+                target = {"competition_id": operation.competition_id}
+                if operation.op == "update":
+                    update_data = build_competition_update(operation.data)
+                    writes.append(UpdateOne(target, {"$set": update_data}))
+                    if "max_tickets_per_user" in update_data:
+                        recount.add(operation.competition_id)
+                    result.status = "updated"
+                elif operation.op == "delete":
+                    writes.append(DeleteOne(target))
+                    result.status = "deleted"
+                else:
+                    writes.append(UpdateOne(target, {"$set": {"is_visible": operation.is_visible}}))
+                    result.status = "updated"
+            write_items.append(result)
+        except HTTPException as e:
+            result.status = "invalid"
+            result.detail = e.detail
+    
+    if writes:
+        try:
+            await core.db.competitions.bulk_write(writes, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed = write_items[error["index"]]
+                failed.status = "error"
+                failed.detail = error.get("errmsg")
+        changed = [r.competition_id for r in write_items if r.status != "error"]
+        for comp_id in recount.intersection(changed):
+            await entry_caps.rebuild_counts(core.db, comp_id)
+        if changed:
+            await invalidation_bus.publish("competitions", changed=changed)
+            await audit(admin, "competition.bulk", operations=[
+                {"op": r.op, "competition_id": r.competition_id, "status": r.status} for r in write_items
+            ])
+    
+    return results
+
+@router.get("/admin/competitions", response_model=List[CompetitionResponse])
+async def admin_get_all_competitions(admin: dict = Depends(require_admin), view: CompetitionView = "full",
+                                     fields: Optional[str] = FIELDS_QUERY):
+    model = competition_view(view, fields)
+    competitions = await core.db.competitions.find({}, competition_projection(model)).sort("created_at", -1).to_list(100)
+    result = []
+    for comp in competitions:
+        comp["status"] = get_competition_status(comp)
+        result.append((model or CompetitionResponse)(**comp))
+    return competitions_response(result, model)
+
+@router.post("/admin/images", response_model=ImageUpload)
+async def upload_image(file: UploadFile = File(...), admin: dict = Depends(require_admin)):
+    """Store an image and render its variants; use the returned image_url on a competition"""
+    data = await file.read(core.IMAGE_MAX_UPLOAD_BYTES + 1)
+    if len(data) > core.IMAGE_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    try:
+        image = await core.image_store.ingest(data)
+    except InvalidImage:
+        raise HTTPException(status_code=400, detail="Unsupported or corrupt image")
+    await core.db.images.update_one({"_id": image["image_id"]}, {
+        "$set": {"width": image["width"], "height": image["height"], "bytes": image["bytes"],
+                 "content_type": file.content_type, "filename": file.filename},
+        "$setOnInsert": {"uploaded_by": admin["user_id"], "created_at": datetime.now(timezone.utc)}
+    }, upsert=True)
+    await audit(admin, "image.upload", image["image_id"])
+    return ImageUpload(**image)
+
+def pick_winning_entry(orders: List[dict]) -> tuple:
+    """Random draw (cryptographically secure), uniform over every ticket sold.
+    
+    Returns the winning order and the index of the winning ticket within it.
+    """
+    pick = secrets.randbelow(sum(order["quantity"] for order in orders))
+    for order in orders:
+        if pick < order["quantity"]:
+            return order, pick
+        pick -= order["quantity"]
+
+@router.post("/admin/competitions/{competition_id}/draw")
+async def draw_winner(competition_id: str, admin: dict = Depends(require_admin)):
+    """Manually draw a winner for a competition"""
+    comp = await core.db.competitions.find_one({"competition_id": competition_id}, {"_id": 0})
+    if not comp:
+        raise HTTPException(status_code=404, detail="Competition not found")
+    
+    if comp.get("winner_id"):
+        raise HTTPException(status_code=400, detail="Winner already drawn")
+    
+    # Quantities are enough to pick the winning entry; only the winning order's tickets are read
+    orders = await core.db.orders.find(
+        {"competition_id": competition_id, "payment_status": "completed"},
+        {"_id": 0, "order_id": 1, "user_id": 1, "quantity": 1}
+    ).to_list(None)
+    
+    if not orders:
+        raise HTTPException(status_code=400, detail="No tickets sold yet")
+    
+    order, pick = pick_winning_entry(orders)
+    winning_order = await core.db.orders.find_one({"order_id": order["order_id"]}, {"_id": 0, **TICKET_PROJECTION})
+    winning_entry = {"user_id": order["user_id"], "ticket": order_tickets(winning_order)[pick]}
+    winning_user = await core.db.users.find_one({"user_id": winning_entry["user_id"]}, {"_id": 0})
+    
+    # Claim the draw; of two concurrent draws only one records a winner and counts it in the stats
+    claimed = await core.db.competitions.find_one_and_update(
+        {"competition_id": competition_id, "winner_id": {"$in": [None, ""]}},
+        {"$set": {"winner_id": winning_entry["user_id"], "winner_ticket": winning_entry["ticket"]}}
+    )
+    if claimed is None:
+        raise HTTPException(status_code=400, detail="Winner already drawn")
+    await invalidation_bus.publish("competitions", changed=[competition_id])
+    
+    # Create winner record
+    winner_id = f"win_{uuid.uuid4().hex[:12]}"
+    winner_doc = {
+        "winner_id": winner_id,
+        "competition_id": competition_id,
+        "competition_title": comp["title"],
+        "user_id": winning_entry["user_id"],
+        "user_name": winning_user.get("full_name", "Anonymous"),
+        "winning_ticket": winning_entry["ticket"],
+        "prize_value": comp["prize_value"],
+        "drawn_at": datetime.now(timezone.utc).isoformat()
+    }
+    await core.db.winners.insert_one(dict(winner_doc))  # keep _id out of the response
+    await record_winner_stats(winner_doc)
+    await audit(admin, "competition.draw", competition_id, winner_id=winner_id,
+                user_id=winning_entry["user_id"], ticket=winning_entry["ticket"])
+    
+    # Send winner notification email
+    if winning_user:
+        await core.send_email(
+            to=winning_user["email"],
+            subject=f"🎉 Congratulations! You Won - {comp['title']}!",
+            html=f"""
+            <h1>🎉 CONGRATULATIONS!</h1>
+            <p>Hi {winning_user['full_name']},</p>
+            <p>We are thrilled to inform you that you are the WINNER of:</p>
+            <h2>{comp['title']}</h2>
+            <p><strong>Prize Value:</strong> £{comp['prize_value']:,.2f}</p>
+            <p><strong>Winning Ticket:</strong> #{winning_entry['ticket']}</p>
+            <p>Our team will be in touch shortly to arrange delivery of your prize.</p>
+            <p>Thank you for playing with x67 Digital!</p>
+            """
+        )
+    
+    return {"message": "Winner drawn", "winner": winner_doc}
+
+@router.get("/admin/users", response_model=List[UserResponse])
+async def admin_get_users(admin: dict = Depends(require_admin)):
+    users = await core.db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(1000)
+    return [UserResponse(**u) for u in users]
+
+@router.get("/admin/orders", response_model=List[OrderResponse])
+async def admin_get_orders(include_archived: bool = False, admin: dict = Depends(require_admin)):
+    orders = await archive.find_orders(core.db, {}, sort=[("created_at", -1)], limit=1000, include_archived=include_archived)
+    return [OrderResponse(**o) for o in orders]
+
+@router.post("/admin/orders/{order_id}/refund")
+async def refund_order(order_id: str, admin: dict = Depends(require_admin)):
+    order = await transition_order(
+        {"order_id": order_id, "payment_status": "completed"},
+        {"payment_status": "refunded"},
+        tickets_delta_sign=-1
+    )
+    if not order:
+        if not await core.db.orders.find_one({"order_id": order_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(status_code=400, detail="Order not eligible for refund")
+    
+    await entry_caps.release(core.db, [order])
+    await ticket_map.release(core.db, [order])
+    await audit(admin, "order.refund", order_id, amount=order.get("total_price"))
+    return {"message": "Order refunded"}
+
+@router.put("/admin/users/{user_id}/role")
+async def update_user_role(user_id: str, role: str = Query(...), admin: dict = Depends(require_admin)):
+    if role not in ["user", "admin"]:
+        raise HTTPException(status_code=400, detail="Invalid role")
+    
+    result = await core.db.users.update_one({"user_id": user_id}, {"$set": {"role": role}})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    await invalidation_bus.publish("users", user_id)
+    await audit(admin, "user.role", user_id, role=role)
+    
+    return {"message": f"User role updated to {role}"}
+
+@router.post("/admin/profiling")
+async def start_profiling(options: ProfileStart, admin: dict = Depends(require_admin)):
+    """Profile matching requests on this worker until the window or request cap runs out"""
+    if profiler.session is not None:
+        if not profiler.session.is_done():
+            raise HTTPException(status_code=409, detail="A profiling session is already running")
+        await save_profile(profiler.stop())
+    session = profiler.start(
+        path_prefix=options.path_prefix,
+        sample_rate=options.sample_rate,
+        duration_seconds=options.duration_seconds,
+        interval_ms=options.interval_ms,
+        max_requests=options.max_requests,
+        created_by=admin["user_id"],
+        on_done=save_profile
+    )
+    return {"profile_id": session.profile_id, "expires_at": session.expires_at.isoformat()}
+
+@router.delete("/admin/profiling")
+async def stop_profiling(admin: dict = Depends(require_admin)):
+    doc = await save_profile(profiler.stop())
+    if not doc:
+        raise HTTPException(status_code=404, detail="No profiling session running")
+    doc.pop("collapsed")
+    return doc
+
+@router.get("/admin/profiling")
+async def list_profiles(admin: dict = Depends(require_admin)):
+    return await core.db.profiles.find({}, {"_id": 0, "collapsed": 0}).sort("started_at", -1).to_list(50)
+
+@router.get("/admin/profiling/{profile_id}/collapsed", response_class=PlainTextResponse)
+async def get_profile_stacks(profile_id: str, admin: dict = Depends(require_admin)):
+    """Collapsed stacks for flamegraph.pl or speedscope"""
+    profile = await core.db.profiles.find_one({"profile_id": profile_id}, {"_id": 0, "collapsed": 1})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile["collapsed"]
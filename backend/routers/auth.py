@@ -0,0 +1,216 @@
+"""Registration, login, Google sessions and the caller's profile."""
+from datetime import datetime, timezone, timedelta
+import logging
+import secrets
+import uuid
+
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from pymongo import ReturnDocument
+
+import core
+from core import invalidation_bus
+from models import UserCreate, UserLogin, UserResponse, UserProfileUpdate, AuthResponse
+from security import hash_password, verify_password, create_token, get_current_user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# ==========================
+# AUTH ENDPOINTS
+# ==========================
+
+@router.post("/auth/register", response_model=AuthResponse)
+async def register(user_data: UserCreate):
+    # Check if email exists
+    existing = await core.db.users.find_one({"email": user_data.email}, {"_id": 0})
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    
+    user_id = f"user_{uuid.uuid4().hex[:12]}"
+    now = datetime.now(timezone.utc).isoformat()
+    
+    user_doc = {
+        "user_id": user_id,
+        "email": user_data.email,
+        "password_hash": hash_password(user_data.password),
+        "full_name": user_data.full_name,
+        "phone": user_data.phone,
+        "role": "user",
+        "email_verified": False,
+        "created_at": now
+    }
+    
+    await core.db.users.insert_one(user_doc)
+    
+    # Send welcome email
+    await core.send_email(
+        to=user_data.email,
+        subject="Welcome to x67 Digital!",
+        html=f"""
+        <h1>Welcome to x67 Digital!</h1>
+        <p>Hi {user_data.full_name},</p>
+        <p>Thank you for joining x67 Digital - the UK's premier competition platform!</p>
+        <p>Start entering competitions today for your chance to win amazing prizes.</p>
+        <p>Good luck!</p>
+        <p>The x67 Digital Team</p>
+        """
+    )
+    
+    token = create_token(user_id)
+    user_response = UserResponse(
+        user_id=user_id,
+        email=user_data.email,
+        full_name=user_data.full_name,
+        phone=user_data.phone,
+        role="user",
+        email_verified=False,
+        created_at=now
+    )
+    
+    return AuthResponse(token=token, user=user_response)
+
+@router.post("/auth/login", response_model=AuthResponse)
+async def login(credentials: UserLogin):
+    user = await core.db.users.find_one({"email": credentials.email}, {"_id": 0})
+    if not user or not verify_password(credentials.password, user.get("password_hash", "")):
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    
+    token = create_token(user["user_id"], user.get("role", "user"))
+    user_response = UserResponse(
+        user_id=user["user_id"],
+        email=user["email"],
+        full_name=user["full_name"],
+        phone=user.get("phone"),
+        role=user.get("role", "user"),
+        email_verified=user.get("email_verified", False),
+        created_at=user["created_at"]
+    )
+    
+    return AuthResponse(token=token, user=user_response)
+
+@router.get("/auth/me", response_model=UserResponse)
+async def get_me(user: dict = Depends(get_current_user)):
+    return UserResponse(
+        user_id=user["user_id"],
+        email=user["email"],
+        full_name=user["full_name"],
+        phone=user.get("phone"),
+        role=user.get("role", "user"),
+        email_verified=user.get("email_verified", False),
+        created_at=user["created_at"]
+    )
+
+# Emergent Google OAuth Session Endpoint
+@router.post("/auth/session")
+async def process_google_session(request: Request, response: Response):
+    """Process Google OAuth session from Emergent Auth"""
+    body = await request.json()
+    session_id = body.get("session_id")
+    
+    if not session_id:
+        raise HTTPException(status_code=400, detail="session_id required")
+    
+    # Call Emergent Auth to get session data
+    import httpx  # only this endpoint needs it; keeps it out of worker boot
+    try:
+        async with httpx.AsyncClient() as client:
+            auth_response = await client.get(
+                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
+                headers={"X-Session-ID": session_id},
+                timeout=30.0
+            )
+            if auth_response.status_code != 200:
+                raise HTTPException(status_code=401, detail="Invalid session")
+            
+            session_data = auth_response.json()
+    except Exception as e:
+        logger.error(f"Error fetching session data: {e}")
+        raise HTTPException(status_code=500, detail="Authentication failed")
+    
+    email = session_data.get("email")
+    name = session_data.get("name")
+    picture = session_data.get("picture")
+    
+    # Find or create user
+    user = await core.db.users.find_one({"email": email}, {"_id": 0})
+    
+    if not user:
+        user_id = f"user_{uuid.uuid4().hex[:12]}"
+        now = datetime.now(timezone.utc).isoformat()
+        user = {
+            "user_id": user_id,
+            "email": email,
+            "full_name": name,
+            "picture": picture,
+            "role": "user",
+            "email_verified": True,
+            "created_at": now
+        }
+        await core.db.users.insert_one(user)
+    else:
+        user_id = user["user_id"]
+        # Update name/picture if changed
+        await core.db.users.update_one(
+            {"user_id": user_id},
+            {"$set": {"full_name": name, "picture": picture}}
+        )
+        await invalidation_bus.publish("users", user_id)
+    
+    # Create session token
+    session_token = secrets.token_urlsafe(32)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    
+    await core.db.user_sessions.insert_one({
+        "user_id": user_id,
+        "session_token": session_token,
+        "expires_at": expires_at.isoformat(),
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+    
+    # Set httpOnly cookie
+    response.set_cookie(
+        key="session_token",
+        value=session_token,
+        httponly=True,
+        secure=True,
+        samesite="none",
+        path="/",
+        max_age=7 * 24 * 60 * 60
+    )
+    
+    return {
+        "user_id": user_id,
+        "email": email,
+        "full_name": name,
+        "picture": picture,
+        "role": user.get("role", "user")
+    }
+
+@router.post("/auth/logout")
+async def logout(request: Request, response: Response):
+    session_token = request.cookies.get("session_token")
+    if session_token:
+        await core.db.user_sessions.delete_one({"session_token": session_token})
+    response.delete_cookie("session_token", path="/")
+    return {"message": "Logged out"}
+
+@router.put("/auth/profile", response_model=UserResponse)
+async def update_profile(profile: UserProfileUpdate, user: dict = Depends(get_current_user)):
+    update_data = {}
+    if profile.full_name:
+        update_data["full_name"] = profile.full_name
+    if profile.phone:
+        update_data["phone"] = profile.phone
+    
+    if not update_data:
+        return UserResponse(**user)
+    
+    updated_user = await core.db.users.find_one_and_update(
+        {"user_id": user["user_id"]},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    await invalidation_bus.publish("users", user["user_id"])
+    return UserResponse(**updated_user)
@@ -0,0 +1,279 @@
+"""Public competition listings, search and winners."""
+from datetime import datetime, timezone
+from typing import List, Literal, Optional, Type
+import base64
+import json
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse
+from pymongo import ReplaceOne, UpdateOne
+
+import core
+from core import (
+    COMPETITION_CACHE_TTL, COMPETITION_STATUSES, OPEN_STATUS, WINNERS_CACHE_TTL,
+    competition_status_query, get_competition_status, invalidation_bus, local_cache, public_reads
+)
+from models import (
+    CompetitionFields, CompetitionResponse, CompetitionSummary, TicketAvailability, WinnerResponse, WinnersPage,
+    WinnerStats, competition_fields_model
+)
+
+router = APIRouter()
+
+# ==========================
+# COMPETITION ENDPOINTS
+# ==========================
+
+# Stored fields get_competition_status reads, loaded whatever view was asked for
+STATUS_INPUTS = ("winner_id", "tickets_sold", "total_tickets", "draw_date")
+# Response fields that aren't stored, and what they're computed from
+COMPUTED_FIELDS = {"status": (), "image_variants": ("image_url",)}
+
+CompetitionView = Literal["full", "summary"]
+FIELDS_QUERY = Query(None, max_length=500, description="Comma-separated CompetitionResponse fields to return")
+
+def competition_view(view: str, fields: Optional[str]) -> Optional[Type[CompetitionFields]]:
+    """The slimmer model for ?view=summary or ?fields=a,b; None means the full CompetitionResponse"""
+    if not fields:
+        return CompetitionSummary if view == "summary" else None
+    if view != "full":
+        raise HTTPException(status_code=400, detail="Use either fields or view, not both")
+    names = frozenset(filter(None, (name.strip() for name in fields.split(","))))
+    unknown = names - CompetitionResponse.model_fields.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return competition_fields_model(names)
+
+def competition_projection(model: Optional[Type[CompetitionFields]]) -> dict:
+    """Load only what the view returns, plus what computed fields (and status) need"""
+    if model is None:
+        return {"_id": 0}
+    names = {*STATUS_INPUTS}
+    for name in model.model_fields:
+        names.update(COMPUTED_FIELDS.get(name, (name,)))
+    return {"_id": 0, **{name: 1 for name in sorted(names)}}
+
+def competitions_response(competitions: list, model: Optional[Type[CompetitionFields]]):
+    """Full views go through response_model; slimmer ones are serialized here, as they'd fail its validation"""
+    if model is None:
+        return competitions
+    return JSONResponse([comp.model_dump(mode="json") for comp in competitions])
+
+@router.get("/competitions", response_model=List[CompetitionResponse])
+async def get_competitions(
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    featured: Optional[bool] = None,
+    limit: int = Query(100, ge=1, le=100),
+    view: CompetitionView = "full",
+    fields: Optional[str] = FIELDS_QUERY
+):
+    """Visible competitions; ?view=summary or ?fields= return (and load) fewer fields"""
+    model = competition_view(view, fields)
+    if status and status not in COMPETITION_STATUSES:
+        return []
+    query = {"is_visible": True}
+    if category:
+        query["category"] = category
+    if featured is not None:
+        query["featured"] = featured
+    if status:
+        query.update(competition_status_query(status, datetime.now(timezone.utc)))
+    
+    projection = competition_projection(model)
+    competitions = await local_cache.get_or_load(
+        "competitions", ("list", category, featured, status, limit, tuple(projection)), COMPETITION_CACHE_TTL,
+        lambda: public_reads("competitions").competitions.find(query, projection).sort("draw_date", 1).to_list(limit)
+    )
+    
+    result = []
+    for comp in map(dict, competitions):
+        comp["status"] = get_competition_status(comp)
+        if status and comp["status"] != status:
+            continue
+        result.append((model or CompetitionResponse)(**comp))
+    
+    return competitions_response(result, model)
+
+@router.get("/competitions/featured", response_model=List[CompetitionResponse])
+async def get_featured_competitions():
+    competitions = await local_cache.get_or_load(
+        "competitions", ("featured",), COMPETITION_CACHE_TTL,
+        lambda: public_reads("competitions").competitions.find(
+            {"is_visible": True, "featured": True, **competition_status_query(OPEN_STATUS, datetime.now(timezone.utc))},
+            {"_id": 0}
+        ).sort("draw_date", 1).to_list(10)
+    )
+    
+    result = []
+    for comp in map(dict, competitions):
+        comp["status"] = get_competition_status(comp)
+        if comp["status"] in ["live", "ending_soon"]:
+            result.append(CompetitionResponse(**comp))
+    
+    return result
+
+async def refresh_search_index(changed: Optional[list] = None):
+    """Apply competition changes to the autocomplete index; None rebuilds it"""
+    projection = {"_id": 0, "competition_id": 1, "title": 1, "is_visible": 1}
+    if changed is None:
+        docs = await core.db.competitions.find({"is_visible": True}, projection).to_list(None)
+        core.search_index.rebuild(docs)
+        return
+    docs = await core.db.competitions.find({"competition_id": {"$in": changed}}, projection).to_list(None)
+    for comp_id in changed:
+        core.search_index.remove(comp_id)
+    for doc in docs:
+        if doc.get("is_visible"):
+            core.search_index.add(doc["competition_id"], doc["title"])
+
+invalidation_bus.subscribe("competitions", refresh_search_index)
+
+@router.get("/competitions/search", response_model=List[CompetitionResponse])
+async def search_competitions(
+    q: str = Query(..., min_length=2, max_length=100),
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=50)
+):
+    query = {"$text": {"$search": q}, "is_visible": True}
+    if category:
+        query["category"] = category
+    competitions = await core.db.competitions.find(
+        query, {"_id": 0, "score": {"$meta": "textScore"}}
+    ).sort([("score", {"$meta": "textScore"})]).to_list(limit)
+    
+    result = []
+    for comp in competitions:
+        comp["status"] = get_competition_status(comp)
+        result.append(CompetitionResponse(**comp))
+    return result
+
+@router.get("/competitions/autocomplete")
+async def autocomplete_competitions(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(8, ge=1, le=20)):
+    if not core.search_index.ready:
+        await refresh_search_index()
+    return core.search_index.complete(q, limit)
+
+async def load_competition(competition_id: str) -> dict:
+    comp = await local_cache.get_or_load(
+        "competitions", competition_id, COMPETITION_CACHE_TTL,
+        lambda: core.db.competitions.find_one({"competition_id": competition_id}, {"_id": 0})
+    )
+    if not comp:
+        raise HTTPException(status_code=404, detail="Competition not found")
+    return comp
+
+@router.get("/competitions/{competition_id}", response_model=CompetitionResponse)
+async def get_competition(competition_id: str):
+    comp = dict(await load_competition(competition_id))
+    comp["status"] = get_competition_status(comp)
+    return CompetitionResponse(**comp)
+
+@router.get("/competitions/{competition_id}/tickets", response_model=TicketAvailability, response_model_exclude_none=True)
+async def get_ticket_availability(competition_id: str, since: Optional[int] = Query(None, ge=0)):
+    """Taken ticket numbers as a compressed bitmap, for picking numbers.
+    
+    Pass a previous response's version as ``since`` to get only the numbers
+    claimed or released after it; when that's too far back, the whole map is
+    returned instead.
+    """
+    comp = await load_competition(competition_id)
+    current = await core.ticket_maps.get(core.db, comp)
+    if since is not None:
+        delta = current.delta(since)
+        if delta is not None:
+            return delta
+    return current.payload()
+
+# ==========================
+# WINNERS ENDPOINTS
+# ==========================
+
+def encode_winner_cursor(winner: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps([winner["drawn_at"], winner["winner_id"]]).encode()).decode()
+
+def decode_winner_cursor(cursor: str) -> tuple:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        position = None
+    # Anything but the [drawn_at, winner_id] pair we issued is rejected, not queried
+    if not isinstance(position, list) or len(position) != 2 or not all(isinstance(p, str) for p in position):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(position)
+
+async def load_winners_page(limit: int, cursor: Optional[str] = None) -> dict:
+    query = {}
+    if cursor:
+        drawn_at, winner_id = decode_winner_cursor(cursor)
+        query = {"$or": [
+            {"drawn_at": {"$lt": drawn_at}},
+            {"drawn_at": drawn_at, "winner_id": {"$lt": winner_id}}
+        ]}
+    # One extra row tells us whether there is a next page
+    winners = await public_reads().winners.find(query, {"_id": 0}).sort([("drawn_at", -1), ("winner_id", -1)]).to_list(limit + 1)
+    next_cursor = encode_winner_cursor(winners[limit - 1]) if len(winners) > limit else None
+    return {"items": winners[:limit], "next_cursor": next_cursor}
+
+def winner_month(drawn_at: str) -> str:
+    return drawn_at[:7]
+
+async def record_winner_stats(winner_doc: dict):
+    """Fold one draw into the running totals instead of re-aggregating winners"""
+    inc = {"winners": 1, "prize_value": winner_doc["prize_value"]}
+    await core.db.winner_stats.bulk_write([
+        UpdateOne({"_id": "totals"}, {"$inc": inc}, upsert=True),
+        UpdateOne({"_id": f"month:{winner_month(winner_doc['drawn_at'])}"}, {"$inc": inc}, upsert=True)
+    ], ordered=False)
+    await invalidation_bus.publish("winners")
+
+async def rebuild_winner_stats():
+    """Recompute the running totals from the winners collection (seeding or repair)"""
+    totals = await core.db.winners.aggregate([
+        {"$group": {
+            "_id": {"$substrBytes": ["$drawn_at", 0, 7]},
+            "winners": {"$sum": 1},
+            "prize_value": {"$sum": "$prize_value"}
+        }}
+    ]).to_list(None)
+    docs = [{"_id": f"month:{t['_id']}", "winners": t["winners"], "prize_value": t["prize_value"]} for t in totals]
+    docs.append({
+        "_id": "totals",
+        "winners": sum(t["winners"] for t in totals),
+        "prize_value": sum(t["prize_value"] for t in totals)
+    })
+    await core.db.winner_stats.bulk_write([ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs], ordered=False)
+    await invalidation_bus.publish("winners")
+
+async def load_winner_stats() -> dict:
+    month = winner_month(datetime.now(timezone.utc).isoformat())
+    stats = await core.db.winner_stats.find({"_id": {"$in": ["totals", f"month:{month}"]}}).to_list(2)
+    if not any(s["_id"] == "totals" for s in stats):
+        await rebuild_winner_stats()
+        stats = await core.db.winner_stats.find({"_id": {"$in": ["totals", f"month:{month}"]}}).to_list(2)
+    by_id = {s["_id"]: s for s in stats}
+    totals = by_id.get("totals", {})
+    this_month = by_id.get(f"month:{month}", {})
+    return {
+        "total_winners": totals.get("winners", 0),
+        "total_prize_value": totals.get("prize_value", 0),
+        "month": month,
+        "winners_this_month": this_month.get("winners", 0),
+        "prize_value_this_month": this_month.get("prize_value", 0)
+    }
+
+@router.get("/winners", response_model=List[WinnerResponse])
+async def get_winners():
+    page = await local_cache.get_or_load("winners", ("page", 50, None), WINNERS_CACHE_TTL, lambda: load_winners_page(50))
+    return [WinnerResponse(**w) for w in page["items"]]
+
+@router.get("/winners/feed", response_model=WinnersPage)
+async def get_winners_feed(cursor: Optional[str] = None, limit: int = Query(20, ge=1, le=100)):
+    """Keyset-paginated winners, newest first; pass next_cursor back for the next page"""
+    if cursor:
+        return await load_winners_page(limit, cursor)
+    return await local_cache.get_or_load("winners", ("page", limit, None), WINNERS_CACHE_TTL, lambda: load_winners_page(limit))
+
+@router.get("/winners/stats", response_model=WinnerStats)
+async def get_winner_stats():
+    return await local_cache.get_or_load("winners", "stats", WINNERS_CACHE_TTL, load_winner_stats)
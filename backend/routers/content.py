@@ -0,0 +1,266 @@
+"""FAQ, terms and privacy pages, the contact form and demo seeding."""
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+import uuid
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+
+import core
+from core import CONTENT_CACHE_TTL, contact_writer, invalidation_bus, local_cache, public_reads
+from models import FAQItem, ContactMessage
+from routers.competitions import rebuild_winner_stats
+from security import hash_password, require_admin
+from write_buffer import BufferFull
+
+router = APIRouter()
+
+# ==========================
+# CONTENT ENDPOINTS (FAQ, Terms, etc.)
+# ==========================
+
+async def load_content(content_type: str) -> Optional[dict]:
+    return await local_cache.get_or_load(
+        "content", content_type, CONTENT_CACHE_TTL,
+        lambda: public_reads("content").content.find_one({"type": content_type}, {"_id": 0})
+    )
+
+@router.get("/content/faq")
+async def get_faq():
+    faqs = await load_content("faq")
+    if not faqs:
+        return {"items": []}
+    return faqs
+
+@router.put("/admin/content/faq")
+async def update_faq(items: List[FAQItem], admin: dict = Depends(require_admin)):
+    await core.db.content.update_one(
+        {"type": "faq"},
+        {"$set": {"type": "faq", "items": [i.model_dump() for i in items]}},
+        upsert=True
+    )
+    await invalidation_bus.publish("content", "faq")
+    return {"message": "FAQ updated"}
+
+@router.get("/content/terms")
+async def get_terms():
+    content = await load_content("terms")
+    if not content:
+        return {"content": ""}
+    return content
+
+@router.get("/content/privacy")
+async def get_privacy():
+    content = await load_content("privacy")
+    if not content:
+        return {"content": ""}
+    return content
+
+@router.put("/admin/content/{content_type}")
+async def update_content(content_type: str, content: str = Query(...), admin: dict = Depends(require_admin)):
+    if content_type not in ["terms", "privacy", "cookies"]:
+        raise HTTPException(status_code=400, detail="Invalid content type")
+    
+    await core.db.content.update_one(
+        {"type": content_type},
+        {"$set": {"type": content_type, "content": content}},
+        upsert=True
+    )
+    await invalidation_bus.publish("content", content_type)
+    return {"message": f"{content_type} updated"}
+
+# ==========================
+# CONTACT ENDPOINT
+# ==========================
+
+@router.post("/contact")
+async def submit_contact(message: ContactMessage):
+    contact_id = f"contact_{uuid.uuid4().hex[:12]}"
+    try:
+        await contact_writer.add({
+            "contact_id": contact_id,
+            **message.model_dump(),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+    except BufferFull:
+        raise HTTPException(status_code=503, detail="Too many messages right now, please try again shortly")
+    return {"message": "Message received", "contact_id": contact_id}
+
+# ==========================
+# ROOT ENDPOINT
+# ==========================
+
+@router.get("/")
+async def root():
+    return {"message": "x67 Digital Competitions API", "version": "1.0.0"}
+
+# ==========================
+# SEED DATA ENDPOINT (for demo)
+# ==========================
+
+@router.post("/seed")
+async def seed_data():
+    """Seed demo data for testing"""
+    # Check if already seeded
+    existing = await core.db.competitions.count_documents({})
+    if existing > 0:
+        return {"message": "Data already seeded"}
+    
+    # Create admin user
+    admin_id = f"user_{uuid.uuid4().hex[:12]}"
+    now = datetime.now(timezone.utc).isoformat()
+    
+    await core.db.users.insert_one({
+        "user_id": admin_id,
+        "email": "admin@x67digital.co.uk",
+        "password_hash": hash_password("admin123"),
+        "full_name": "Admin User",
+        "role": "admin",
+        "email_verified": True,
+        "created_at": now
+    })
+    
+    # Create sample competitions
+    now_dt = datetime.now(timezone.utc)
+    competitions = [
+        {
+            "competition_id": f"comp_{uuid.uuid4().hex[:12]}",
+            "title": "Mercedes AMG GT 63",
+            "description": "Win this stunning Mercedes AMG GT 63 S E Performance with 831bhp! The ultimate hybrid hypercar combines luxury with raw power. Features include AMG Performance seats, MBUX multimedia system, and Burmester® High-End 3D Surround Sound.",
+            "category": "cars",
+            "prize_value": 175000,
+            "ticket_price": 4.99,
+            "total_tickets": 4999,
+            "tickets_sold": 1247,
+            "draw_date": now_dt + timedelta(days=14),
+            "image_url": "https://images.unsplash.com/photo-1765461734605-34657fa04db2?w=800",
+            "featured": True,
+            "auto_draw": True,
+            "is_visible": True,
+            "created_at": now_dt
+        },
+        {
+            "competition_id": f"comp_{uuid.uuid4().hex[:12]}",
+            "title": "BMW M4 Competition",
+            "description": "Take home this beast! BMW M4 Competition with 503bhp twin-turbo inline-six. Finished in Brooklyn Grey with M Carbon Exterior Package, Carbon ceramic brakes, and full M Performance accessories.",
+            "category": "cars",
+            "prize_value": 85000,
+            "ticket_price": 2.99,
+            "total_tickets": 3999,
+            "tickets_sold": 892,
+            "draw_date": now_dt + timedelta(days=7),
+            "image_url": "https://images.unsplash.com/photo-1706811422966-24bfa91695c3?w=800",
+            "featured": True,
+            "auto_draw": True,
+            "is_visible": True,
+            "created_at": now_dt
+        },
+        {
+            "competition_id": f"comp_{uuid.uuid4().hex[:12]}",
+            "title": "Audi RS6 Avant",
+            "description": "The ultimate super-estate! Audi RS6 Avant with 621bhp from its twin-turbo V8. Nardo Grey with black optic package, sports exhaust, and panoramic sunroof.",
+            "category": "cars",
+            "prize_value": 115000,
+            "ticket_price": 3.49,
+            "total_tickets": 2999,
+            "tickets_sold": 456,
+            "draw_date": now_dt + timedelta(days=21),
+            "image_url": "https://images.unsplash.com/photo-1654855383391-765987e87c7f?w=800",
+            "featured": False,
+            "auto_draw": True,
+            "is_visible": True,
+            "created_at": now_dt
+        },
+        {
+            "competition_id": f"comp_{uuid.uuid4().hex[:12]}",
+            "title": "iPhone 15 Pro Max + £500 Cash",
+            "description": "Win the latest iPhone 15 Pro Max 1TB in Natural Titanium PLUS £500 cash! Includes AirPods Pro and MagSafe accessories bundle worth over £300.",
+            "category": "electronics",
+            "prize_value": 2000,
+            "ticket_price": 0.99,
+            "total_tickets": 999,
+            "tickets_sold": 678,
+            "draw_date": now_dt + timedelta(days=3),
+            "image_url": "https://images.pexels.com/photos/18525574/pexels-photo-18525574.jpeg?w=800",
+            "featured": True,
+            "auto_draw": True,
+            "is_visible": True,
+            "created_at": now_dt
+        },
+        {
+            "competition_id": f"comp_{uuid.uuid4().hex[:12]}",
+            "title": "PS5 Pro Gaming Bundle",
+            "description": "Ultimate gaming setup! PS5 Pro with 2TB storage, DualSense Edge controller, PlayStation VR2, and 10 top-rated games including GTA VI, Spider-Man 2, and FIFA 26.",
+            "category": "electronics",
+            "prize_value": 1500,
+            "ticket_price": 0.79,
+            "total_tickets": 1499,
+            "tickets_sold": 234,
+            "draw_date": now_dt + timedelta(days=10),
+            "image_url": "https://images.pexels.com/photos/13189290/pexels-photo-13189290.jpeg?w=800",
+            "featured": False,
+            "auto_draw": True,
+            "is_visible": True,
+            "created_at": now_dt
+        },
+        {
+            "competition_id": f"comp_{uuid.uuid4().hex[:12]}",
+            "title": "£10,000 Cash Prize",
+            "description": "Tax-free cash straight to your bank! Win £10,000 to spend however you like. Perfect for a dream holiday, home improvements, or a deposit on your dream car.",
+            "category": "cash",
+            "prize_value": 10000,
+            "ticket_price": 1.99,
+            "total_tickets": 2499,
+            "tickets_sold": 1123,
+            "draw_date": now_dt + timedelta(days=5),
+            "image_url": "https://images.pexels.com/photos/6805162/pexels-photo-6805162.jpeg?w=800",
+            "featured": True,
+            "auto_draw": True,
+            "is_visible": True,
+            "created_at": now_dt
+        }
+    ]
+    
+    await core.db.competitions.insert_many(competitions)
+    await invalidation_bus.publish("competitions")
+    
+    # Create sample FAQ
+    faqs = [
+        {"question": "How do I enter a competition?", "answer": "Simply browse our competitions, select the one you want to enter, choose how many tickets you want, and complete the secure checkout. Your ticket numbers will be emailed to you instantly."},
+        {"question": "How are winners selected?", "answer": "Winners are selected using a cryptographically secure random number generator when the competition ends. All draws are conducted fairly and transparently."},
+        {"question": "When will I receive my prize?", "answer": "Once you've been confirmed as a winner, we aim to arrange prize delivery within 14 working days. For vehicles, this includes full handover and registration assistance."},
+        {"question": "Are the competitions legitimate?", "answer": "Absolutely! x67 Digital is operated by x67 Digital Media Groupe, a UK registered company. All our competitions comply with UK gambling laws and regulations."},
+        {"question": "What payment methods do you accept?", "answer": "We accept all major credit and debit cards through our secure payment provider Viva Payments. All transactions are encrypted and secure."},
+        {"question": "Can I get a refund?", "answer": "Tickets are non-refundable once purchased as per our terms and conditions. Please only purchase tickets you intend to keep."}
+    ]
+    
+    await core.db.content.insert_one({"type": "faq", "items": faqs})
+    await invalidation_bus.publish("content")
+    
+    # Create sample winners
+    winners = [
+        {
+            "winner_id": f"win_{uuid.uuid4().hex[:12]}",
+            "competition_id": "comp_previous_1",
+            "competition_title": "Range Rover Sport SVR",
+            "user_id": "user_sample_1",
+            "user_name": "James T.",
+            "winning_ticket": 1847,
+            "prize_value": 95000,
+            "drawn_at": (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+        },
+        {
+            "winner_id": f"win_{uuid.uuid4().hex[:12]}",
+            "competition_id": "comp_previous_2",
+            "competition_title": "£25,000 Cash",
+            "user_id": "user_sample_2",
+            "user_name": "Sarah M.",
+            "winning_ticket": 456,
+            "prize_value": 25000,
+            "drawn_at": (datetime.now(timezone.utc) - timedelta(days=15)).isoformat()
+        }
+    ]
+    
+    await core.db.winners.insert_many(winners)
+    await rebuild_winner_stats()
+    
+    return {"message": "Data seeded successfully", "admin_email": "admin@x67digital.co.uk", "admin_password": "admin123"}
@@ -0,0 +1,390 @@
+"""Ticket purchases, baskets, order confirmation and the caller's orders."""
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+import asyncio
+import logging
+import random
+import uuid
+
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import JSONResponse
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+import archive
+import core
+import entry_caps
+import order_holds
+import payment_events
+import ticket_map
+from core import get_competition_status, to_iso
+from models import TicketPurchase, BasketPurchase, OrderResponse, BasketResponse
+from routers.competitions import load_competition
+from routers.queue import purchase_slots, require_admission
+from security import get_current_user
+from tickets import PACK_FIELD, encode_tickets, order_tickets
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Expires unpaid orders so they give back their tickets; started and stopped by the app
+hold_sweeper = order_holds.HoldSweeper(core.ORDER_HOLD)
+
+# ==========================
+# TICKET/ORDER ENDPOINTS
+# ==========================
+
+def order_confirmation_html(user: dict, order: dict) -> str:
+    return f"""
+        <h1>Order Confirmed!</h1>
+        <p>Hi {user['full_name']},</p>
+        <p>Your ticket purchase has been confirmed:</p>
+        <ul>
+            <li><strong>Order ID:</strong> {order['order_id']}</li>
+            <li><strong>Competition:</strong> {order.get('competition_title', 'N/A')}</li>
+            <li><strong>Tickets:</strong> {order['quantity']}</li>
+            <li><strong>Ticket Numbers:</strong> {', '.join(map(str, order_tickets(order)))}</li>
+            <li><strong>Total:</strong> £{order['total_price']:.2f}</li>
+        </ul>
+        <p>Good luck!</p>
+        <p>The x67 Digital Team</p>
+        """
+
+async def send_order_confirmation(user: dict, order: dict):
+    return await core.send_email(
+        to=user["email"],
+        subject=f"Order Confirmed - x67 Digital #{order['order_id'][:12]}",
+        html=order_confirmation_html(user, order)
+    )
+
+async def notify_confirmed_orders(orders: List[dict]):
+    """Email buyers of orders confirmed by the payment event worker"""
+    user_ids = list({o["user_id"] for o in orders})
+    users = await core.db.users.find({"user_id": {"$in": user_ids}}, {"_id": 0, "user_id": 1, "email": 1, "full_name": 1}).to_list(None)
+    users_by_id = {u["user_id"]: u for u in users}
+    await asyncio.gather(*[
+        send_order_confirmation(users_by_id[o["user_id"]], o) for o in orders if o["user_id"] in users_by_id
+    ])
+
+def check_purchasable(comp: Optional[dict], quantity: int):
+    if not comp:
+        raise HTTPException(status_code=404, detail="Competition not found")
+    
+    status = get_competition_status(comp)
+    if status not in ["live", "ending_soon"]:
+        raise HTTPException(status_code=400, detail="Competition is not available for purchase")
+    
+    tickets_available = comp["total_tickets"] - comp.get("tickets_sold", 0)
+    if quantity > tickets_available:
+        raise HTTPException(status_code=400, detail=f"Only {tickets_available} tickets available")
+
+def pick_numbers(comp: dict, quantity: int, used_numbers: set) -> List[int]:
+    """Random unused ticket numbers, sorted"""
+    available_numbers = [i for i in range(1, comp["total_tickets"] + 1) if i not in used_numbers]
+    
+    if len(available_numbers) < quantity:
+        raise HTTPException(status_code=400, detail="Not enough tickets available")
+    
+    return sorted(random.sample(available_numbers, quantity))
+
+def build_order(user: dict, comp: dict, ticket_numbers: List[int], **extra) -> dict:
+    """A pending order document for numbers already claimed, held until hold_expires_at"""
+    quantity = len(ticket_numbers)
+    now = datetime.now(timezone.utc)
+    return {
+        "order_id": f"order_{uuid.uuid4().hex[:12]}",
+        "user_id": user["user_id"],
+        "competition_id": comp["competition_id"],
+        "competition_title": comp["title"],
+        PACK_FIELD: encode_tickets(ticket_numbers),
+        "quantity": quantity,
+        "total_price": comp["ticket_price"] * quantity,
+        "payment_status": "pending",
+        "created_at": now.isoformat(),
+        "hold_expires_at": now + core.ORDER_HOLD,
+        **extra
+    }
+
+async def reserve_entries(user: dict, comp: dict, quantity: int):
+    """Count the tickets against the competition's per-person cap, if it has one"""
+    cap = comp.get("max_tickets_per_user")
+    if cap and not await entry_caps.reserve(core.db, comp["competition_id"], user["user_id"], quantity, cap):
+        raise HTTPException(status_code=400, detail=f"You can hold at most {cap} tickets in this competition")
+
+def held_entries(user: dict, comp: dict, quantity: int) -> dict:
+    """What reserve_entries counted, in the shape entry_caps.release takes"""
+    return {"competition_id": comp["competition_id"], "user_id": user["user_id"], "quantity": quantity}
+
+# Random picks that lose a race for a number retry against a fresh map
+CLAIM_ATTEMPTS = 3
+
+async def claim_tickets(comp: dict, quantity: int, requested: Optional[List[int]] = None) -> List[int]:
+    """Claim the requested numbers, or random free ones, in the competition's ticket map"""
+    competition_id = comp["competition_id"]
+    if requested and max(requested) > comp["total_tickets"]:
+        raise HTTPException(status_code=400, detail=f"Ticket numbers go up to {comp['total_tickets']}")
+    max_age = None  # a slightly stale map only costs a retry
+    for _ in range(CLAIM_ATTEMPTS):
+        if requested:
+            numbers = sorted(requested)
+        else:
+            current = await core.ticket_maps.get(core.db, comp, max_age=max_age)
+            numbers = pick_numbers(comp, quantity, current.taken())
+        version = await ticket_map.claim(core.db, competition_id, numbers)
+        if version is not None:
+            core.ticket_maps.claimed(competition_id, numbers, version)
+            return numbers
+        max_age = 0
+        if requested:
+            current = await core.ticket_maps.get(core.db, comp, max_age=0)
+            taken = [n for n in numbers if n in current]
+            if taken:
+                raise HTTPException(status_code=409, detail=f"Tickets already taken: {', '.join(map(str, taken))}")
+    raise HTTPException(status_code=409, detail="Those tickets were just taken, please try again")
+
+_transactions_supported = None
+
+async def supports_transactions() -> bool:
+    """Multi-document transactions need a replica set or mongos"""
+    global _transactions_supported
+    if _transactions_supported is None:
+        hello = await core.client.admin.command("hello")
+        _transactions_supported = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+    return _transactions_supported
+
+async def insert_basket_orders(orders: List[dict]):
+    """Insert all of a basket's orders or none of them"""
+    if await supports_transactions():
+        async with await core.client.start_session() as session:
+            async with session.start_transaction():
+                await core.db.orders.insert_many(orders, session=session)
+        return
+    try:
+        await core.db.orders.insert_many(orders)
+    except PyMongoError:
+        # Standalone mongod: compensate by removing whatever part of the basket landed
+        await core.db.orders.delete_many({"basket_id": orders[0]["basket_id"]})
+        raise
+
+@router.post("/tickets/purchase", response_model=OrderResponse)
+async def purchase_tickets(purchase: TicketPurchase, user: dict = Depends(get_current_user),
+                           x_queue_token: Optional[str] = Header(None)):
+    # The cached competition is enough to turn away buyers who haven't been admitted yet
+    require_admission(await load_competition(purchase.competition_id), user, x_queue_token)
+    async with purchase_slots([purchase.competition_id]):
+        return await place_order(purchase, user)
+
+async def place_order(purchase: TicketPurchase, user: dict) -> OrderResponse:
+    comp = await core.db.competitions.find_one({"competition_id": purchase.competition_id}, {"_id": 0})
+    check_purchasable(comp, purchase.quantity)
+    
+    await reserve_entries(user, comp, purchase.quantity)
+    try:
+        order_doc = build_order(user, comp, await claim_tickets(comp, purchase.quantity, purchase.ticket_numbers))
+    except (HTTPException, PyMongoError):
+        await entry_caps.release(core.db, [held_entries(user, comp, purchase.quantity)])
+        raise
+    try:
+        await core.db.orders.insert_one(order_doc)
+    except PyMongoError:
+        await entry_caps.release(core.db, [order_doc])
+        await ticket_map.release(core.db, [order_doc])
+        raise
+    
+    return OrderResponse(**order_doc)
+
+@router.post("/tickets/basket", response_model=BasketResponse)
+async def purchase_basket(basket: BasketPurchase, user: dict = Depends(get_current_user),
+                          x_queue_token: Optional[str] = Header(None)):
+    """Reserve tickets across several competitions with one read per collection and one write"""
+    competition_ids = [item.competition_id for item in basket.items]
+    if len(set(competition_ids)) != len(competition_ids):
+        raise HTTPException(status_code=400, detail="Each competition can appear only once per basket")
+    
+    comps = await core.db.competitions.find({"competition_id": {"$in": competition_ids}}, {"_id": 0}).to_list(None)
+    comps_by_id = {c["competition_id"]: c for c in comps}
+    for item in basket.items:
+        check_purchasable(comps_by_id.get(item.competition_id), item.quantity)
+        # One X-Queue-Token per competition with a waiting room, comma separated
+        require_admission(comps_by_id[item.competition_id], user, x_queue_token)
+    
+    basket_id = f"basket_{uuid.uuid4().hex[:12]}"
+    reserved, orders = [], []
+    async with purchase_slots(competition_ids):
+        try:
+            for item in basket.items:
+                comp = comps_by_id[item.competition_id]
+                await reserve_entries(user, comp, item.quantity)
+                reserved.append(held_entries(user, comp, item.quantity))
+                orders.append(build_order(user, comp, await claim_tickets(comp, item.quantity), basket_id=basket_id))
+            await insert_basket_orders(orders)
+        except (HTTPException, PyMongoError):
+            await entry_caps.release(core.db, reserved)
+            await ticket_map.release(core.db, orders)
+            raise
+    
+    return BasketResponse(
+        basket_id=basket_id,
+        orders=[OrderResponse(**o) for o in orders],
+        total_price=sum(o["total_price"] for o in orders)
+    )
+
+@router.post("/tickets/basket/{basket_id}/confirm")
+async def confirm_basket(basket_id: str, user: dict = Depends(get_current_user)):
+    """Confirm every pending order in a basket (MOCKED payment, like confirm_order)"""
+    if core.PAYMENT_WEBHOOK_SECRET:
+        return JSONResponse(
+            status_code=202,
+            content={"message": "Awaiting payment confirmation", "basket_id": basket_id}
+        )
+    
+    confirm_batch = uuid.uuid4().hex
+    result = await core.db.orders.update_many(
+        {"basket_id": basket_id, "user_id": user["user_id"], "payment_status": "pending"},
+        {"$set": {"payment_status": "completed", "payment_id": f"viva_{uuid.uuid4().hex[:8]}", "confirm_batch": confirm_batch}}
+    )
+    if result.modified_count == 0:
+        raise HTTPException(status_code=404, detail="No pending orders in basket")
+    
+    orders = await core.db.orders.find({"basket_id": basket_id, "confirm_batch": confirm_batch}, {"_id": 0}).to_list(None)
+    await payment_events.apply_ticket_counts(core.db, orders)
+    
+    await asyncio.gather(*[send_order_confirmation(user, o) for o in orders])
+    
+    return {"message": "Basket confirmed", "basket_id": basket_id, "order_ids": [o["order_id"] for o in orders]}
+
+# Orders in these states can still be paid for; refunded and expired orders can't be revived
+CONFIRMABLE_STATUSES = order_holds.UNPAID_STATUSES
+
+async def transition_order(order_filter: dict, set_fields: dict, tickets_delta_sign: int) -> Optional[dict]:
+    """Atomically move an order between payment states and adjust tickets_sold.
+    
+    order_filter must pin the current payment_status, so of two concurrent
+    transitions only one matches; the loser gets None. On replica sets both
+    writes share a transaction. On standalone mongod the order carries a
+    counter_pending marker until the counter write lands, and
+    reconcile_ticket_counts repairs any marker a crash leaves behind.
+    """
+    if await supports_transactions():
+        async def apply(session):
+            order = await core.db.orders.find_one_and_update(
+                order_filter, {"$set": set_fields},
+                projection={"_id": 0}, return_document=ReturnDocument.AFTER, session=session
+            )
+            if order:
+                await core.db.competitions.update_one(
+                    {"competition_id": order["competition_id"]},
+                    {"$inc": {"tickets_sold": tickets_delta_sign * order["quantity"]}},
+                    session=session
+                )
+            return order
+        async with await core.client.start_session() as session:
+            return await session.with_transaction(apply)
+    
+    order = await core.db.orders.find_one_and_update(
+        order_filter,
+        {"$set": {**set_fields, "counter_pending": datetime.now(timezone.utc)}},
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    if order:
+        await core.db.competitions.update_one(
+            {"competition_id": order["competition_id"]},
+            {"$inc": {"tickets_sold": tickets_delta_sign * order["quantity"]}}
+        )
+        await core.db.orders.update_one({"order_id": order["order_id"]}, {"$unset": {"counter_pending": ""}})
+    return order
+
+async def reconcile_ticket_counts(older_than: timedelta = timedelta(minutes=1)):
+    """Recount tickets_sold for competitions whose counter update may have been lost"""
+    stale_before = {"$lt": datetime.now(timezone.utc) - older_than}
+    stale = await core.db.orders.find(
+        {"counter_pending": stale_before}, {"_id": 0, "order_id": 1, "competition_id": 1}
+    ).to_list(None)
+    stale_by_comp = {}
+    for order in stale:
+        stale_by_comp.setdefault(order["competition_id"], []).append(order["order_id"])
+    for comp_id, order_ids in stale_by_comp.items():
+        completed = {"$match": {"competition_id": comp_id, "payment_status": "completed"}}
+        totals = await core.db.orders.aggregate([
+            completed,
+            {"$unionWith": {"coll": archive.ARCHIVE_COLLECTION, "pipeline": [completed]}},
+            {"$group": {"_id": None, "tickets": {"$sum": "$quantity"}}}
+        ]).to_list(1)
+        await core.db.competitions.update_one(
+            {"competition_id": comp_id}, {"$set": {"tickets_sold": totals[0]["tickets"] if totals else 0}}
+        )
+        # Only the markers this recount covers; transitions still in flight keep theirs
+        await core.db.orders.update_many(
+            {"order_id": {"$in": order_ids}, "counter_pending": stale_before}, {"$unset": {"counter_pending": ""}}
+        )
+        logger.warning("Reconciled tickets_sold for %s", comp_id)
+
+@router.post("/orders/{order_id}/confirm")
+async def confirm_order(order_id: str, user: dict = Depends(get_current_user)):
+    """Confirm order after payment (MOCKED payment for demo)"""
+    if core.PAYMENT_WEBHOOK_SECRET:
+        # Real payments: the provider webhook completes the order
+        order = await core.db.orders.find_one({"order_id": order_id, "user_id": user["user_id"]}, {"_id": 0})
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if order["payment_status"] == "completed":
+            raise HTTPException(status_code=400, detail="Order already completed")
+        return JSONResponse(
+            status_code=202,
+            content={"message": "Awaiting payment confirmation", "order_id": order_id, "payment_status": order["payment_status"]}
+        )
+    
+    # MOCKED: In production, verify Viva payment status here
+    # For now, auto-complete the order
+    order = await transition_order(
+        {"order_id": order_id, "user_id": user["user_id"], "payment_status": {"$in": CONFIRMABLE_STATUSES}},
+        {"payment_status": "completed", "payment_id": f"viva_{uuid.uuid4().hex[:8]}"},
+        tickets_delta_sign=1
+    )
+    if not order:
+        existing = await core.db.orders.find_one({"order_id": order_id, "user_id": user["user_id"]}, {"_id": 0, "payment_status": 1})
+        if not existing:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if existing["payment_status"] == "completed":
+            raise HTTPException(status_code=400, detail="Order already completed")
+        raise HTTPException(status_code=400, detail="Order cannot be confirmed")
+    
+    # Send confirmation email
+    await send_order_confirmation(user, order)
+    
+    return {"message": "Order confirmed", "order_id": order_id}
+
+@router.get("/orders/my", response_model=List[OrderResponse])
+async def get_my_orders(include_archived: bool = False, user: dict = Depends(get_current_user)):
+    orders = await archive.find_orders(
+        core.db, {"user_id": user["user_id"]}, sort=[("created_at", -1)], limit=100, include_archived=include_archived
+    )
+    return [OrderResponse(**o) for o in orders]
+
+@router.get("/tickets/my")
+async def get_my_tickets(include_archived: bool = False, user: dict = Depends(get_current_user)):
+    """Get all tickets grouped by competition"""
+    orders = await archive.find_orders(
+        core.db, {"user_id": user["user_id"], "payment_status": "completed"}, include_archived=include_archived
+    )
+    
+    comp_ids = list({order["competition_id"] for order in orders})
+    comps = await core.db.competitions.find({"competition_id": {"$in": comp_ids}}, {"_id": 0}).to_list(None) if comp_ids else []
+    comps_by_id = {c["competition_id"]: c for c in comps}
+    
+    tickets_by_comp = {}
+    for order in orders:
+        comp_id = order["competition_id"]
+        if comp_id not in tickets_by_comp:
+            comp = comps_by_id.get(comp_id)
+            tickets_by_comp[comp_id] = {
+                "competition_id": comp_id,
+                "competition_title": comp.get("title", "Unknown") if comp else "Unknown",
+                "draw_date": to_iso(comp.get("draw_date")) if comp else None,
+                "status": get_competition_status(comp) if comp else "unknown",
+                "tickets": []
+            }
+        tickets_by_comp[comp_id]["tickets"].extend(order_tickets(order))
+    
+    return list(tickets_by_comp.values())
@@ -0,0 +1,61 @@
+"""Checkout sessions and the payment provider webhook."""
+import json
+import random
+import uuid
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+
+import core
+import payment_events
+from models import PaymentCreateRequest, PaymentResponse
+from routers.orders import notify_confirmed_orders
+from security import get_current_user
+
+router = APIRouter()
+
+# Confirms orders from stored payment events; started and stopped by the app
+payment_worker = payment_events.PaymentEventWorker(on_confirmed=notify_confirmed_orders)
+
+# ==========================
+# PAYMENT ENDPOINTS (MOCKED Viva Payments)
+# ==========================
+
+@router.post("/payments/create", response_model=PaymentResponse)
+async def create_payment(payment: PaymentCreateRequest, user: dict = Depends(get_current_user)):
+    """Create payment order (MOCKED - returns simulated checkout URL)"""
+    # In production, this would call Viva Payments API
+    order_code = f"{random.randint(1000000000, 9999999999)}"
+    payment_id = f"pay_{uuid.uuid4().hex[:12]}"
+    
+    # MOCKED checkout URL
+    checkout_url = f"https://demo.vivapayments.com/web/checkout?ref={order_code}"
+    
+    return PaymentResponse(
+        payment_id=payment_id,
+        order_code=order_code,
+        checkout_url=checkout_url,
+        status="pending"
+    )
+
+@router.post("/payments/webhook")
+async def payment_webhook(request: Request):
+    """Verify, dedup and persist a payment event; orders are confirmed by payment_worker"""
+    if not core.PAYMENT_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Payment webhook not configured")
+    
+    raw_body = await request.body()
+    if not payment_events.verify_signature(core.PAYMENT_WEBHOOK_SECRET, raw_body, request.headers.get(payment_events.SIGNATURE_HEADER)):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    
+    try:
+        body = json.loads(raw_body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    event = payment_events.normalize_event(body) if isinstance(body, dict) else None
+    if not event:
+        raise HTTPException(status_code=400, detail="Unrecognised payment event")
+    
+    if not await payment_events.ingest_event(core.db, event, body):
+        return {"status": "duplicate"}
+    payment_worker.notify()
+    return {"status": "ok"}
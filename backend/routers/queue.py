@@ -0,0 +1,68 @@
+"""Virtual waiting room for competitions that admit buyers at a set rate."""
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Iterable, Optional
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+import core
+from models import QueueStatus
+from routers.competitions import load_competition
+from security import JWT_SECRET, get_current_user
+from waiting_room import ConcurrencyLimiter, Overloaded, WaitingRoom
+
+router = APIRouter()
+
+waiting_room = WaitingRoom(
+    os.environ.get('QUEUE_TOKEN_SECRET', JWT_SECRET),
+    burst=int(os.environ.get('QUEUE_BURST', '20')),
+    max_wait=float(os.environ.get('QUEUE_MAX_WAIT_SECONDS', '1800')),
+    admission_window=float(os.environ.get('QUEUE_ADMISSION_WINDOW_SECONDS', '600'))
+)
+# Purchases in flight per competition on this worker, and how many may wait behind them
+purchase_limiter = ConcurrencyLimiter(
+    limit=int(os.environ.get('PURCHASE_CONCURRENCY', '8')),
+    max_waiting=int(os.environ.get('PURCHASE_MAX_WAITING', '64')),
+    wait_timeout=float(os.environ.get('PURCHASE_WAIT_TIMEOUT_SECONDS', '5'))
+)
+
+def service_unavailable(error: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many buyers right now, please try again shortly",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+def require_admission(comp: dict, user: dict, queue_tokens: Optional[str]):
+    """Competitions with a waiting room only sell to buyers whose turn has come"""
+    if comp.get("queue_rate") and not waiting_room.admits(queue_tokens, comp["competition_id"], user["user_id"]):
+        raise HTTPException(status_code=403, detail="Join the waiting room for this competition first")
+
+@asynccontextmanager
+async def purchase_slots(competition_ids: Iterable[str]):
+    """Hold a purchase slot for each competition (in a fixed order, so baskets can't deadlock)"""
+    async with AsyncExitStack() as stack:
+        try:
+            for competition_id in sorted(set(competition_ids)):
+                await stack.enter_async_context(purchase_limiter.slot(competition_id))
+        except Overloaded as e:
+            raise service_unavailable(e)
+        yield
+
+@router.post("/queue/{competition_id}/join", response_model=QueueStatus)
+async def join_queue(competition_id: str, user: dict = Depends(get_current_user)):
+    comp = await load_competition(competition_id)
+    if not comp.get("queue_rate"):
+        raise HTTPException(status_code=400, detail="This competition has no waiting room")
+    try:
+        return await waiting_room.join(core.db, competition_id, comp["queue_rate"], user["user_id"])
+    except Overloaded as e:
+        raise service_unavailable(e)
+
+@router.get("/queue/{competition_id}", response_model=QueueStatus)
+async def queue_status(competition_id: str, x_queue_token: str = Header(...)):
+    """Position and ETA from the token alone, so polling costs no database work"""
+    status = waiting_room.status(x_queue_token, competition_id)
+    if status is None:
+        raise HTTPException(status_code=400, detail="Invalid queue token")
+    return status
@@ -0,0 +1,74 @@
+"""In-memory prefix index for competition title autocomplete.
+
+Terms are kept in one sorted list of ``(term, competition_id)`` pairs, so a
+lookup is a binary search plus a short forward scan. Each title contributes
+every word suffix of its normalised form ("bmw m4 competition", "m4
+competition", "competition"), so prefixes match at any word and can span
+several words. Full-text search itself uses Mongo's text
+index; this only serves the typeahead.
+"""
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Tuple
+import re
+
+_WORD_RE = re.compile(r"[a-z0-9£]+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def title_terms(title: str) -> List[str]:
+    words = normalize(title).split()
+    terms = {" ".join(words[i:]) for i in range(len(words))}
+    return sorted(terms)
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._entries: List[Tuple[str, str]] = []
+        self._titles: Dict[str, str] = {}
+        self.ready = False
+
+    def __len__(self):
+        return len(self._titles)
+
+    def rebuild(self, competitions: Iterable[dict]):
+        titles = {c["competition_id"]: c["title"] for c in competitions}
+        self._entries = sorted(
+            (term, comp_id) for comp_id, title in titles.items() for term in title_terms(title)
+        )
+        self._titles = titles
+        self.ready = True
+
+    def add(self, competition_id: str, title: str):
+        self.remove(competition_id)
+        self._titles[competition_id] = title
+        for term in title_terms(title):
+            insort(self._entries, (term, competition_id))
+
+    def remove(self, competition_id: str):
+        title = self._titles.pop(competition_id, None)
+        if title is None:
+            return
+        for term in title_terms(title):
+            i = bisect_left(self._entries, (term, competition_id))
+            if i < len(self._entries) and self._entries[i] == (term, competition_id):
+                del self._entries[i]
+
+    def complete(self, prefix: str, limit: int = 8) -> List[dict]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        i = bisect_left(self._entries, (prefix, ""))
+        while i < len(self._entries) and len(results) < limit:
+            term, comp_id = self._entries[i]
+            if not term.startswith(prefix):
+                break
+            if comp_id not in seen:
+                seen.add(comp_id)
+                results.append({"competition_id": comp_id, "title": self._titles[comp_id]})
+            i += 1
+        return results
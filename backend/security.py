@@ -0,0 +1,89 @@
+"""Password hashing, JWTs and the auth dependencies.
+
+bcrypt and PyJWT are imported on first use, so workers don't pay for them
+at boot.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+import os
+
+from fastapi import Depends, Header, HTTPException, Request
+
+import core
+from core import USER_CACHE_TTL, local_cache
+
+# JWT Config
+JWT_SECRET = os.environ.get('JWT_SECRET', 'x67-digital-secret-key')
+JWT_ALGORITHM = 'HS256'
+JWT_EXPIRATION_HOURS = 24 * 7  # 7 days
+
+def hash_password(password: str) -> str:
+    import bcrypt
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+def verify_password(password: str, hashed: str) -> bool:
+    import bcrypt
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+def create_token(user_id: str, role: str = "user") -> str:
+    import jwt
+    payload = {
+        "user_id": user_id,
+        "role": role,
+        "exp": datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+async def load_user(user_id: str) -> Optional[dict]:
+    user = await local_cache.get_or_load(
+        "users", user_id, USER_CACHE_TTL,
+        lambda: core.db.users.find_one({"user_id": user_id}, {"_id": 0})
+    )
+    return dict(user) if user else None
+
+async def get_current_user(authorization: Optional[str] = Header(None), request: Request = None):
+    token = None
+
+    # Try cookie first
+    if request and request.cookies.get("session_token"):
+        session_token = request.cookies.get("session_token")
+        # Look up session
+        session = await core.db.user_sessions.find_one({"session_token": session_token}, {"_id": 0})
+        if session:
+            expires_at = session.get("expires_at")
+            if isinstance(expires_at, str):
+                expires_at = datetime.fromisoformat(expires_at)
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at > datetime.now(timezone.utc):
+                user = await load_user(session["user_id"])
+                if user:
+                    return user
+
+    # Try Authorization header
+    if authorization:
+        if authorization.startswith("Bearer "):
+            token = authorization[7:]
+        else:
+            token = authorization
+
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    import jwt
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        user_id = payload.get("user_id")
+        user = await load_user(user_id)
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        return user
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+async def require_admin(user: dict = Depends(get_current_user)):
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
@@ -0,0 +1,125 @@
+import os
+import sys
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+import pytest
+
+# Never point the suite at the deployment database from backend/.env
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+TEST_DB_NAME = os.environ.get("TEST_DB_NAME", "x67_digital_test")
+os.environ["MONGO_URL"] = TEST_MONGO_URL
+os.environ["DB_NAME"] = TEST_DB_NAME
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from pymongo import MongoClient  # noqa: E402
+from pymongo.errors import PyMongoError  # noqa: E402
+
+import core  # noqa: E402
+import security  # noqa: E402
+import server  # noqa: E402
+from routers import orders  # noqa: E402
+from search import PrefixIndex  # noqa: E402
+from query_budget import QueryBudgetListener  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def mongo_available():
+    try:
+        MongoClient(TEST_MONGO_URL, serverSelectionTimeoutMS=500).admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"MongoDB not reachable at {TEST_MONGO_URL}")
+
+
+@pytest.fixture
+async def db(mongo_available, monkeypatch):
+    # Motor pins a client to the loop it first runs on, so each test gets its own
+    client = AsyncIOMotorClient(TEST_MONGO_URL, event_listeners=[QueryBudgetListener()])
+    await client.drop_database(TEST_DB_NAME)
+    test_db = client[TEST_DB_NAME]
+    monkeypatch.setattr(core, "client", client)
+    monkeypatch.setattr(core, "db", test_db)
+    core.local_cache.clear()
+    monkeypatch.setattr(core, "search_index", PrefixIndex())
+    monkeypatch.setattr(core, "send_email", _no_email)
+    yield test_db
+    await client.drop_database(TEST_DB_NAME)
+    client.close()
+
+
+@pytest.fixture(params=["transactions", "standalone"])
+async def mode(request, db, monkeypatch):
+    """Run an order test with multi-document transactions and with the standalone fallback"""
+    if request.param == "transactions":
+        if not await orders.supports_transactions():
+            pytest.skip("MongoDB is not a replica set")
+    else:
+        async def no_transactions():
+            return False
+        monkeypatch.setattr(orders, "supports_transactions", no_transactions)
+    return request.param
+
+
+@pytest.fixture
+async def api(db):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as test_client:
+        yield test_client
+
+
+async def _no_email(to, subject, html):
+    return None
+
+
+@pytest.fixture
+def make_user(db):
+    async def _make_user(role="user", **fields):
+        user_id = f"user_{uuid.uuid4().hex[:12]}"
+        user = {
+            "user_id": user_id,
+            "email": f"{user_id}@example.com",
+            "password_hash": "",
+            "full_name": "Test User",
+            "role": role,
+            "email_verified": True,
+            "created_at": "2026-01-01T00:00:00+00:00",
+            **fields
+        }
+        await db.users.insert_one(dict(user))
+        return user, {"Authorization": f"Bearer {security.create_token(user_id, role)}"}
+    return _make_user
+
+
+@pytest.fixture
+def make_competition(db):
+    async def _make_competition(**fields):
+        now = datetime.now(timezone.utc)
+        comp = {
+            "competition_id": f"comp_{uuid.uuid4().hex[:12]}",
+            "title": "Test Prize",
+            "description": "",
+            "category": "cash",
+            "prize_value": 100,
+            "ticket_price": 1.0,
+            "total_tickets": 1000,
+            "tickets_sold": 0,
+            "draw_date": now + timedelta(days=7),
+            "image_url": "",
+            "featured": False,
+            "auto_draw": True,
+            "is_visible": True,
+            "created_at": now,
+            **fields
+        }
+        await db.competitions.insert_one(dict(comp))
+        return comp
+    return _make_competition
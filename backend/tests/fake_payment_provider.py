@@ -0,0 +1,38 @@
+"""Local stand-in for the payment provider: builds signed webhook events and replays them"""
+import json
+import uuid
+
+from payment_events import EVENT_COMPLETED, SIGNATURE_HEADER, sign_payload
+
+
+class FakePaymentProvider:
+    def __init__(self, client, secret: str):
+        self.client = client
+        self.secret = secret
+        self.sent = []
+
+    def event(self, order_id: str, event_type: str = EVENT_COMPLETED, event_id: str = None, amount: float = None) -> dict:
+        return {
+            "event_id": event_id or f"evt_{uuid.uuid4().hex[:12]}",
+            "type": event_type,
+            "order_id": order_id,
+            "payment_id": f"viva_{uuid.uuid4().hex[:8]}",
+            "amount": amount
+        }
+
+    async def send(self, event: dict, secret: str = None):
+        body = json.dumps(event).encode()
+        self.sent.append(event)
+        return await self.client.post(
+            "/api/payments/webhook",
+            content=body,
+            headers={"Content-Type": "application/json", SIGNATURE_HEADER: sign_payload(secret or self.secret, body)}
+        )
+
+    async def replay(self, times: int = 1):
+        """Re-deliver everything sent so far, as providers do on timeouts"""
+        responses = []
+        for _ in range(times):
+            for event in list(self.sent):
+                responses.append(await self.send(event))
+        return responses
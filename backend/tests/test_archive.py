@@ -0,0 +1,54 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import archive
+from tickets import order_tickets
+
+pytestmark = pytest.mark.anyio
+
+
+async def _seed(db, user_id):
+    now = datetime.now(timezone.utc)
+    await db.competitions.insert_many([
+        {"competition_id": "comp_old", "winner_id": "win_1", "draw_date": now - timedelta(days=60)},
+        {"competition_id": "comp_live", "draw_date": now + timedelta(days=7)},
+    ])
+    await db.orders.insert_many([{
+        "order_id": f"order_{comp}_{i}", "user_id": user_id, "competition_id": comp,
+        "ticket_numbers": [i + 1], "quantity": 1, "total_price": 2.5, "payment_status": "completed",
+        "created_at": (now - timedelta(days=90 if comp == "comp_old" else 1, minutes=i)).isoformat()
+    } for comp in ("comp_old", "comp_live") for i in range(5)])
+
+
+async def test_archives_old_competitions_and_resumes(db):
+    await _seed(db, "user_1")
+    # An interrupted run that copied one order but never deleted it
+    await db[archive.ARCHIVE_COLLECTION].insert_one(await db.orders.find_one({"order_id": "order_comp_old_0"}))
+
+    moved = await archive.archive_orders(db, timedelta(days=30), batch_size=2)
+
+    assert moved == {"comp_old": 5}
+    assert await db.orders.count_documents({"competition_id": "comp_old"}) == 0
+    assert await db.orders.count_documents({"competition_id": "comp_live"}) == 5
+    archived = await db[archive.ARCHIVE_COLLECTION].find({}).to_list(None)
+    assert len(archived) == 5
+    assert order_tickets(await db[archive.ARCHIVE_COLLECTION].find_one({"order_id": "order_comp_old_3"})) == [4]
+    assert await archive.archive_orders(db, timedelta(days=30)) == {}
+
+
+async def test_reads_union_archive_only_when_asked(api, db, make_user):
+    admin, admin_headers = await make_user("admin")
+    user, headers = await make_user()
+    await _seed(db, user["user_id"])
+    stats_before = (await api.get("/api/admin/stats", headers=admin_headers)).json()
+
+    await archive.archive_orders(db, timedelta(days=30))
+
+    assert len((await api.get("/api/orders/my", headers=headers)).json()) == 5
+    everything = (await api.get("/api/orders/my", params={"include_archived": "true"}, headers=headers)).json()
+    assert len(everything) == 10
+    assert [o["created_at"] for o in everything] == sorted((o["created_at"] for o in everything), reverse=True)
+    stats_after = (await api.get("/api/admin/stats", headers=admin_headers)).json()
+    assert stats_after["total_orders"] == stats_before["total_orders"] == 10
+    assert stats_after["total_revenue"] == stats_before["total_revenue"]
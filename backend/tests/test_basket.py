@@ -0,0 +1,84 @@
+import uuid
+
+import pytest
+from pymongo.errors import PyMongoError
+
+import core
+import payment_events
+from routers import orders
+
+pytestmark = pytest.mark.anyio
+
+COMPETITIONS = ["comp_1", "comp_2", "comp_3"]
+
+
+@pytest.fixture
+def competitions(make_competition):
+    async def _competitions():
+        for competition_id in COMPETITIONS:
+            await make_competition(competition_id=competition_id, ticket_price=2.0, total_tickets=100)
+    return _competitions
+
+
+async def _taken(db, competition_id):
+    comp = await db.competitions.find_one({"competition_id": competition_id}, {"_id": 0})
+    return (await core.ticket_maps.get(db, comp, max_age=0)).taken()
+
+
+def _basket(*quantities):
+    return {"items": [{"competition_id": c, "quantity": q} for c, q in zip(COMPETITIONS, quantities)]}
+
+
+async def test_basket_inserts_every_order_and_confirms_them_together(api, db, make_user, competitions, mode):
+    await competitions()
+    user, headers = await make_user()
+    response = await api.post("/api/tickets/basket", json=_basket(1, 2, 3), headers=headers)
+    assert response.status_code == 200
+    basket = response.json()
+    assert basket["total_price"] == 12.0
+    assert [o["quantity"] for o in basket["orders"]] == [1, 2, 3]
+    stored = await db.orders.find({"basket_id": basket["basket_id"]}).to_list(None)
+    assert sorted(o["competition_id"] for o in stored) == COMPETITIONS
+    assert {o["payment_status"] for o in stored} == {"pending"}
+    for order in basket["orders"]:
+        assert await _taken(db, order["competition_id"]) == set(order["ticket_numbers"])
+
+    confirmed = await api.post(f"/api/tickets/basket/{basket['basket_id']}/confirm", headers=headers)
+    assert confirmed.status_code == 200
+    assert sorted(confirmed.json()["order_ids"]) == sorted(o["order_id"] for o in basket["orders"])
+    sold = {c["competition_id"]: c["tickets_sold"] for c in await db.competitions.find().to_list(None)}
+    assert sold == {"comp_1": 1, "comp_2": 2, "comp_3": 3}
+    # Confirming again finds nothing pending and counts nothing twice
+    again = await api.post(f"/api/tickets/basket/{basket['basket_id']}/confirm", headers=headers)
+    assert again.status_code == 404
+    other, other_headers = await make_user()
+    assert (await api.post(f"/api/tickets/basket/{basket['basket_id']}/confirm", headers=other_headers)).status_code == 404
+
+
+async def test_failed_insert_leaves_no_part_of_the_basket(api, db, make_user, competitions, monkeypatch):
+    async def no_transactions():
+        return False
+    monkeypatch.setattr(orders, "supports_transactions", no_transactions)
+    await payment_events.ensure_indexes(db)
+    await competitions()
+    user, headers = await make_user()
+    # Every order gets the same order_id, so the second insert hits the unique index
+    fixed = uuid.uuid4()
+    monkeypatch.setattr(orders.uuid, "uuid4", lambda: fixed)
+
+    with pytest.raises(PyMongoError):
+        await api.post("/api/tickets/basket", json=_basket(1, 2, 3), headers=headers)
+
+    assert await db.orders.count_documents({}) == 0
+    for competition_id in COMPETITIONS:
+        assert await _taken(db, competition_id) == set()
+
+
+async def test_basket_rejects_duplicates_and_unknown_competitions(api, db, make_user, competitions):
+    await competitions()
+    user, headers = await make_user()
+    duplicate = {"items": [{"competition_id": "comp_1", "quantity": 1}, {"competition_id": "comp_1", "quantity": 2}]}
+    assert (await api.post("/api/tickets/basket", json=duplicate, headers=headers)).status_code == 400
+    unknown = {"items": [{"competition_id": "comp_1", "quantity": 1}, {"competition_id": "comp_missing", "quantity": 1}]}
+    assert (await api.post("/api/tickets/basket", json=unknown, headers=headers)).status_code == 404
+    assert await db.orders.count_documents({}) == 0
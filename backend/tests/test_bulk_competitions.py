@@ -0,0 +1,58 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+COMPETITION = {
+    "title": "Bulk prize", "description": "", "category": "cars", "prize_value": 100, "ticket_price": 1.0,
+    "total_tickets": 10, "draw_date": "2030-01-01T00:00:00Z", "image_url": ""
+}
+
+
+async def _bulk(api, headers, operations):
+    return await api.post("/api/admin/competitions/bulk", json={"operations": operations}, headers=headers)
+
+
+async def test_mixed_operations_report_per_item(api, db, make_user):
+    admin, headers = await make_user("admin")
+    created = (await _bulk(api, headers, [
+        {"op": "create", "data": COMPETITION},
+        {"op": "create", "data": {**COMPETITION, "title": "Second prize"}},
+        {"op": "create", "data": {**COMPETITION, "draw_date": "next tuesday"}},
+    ])).json()
+    assert [r["status"] for r in created] == ["created", "created", "invalid"]
+    first, second = created[0]["competition_id"], created[1]["competition_id"]
+
+    results = (await _bulk(api, headers, [
+        {"op": "update", "competition_id": first, "data": {"title": "Renamed"}},
+        {"op": "delete", "competition_id": second},
+        {"op": "set_visibility", "competition_id": "comp_missing", "is_visible": False},
+        {"op": "set_visibility", "competition_id": first, "is_visible": False},
+        {"op": "update", "competition_id": "comp_gone", "data": {"title": "Nobody"}},
+    ])).json()
+    assert [(r["index"], r["status"]) for r in results] == [
+        (0, "updated"), (1, "deleted"), (2, "not_found"), (3, "invalid"), (4, "not_found")
+    ]
+    assert results[3]["detail"] == "Competition targeted twice in one batch"
+    remaining = await db.competitions.find({}, {"_id": 0, "title": 1, "is_visible": 1}).to_list(None)
+    assert remaining == [{"title": "Renamed", "is_visible": True}]
+
+
+@pytest.mark.parametrize("operation", [
+    {"op": "create", "data": {"title": "Missing fields"}},
+    {"op": "update", "data": {"title": "No target"}},
+    {"op": "update", "competition_id": "comp_1", "data": {"total_tickets": "many"}},
+    {"op": "set_visibility", "competition_id": "comp_1"},
+    {"op": "archive", "competition_id": "comp_1"},
+])
+async def test_malformed_operations_are_rejected_by_schema(api, db, make_user, operation):
+    admin, headers = await make_user("admin")
+    response = await _bulk(api, headers, [{"op": "delete", "competition_id": "comp_1"}, operation])
+    assert response.status_code == 422
+    assert all(error["loc"][:3] == ["body", "operations", 1] for error in response.json()["detail"])
+
+
+async def test_empty_update_is_invalid(api, db, make_user):
+    admin, headers = await make_user("admin")
+    competition_id = (await _bulk(api, headers, [{"op": "create", "data": COMPETITION}])).json()[0]["competition_id"]
+    result = (await _bulk(api, headers, [{"op": "update", "competition_id": competition_id, "data": {}}])).json()
+    assert result[0]["status"] == "invalid" and result[0]["detail"] == "No updates provided"
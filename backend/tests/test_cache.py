@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import core
+from cache import InvalidationBus, LocalCache, RETENTION
+
+pytestmark = pytest.mark.anyio
+
+
+def test_local_cache_ttl_and_invalidation():
+    cache = LocalCache()
+    cache.set("competitions", "a", 1, ttl=60)
+    cache.set("competitions", "b", 2, ttl=-1)
+    assert cache.get("competitions", "a") == 1
+    assert cache.get("competitions", "b") is None
+    cache.invalidate("competitions")
+    assert cache.get("competitions", "a") is None
+
+
+async def test_invalidation_during_a_load_is_not_overwritten():
+    cache = LocalCache()
+    bus = InvalidationBus(cache)
+    loading = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_loader():
+        loading.set()
+        await release.wait()
+        return "stale"
+
+    load = asyncio.create_task(cache.get_or_load("content", "faq", 60, slow_loader))
+    await loading.wait()
+    await bus.publish("content", "faq")
+    release.set()
+    assert await load == "stale"  # the caller still gets what it loaded
+    assert cache.get("content", "faq") is None
+    assert await cache.get_or_load("content", "faq", 60, lambda: asyncio.sleep(0, "fresh")) == "fresh"
+    assert cache.get("content", "faq") == "fresh"
+
+
+def test_refills_after_an_invalidation_read_the_primary(monkeypatch):
+    monkeypatch.setattr(core, "local_cache", LocalCache())
+    assert core.public_reads("content") is not core.db
+    core.local_cache.invalidate("content", "faq")
+    assert core.public_reads("content") is core.db
+    assert core.public_reads("competitions") is not core.db
+    assert core.public_reads() is not core.db
+    core.local_cache.invalidate_all()  # missed invalidations: anything may have changed
+    assert core.public_reads("competitions") is core.db
+    # Once every secondary within maxStalenessSeconds has the write, reads move back
+    monkeypatch.setattr(core, "PUBLIC_READ_MAX_STALENESS", 0)
+    assert core.public_reads("content") is not core.db
+
+
+async def test_polling_bus_delivers_other_workers_invalidations(db):
+    cache_a, cache_b = LocalCache(), LocalCache()
+    bus_a = InvalidationBus(cache_a, poll_interval=0.05)
+    bus_b = InvalidationBus(cache_b, poll_interval=0.05)
+    bus_b.use_change_stream = False
+    bus_a.db = db
+    bus_b.start(db)
+    try:
+        cache_a.set("content", "faq", {"items": []}, ttl=60)
+        cache_b.set("content", "faq", {"items": []}, ttl=60)
+        await asyncio.sleep(0.1)
+        await bus_a.publish("content", "faq")
+        assert cache_a.get("content", "faq") is None
+        for _ in range(40):
+            if cache_b.get("content", "faq") is None:
+                break
+            await asyncio.sleep(0.05)
+        assert cache_b.get("content", "faq") is None
+    finally:
+        await bus_b.stop()
+
+
+async def test_polling_gap_beyond_retention_resyncs(db):
+    cache = LocalCache()
+    cache.set("users", "user_1", {}, ttl=60)
+    bus = InvalidationBus(cache, poll_interval=0.05)
+    bus.use_change_stream = False
+    bus._last_poll = datetime.now(timezone.utc) - RETENTION - timedelta(minutes=1)
+    bus.start(db)
+    try:
+        await asyncio.sleep(0.1)
+        assert cache.get("users", "user_1") is None
+    finally:
+        await bus.stop()
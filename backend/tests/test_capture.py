@@ -0,0 +1,71 @@
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from capture import REDACTED, CaptureWriter, TrafficCaptureMiddleware, redact, redact_query
+
+pytestmark = pytest.mark.anyio
+
+
+def _app(writer, **options):
+    app = FastAPI()
+
+    @app.post("/api/items/{item_id}")
+    async def update_item(item_id: str, body: dict):
+        return {"item_id": item_id, **body}
+
+    app.add_middleware(TrafficCaptureMiddleware, writer=writer, **options)
+    return app
+
+
+def test_redaction():
+    assert redact({"quantity": 2, "password": "x", "card": {"number": "4242"}, "items": [{"api_key": "k"}]}) == {
+        "quantity": 2, "password": REDACTED, "card": REDACTED, "items": [{"api_key": REDACTED}]
+    }
+    assert redact_query("page=2&reset_token=abc") == "page=2&reset_token=%5Bredacted%5D"
+
+
+def test_personal_data_is_redacted():
+    signup = {"email": "a@b.c", "full_name": "Ann Example", "phone": "07700 900000", "password": "x"}
+    assert redact(signup) == dict.fromkeys(signup, REDACTED)
+    contact = {"name": "Ann", "email": "a@b.c", "message": "Call me on 07700 900000"}
+    assert redact(contact) == dict.fromkeys(contact, REDACTED)
+    assert redact({"customer_email": "a@b.c", "customer_name": "Ann", "amount": 5}) == {
+        "customer_email": REDACTED, "customer_name": REDACTED, "amount": 5
+    }
+    assert redact_query("email=a%40b.c&page=2") == "email=%5Bredacted%5D&page=2"
+
+
+async def test_captures_redacted_requests(tmp_path):
+    writer = CaptureWriter(str(tmp_path / "capture.ndjson"))
+    transport = httpx.ASGITransport(app=_app(writer, sample_rate=1.0, max_body_bytes=64))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/api/items/1?session=s", json={"title": "a", "new_password": "hunter2"},
+                          headers={"Authorization": "Bearer secret", "Cookie": "session_token=t",
+                                   "X-Forwarded-For": "203.0.113.7", "X-Real-IP": "203.0.113.7",
+                                   "Forwarded": "for=203.0.113.7", "Referer": "https://example.com/account?email=a"})
+        await client.post("/api/items/2", json={"title": "b" * 100})
+        await client.post("/other/path", json={})
+    writer.stop()
+
+    lines = (tmp_path / "capture.ndjson").read_text()
+    assert "hunter2" not in lines and "secret" not in lines and "session_token" not in lines
+    assert "203.0.113.7" not in lines and "example.com" not in lines
+    first, second = [json.loads(line) for line in lines.splitlines()]
+    assert first["route"] == "/api/items/{item_id}" and first["status"] == 200
+    assert first["query"] == "session=%5Bredacted%5D"
+    for name in ("authorization", "cookie", "x-forwarded-for", "x-real-ip", "forwarded", "referer"):
+        assert first["headers"][name] == REDACTED
+    assert first["body"] == {"title": "a", "new_password": REDACTED}
+    assert "body" not in second and second["body_bytes"] > 64
+
+
+async def test_unsampled_requests_are_not_written(tmp_path):
+    writer = CaptureWriter(str(tmp_path / "capture.ndjson"))
+    transport = httpx.ASGITransport(app=_app(writer, sample_rate=0.0))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.post("/api/items/1", json={"name": "a"})).status_code == 200
+    writer.stop()
+    assert (tmp_path / "capture.ndjson").read_text() == ""
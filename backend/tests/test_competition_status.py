@@ -0,0 +1,67 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import core
+from core import COMPETITION_STATUSES, OPEN_STATUS, competition_status_query, get_competition_status
+from migrations.competition_dates import migrate
+
+pytestmark = pytest.mark.anyio
+
+# Whole milliseconds, since BSON dates drop anything finer
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+TICK = timedelta(milliseconds=1)
+
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
+
+def _boundary_competitions() -> list:
+    draw_dates = [NOW - TICK, NOW, NOW + TICK, NOW + timedelta(hours=24), NOW + timedelta(hours=24) + TICK]
+    comps = []
+    for i, draw_date in enumerate(draw_dates):
+        for sold in (9, 10, None):
+            for winner_id in (None, "", "user_1"):
+                comp = {"competition_id": f"comp_{len(comps)}", "total_tickets": 10, "draw_date": draw_date, "winner_id": winner_id}
+                if sold is not None:
+                    comp["tickets_sold"] = sold
+                comps.append(comp)
+    return comps
+
+
+async def test_status_query_matches_computed_status_at_boundaries(db, monkeypatch):
+    monkeypatch.setattr(core, "datetime", _FrozenDatetime)
+    comps = _boundary_competitions()
+    await db.competitions.insert_many([dict(c) for c in comps])
+    for status in COMPETITION_STATUSES + (OPEN_STATUS,):
+        wanted = {"live", "ending_soon"} if status == OPEN_STATUS else {status}
+        expected = {c["competition_id"] for c in comps if get_competition_status(c) in wanted}
+        matched = await db.competitions.distinct("competition_id", competition_status_query(status, NOW))
+        assert set(matched) == expected, status
+    with pytest.raises(ValueError):
+        competition_status_query("upcoming", NOW)
+
+
+async def test_date_migration_converts_strings_once(db):
+    await db.competitions.insert_many([
+        {"competition_id": "comp_str", "draw_date": "2030-01-01T00:00:00Z", "created_at": "2026-01-01T10:00:00+02:00"},
+        {"competition_id": "comp_naive", "draw_date": "2030-01-01T00:00:00", "created_at": NOW},
+        {"competition_id": "comp_bad", "draw_date": "next tuesday", "created_at": "2026-01-01T00:00:00+00:00"},
+        {"competition_id": "comp_done", "draw_date": NOW, "created_at": NOW},
+    ])
+    assert await migrate(db, batch_size=2, dry_run=True) == 3
+    assert await db.competitions.count_documents({"draw_date": {"$type": "string"}}) == 3
+
+    assert await migrate(db, batch_size=2) == 3
+    docs = {d["competition_id"]: d async for d in db.competitions.find({}, {"_id": 0})}
+    assert core.parse_datetime(docs["comp_str"]["draw_date"]) == datetime(2030, 1, 1, tzinfo=timezone.utc)
+    assert core.parse_datetime(docs["comp_str"]["created_at"]) == datetime(2026, 1, 1, 8, tzinfo=timezone.utc)
+    assert core.parse_datetime(docs["comp_naive"]["draw_date"]) == datetime(2030, 1, 1, tzinfo=timezone.utc)
+    # Unparseable values are left for a human; the rest of the document still migrates
+    assert docs["comp_bad"]["draw_date"] == "next tuesday"
+    assert isinstance(docs["comp_bad"]["created_at"], datetime)
+
+    assert await migrate(db, batch_size=2) == 0  # the unparseable draw_date is skipped again
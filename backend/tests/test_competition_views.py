@@ -0,0 +1,44 @@
+import pytest
+from fastapi import HTTPException
+
+from models import CompetitionSummary
+from routers.competitions import competition_projection, competition_view
+
+pytestmark = pytest.mark.anyio
+
+
+def test_views_project_only_what_they_return():
+    assert competition_view("full", None) is None
+    assert competition_projection(None) == {"_id": 0}
+    assert competition_view("summary", None) is CompetitionSummary
+    assert "description" not in competition_projection(CompetitionSummary)
+
+    model = competition_view("full", "title, status")
+    assert list(model.model_fields) == ["competition_id", "title", "status"]
+    assert competition_view("full", "status,title") is model
+    projection = competition_projection(model)
+    assert "status" not in projection and {"title", "draw_date", "tickets_sold"} <= set(projection)
+
+    for view, fields in (("full", "title,password_hash"), ("summary", "title")):
+        with pytest.raises(HTTPException) as e:
+            competition_view(view, fields)
+        assert e.value.status_code == 400
+
+
+async def test_list_views(api, db, make_user, make_competition):
+    for i in range(3):
+        await make_competition(competition_id=f"comp_{i}", title=f"Prize {i}", description="Long text " * 50,
+                               total_tickets=10, tickets_sold=10 if i == 0 else 0)
+    full = (await api.get("/api/competitions")).json()
+    summary = (await api.get("/api/competitions?view=summary")).json()
+    assert len(full) == len(summary) == 3
+    assert set(summary[0]) == set(CompetitionSummary.model_fields)
+    assert {k: v for k, v in full[0].items() if k in summary[0]} == summary[0]
+
+    sparse = (await api.get("/api/competitions?fields=title,status&status=sold_out")).json()
+    assert sparse == [{"competition_id": "comp_0", "title": "Prize 0", "status": "sold_out"}]
+    assert (await api.get("/api/competitions?fields=nope")).status_code == 400
+
+    admin, headers = await make_user("admin")
+    rows = (await api.get("/api/admin/competitions?fields=title", headers=headers)).json()
+    assert sorted(rows, key=lambda r: r["competition_id"])[0] == {"competition_id": "comp_0", "title": "Prize 0"}
@@ -0,0 +1,101 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware, choose_encoding
+
+LARGE = {"items": [{"description": "Win this stunning car " * 5, "id": i} for i in range(50)]}
+
+
+def _app(**options):
+    app = Starlette(routes=[
+        Route("/large", lambda request: JSONResponse(LARGE)),
+        Route("/small", lambda request: JSONResponse({"ok": True})),
+        Route("/text", lambda request: PlainTextResponse("x" * 5000, media_type="image/svg+xml")),
+        Route("/stream", lambda request: StreamingResponse(iter([b"line,of,csv\n" * 200] * 5), media_type="text/csv")),
+    ])
+    middleware = CompressionMiddleware(app, **options)
+    return middleware, TestClient(middleware)
+
+
+def test_choose_encoding_respects_q_values():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("identity") is None
+
+
+def test_choose_encoding_prefers_highest_q(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("gzip, br") == "br"
+    assert choose_encoding("br;q=0, *;q=0.1") == "gzip"
+
+
+def test_compresses_large_json_and_reuses_cached_bytes():
+    middleware, client = _app()
+    first = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert first.json() == LARGE
+    second = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert second.content == first.content
+    assert middleware.cache.hits == 1 and middleware.cache.misses == 1
+
+
+@pytest.mark.parametrize("path", ["/small", "/text"])
+def test_skips_small_or_non_allowlisted(path):
+    _, client = _app()
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_cache_is_byte_bounded():
+    middleware, client = _app(cache_bytes=len(gzip.compress(b"{}")))
+    client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert middleware.cache.size <= middleware.cache.max_bytes
+
+
+def test_streamed_responses_are_compressed_incrementally():
+    _, client = _app()
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == "line,of,csv\n" * 1000
+
+
+@pytest.mark.anyio
+async def test_other_content_passes_through_unbuffered():
+    sent = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"image/webp")]})
+        # The start message is already out before the body is produced
+        assert sent and sent[0]["type"] == "http.response.start"
+        await send({"type": "http.response.body", "body": b"x" * 5000, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", b"gzip")]}
+    await CompressionMiddleware(app)(scope, None, send)
+    assert [m.get("more_body", False) for m in sent[1:]] == [True, False]
+    assert sent[1]["body"] == b"x" * 5000
+
+
+def test_large_bodies_compress_off_the_event_loop(monkeypatch):
+    threaded = []
+
+    async def to_thread(func, *args):
+        threaded.append(len(args[0]))
+        return func(*args)
+
+    monkeypatch.setattr(compression.asyncio, "to_thread", to_thread)
+    _, client = _app(thread_threshold=4096)
+    assert client.get("/large", headers={"Accept-Encoding": "gzip"}).json() == LARGE
+    assert threaded and threaded[0] >= 4096
@@ -0,0 +1,54 @@
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring, uri_parser
+
+import core
+from conftest import TEST_MONGO_URL
+from latency_proxy import LatencyProxy
+
+pytestmark = pytest.mark.anyio
+
+
+class MaxTimeLog(monitoring.CommandListener):
+    def __init__(self):
+        self.max_time_ms = []
+
+    def started(self, event):
+        if event.command_name == "find":
+            self.max_time_ms.append(event.command.get("maxTimeMS"))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@pytest.fixture
+async def proxy(db, monkeypatch):
+    latency_proxy = LatencyProxy(*uri_parser.parse_uri(TEST_MONGO_URL)["nodelist"][0])
+    await latency_proxy.start()
+    log = MaxTimeLog()
+    client = AsyncIOMotorClient(f"mongodb://127.0.0.1:{latency_proxy.port}", directConnection=True, event_listeners=[log])
+    monkeypatch.setattr(core, "client", client)
+    monkeypatch.setattr(core, "db", client[db.name])
+    monkeypatch.setattr(core, "REQUEST_DB_DEADLINE", 0.5)
+    latency_proxy.log = log
+    yield latency_proxy
+    client.close()
+    await latency_proxy.stop()
+
+
+async def test_request_deadline_sent_as_max_time_ms(api, proxy):
+    assert (await api.get("/api/competitions")).status_code == 200
+    assert proxy.log.max_time_ms and all(0 < ms <= 500 for ms in proxy.log.max_time_ms)
+
+
+async def test_slow_database_maps_to_503(api, proxy):
+    # Connect through the proxy first, so the timeout hits a query rather than the handshake
+    assert (await api.get("/api/competitions")).status_code == 200
+    core.local_cache.clear()
+    proxy.delay = 2.0
+    response = await api.get("/api/competitions")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
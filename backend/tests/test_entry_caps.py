@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+import entry_caps
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def capped(db, make_competition):
+    async def _capped(cap):
+        await entry_caps.ensure_indexes(db)
+        return await make_competition(competition_id="comp_1", max_tickets_per_user=cap)
+    return _capped
+
+
+async def _held(db, user_id):
+    orders = await db.orders.find({"user_id": user_id, "payment_status": {"$ne": "refunded"}}).to_list(None)
+    return sum(o["quantity"] for o in orders)
+
+
+async def test_concurrent_purchases_never_exceed_cap(api, db, make_user, capped):
+    await capped(10)
+    user, headers = await make_user()
+    responses = await asyncio.gather(*[
+        api.post("/api/tickets/purchase", json={"competition_id": "comp_1", "quantity": 3}, headers=headers)
+        for _ in range(20)
+    ])
+    assert sum(r.status_code == 200 for r in responses) == 3
+    assert {r.status_code for r in responses} == {200, 400}
+    assert await _held(db, user["user_id"]) == 9
+    counter = await db.entry_counts.find_one({"competition_id": "comp_1", "user_id": user["user_id"]})
+    assert counter["tickets"] == 9
+
+
+async def test_refund_releases_tickets(api, db, make_user, capped):
+    await capped(5)
+    user, headers = await make_user()
+    admin, admin_headers = await make_user("admin")
+    order = (await api.post("/api/tickets/purchase", json={"competition_id": "comp_1", "quantity": 5}, headers=headers)).json()
+    over = await api.post("/api/tickets/purchase", json={"competition_id": "comp_1", "quantity": 1}, headers=headers)
+    assert over.status_code == 400
+
+    assert (await api.post(f"/api/orders/{order['order_id']}/confirm", headers=headers)).status_code == 200
+    assert (await api.post(f"/api/admin/orders/{order['order_id']}/refund", headers=admin_headers)).status_code == 200
+
+    again = await api.post("/api/tickets/purchase", json={"competition_id": "comp_1", "quantity": 5}, headers=headers)
+    assert again.status_code == 200
+
+
+async def test_rebuild_counts_from_existing_orders(db):
+    await db.orders.insert_many([
+        {"competition_id": "comp_1", "user_id": "user_1", "quantity": 4, "payment_status": "completed"},
+        {"competition_id": "comp_1", "user_id": "user_1", "quantity": 2, "payment_status": "refunded"},
+        {"competition_id": "comp_1", "user_id": "user_2", "quantity": 1, "payment_status": "pending"},
+    ])
+    await db.entry_counts.insert_one({"competition_id": "comp_1", "user_id": "user_3", "tickets": 7})
+
+    await entry_caps.rebuild_counts(db, "comp_1")
+
+    counts = {c["user_id"]: c["tickets"] for c in await db.entry_counts.find({"competition_id": "comp_1"}).to_list(None)}
+    assert counts == {"user_1": 4, "user_2": 1}
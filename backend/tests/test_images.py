@@ -0,0 +1,102 @@
+import io
+import os
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from PIL import Image
+
+import core
+from images import ImageStore, ImmutableStaticFiles, InvalidImage, render_variants
+
+pytestmark = pytest.mark.anyio
+
+
+def _png(width=800, height=600, mode="RGBA") -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, (width, height), (200, 30, 30, 128)[:len(mode)]).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_render_variants_never_upscales(tmp_path):
+    original = tmp_path / "original"
+    original.write_bytes(_png())
+    out = tmp_path / "variants"
+    result = render_variants(str(original), str(out), [320, 1280])
+    assert (result["width"], result["height"]) == (800, 600)
+    assert sorted(os.listdir(out)) == ["1280.jpg", "1280.webp", "320.jpg", "320.webp"]
+    with Image.open(out / "320.webp") as small, Image.open(out / "1280.jpg") as large:
+        assert small.size == (320, 240) and large.size == (800, 600) and large.mode == "RGB"
+
+    written = os.path.getmtime(out / "320.jpg")
+    render_variants(str(original), str(out), [320, 640])  # only 640 is new
+    assert os.path.getmtime(out / "320.jpg") == written and (out / "640.webp").exists()
+
+    (tmp_path / "junk").write_bytes(b"not an image")
+    with pytest.raises(InvalidImage):
+        render_variants(str(tmp_path / "junk"), str(out), [320])
+
+
+def test_variants_come_from_the_url():
+    store = ImageStore("/tmp/unused", widths=[640, 320])
+    url = store.default_url("ab" * 12)
+    assert url == "/api/media/abababababababababababab/640.jpg"
+    assert [(v["width"], v["format"]) for v in store.variants_for(url)] == [
+        (320, "webp"), (320, "jpeg"), (640, "webp"), (640, "jpeg")
+    ]
+    assert store.variants_for("https://images.unsplash.com/photo-1.jpg") is None
+
+
+async def test_ingest_renders_in_the_pool(tmp_path):
+    store = ImageStore(tmp_path, widths=[64], workers=1)
+    try:
+        image = await store.ingest(_png(mode="RGB"))
+        with pytest.raises(InvalidImage):
+            await store.ingest(b"junk")
+    finally:
+        store.shutdown()
+    assert image["image_url"] == f"/api/media/{image['image_id']}/64.jpg"
+    assert (tmp_path / "variants" / image["image_id"] / "64.webp").exists()
+    assert sorted(os.listdir(tmp_path / "originals")) == [image["image_id"]]  # the junk isn't kept
+
+    app = FastAPI()
+    app.mount("/api/media", ImmutableStaticFiles(directory=store.variants_dir))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get(image["image_url"])
+    assert response.status_code == 200 and "immutable" in response.headers["cache-control"]
+
+
+async def test_pool_is_replaced_after_a_worker_dies(tmp_path):
+    store = ImageStore(tmp_path, widths=[64], workers=1)
+    try:
+        await store.ingest(_png(mode="RGB"))
+        broken = store._pool
+        for process in list(broken._processes.values()):
+            process.kill()
+        image = await store.ingest(_png(100, 80, mode="RGB"))
+        assert store._pool is not None and store._pool is not broken
+    finally:
+        store.shutdown()
+    assert (tmp_path / "variants" / image["image_id"] / "64.jpg").exists()
+
+
+async def test_upload_and_competition_variants(api, db, make_user, tmp_path, monkeypatch):
+    monkeypatch.setattr(core.image_store, "root", tmp_path)
+    admin, headers = await make_user("admin")
+    user, user_headers = await make_user()
+    files = {"file": ("prize.png", _png(), "image/png")}
+    assert (await api.post("/api/admin/images", files=files, headers=user_headers)).status_code == 403
+    upload = await api.post("/api/admin/images", files=files, headers=headers)
+    assert upload.status_code == 200
+    image = upload.json()
+    assert await db.images.count_documents({"_id": image["image_id"]}) == 1
+    bad = await api.post("/api/admin/images", files={"file": ("x.png", b"junk", "image/png")}, headers=headers)
+    assert bad.status_code == 400
+
+    created = await api.post("/api/admin/competitions", headers=headers, json={
+        "title": "Car", "description": "", "category": "cars", "prize_value": 1, "ticket_price": 1,
+        "total_tickets": 10, "draw_date": "2099-01-01T00:00:00+00:00", "image_url": image["image_url"]
+    })
+    assert {v["url"] for v in created.json()["image_variants"]} == {v["url"] for v in image["variants"]}
+    summary = (await api.get("/api/competitions?view=summary")).json()
+    assert summary[0]["image_variants"] == created.json()["image_variants"]
@@ -0,0 +1,83 @@
+import io
+import json
+import logging
+
+import pytest
+
+import core
+import logs
+from logs import JsonFormatter, LogPolicy, SamplingFilter, configure_logging, parse_policies, stop_logging
+
+
+def record(name="core.email", level=logging.INFO, msg="sent to %s", args=("a@example.com",), **extra):
+    entry = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    entry.__dict__.update(extra)
+    return entry
+
+
+def test_json_formatter_renders_message_and_extras():
+    line = json.loads(JsonFormatter().format(record(order_id="order_1")))
+    assert line["level"] == "INFO"
+    assert line["logger"] == "core.email"
+    assert line["message"] == "sent to a@example.com"
+    assert line["order_id"] == "order_1"
+    assert "args" not in line and "msg" not in line
+
+
+def test_sampling_only_applies_below_warning(monkeypatch):
+    monkeypatch.setattr(logs.random, "random", lambda: 0.5)
+    sampler = SamplingFilter({"core": LogPolicy(sample_rate=0.1)})
+    assert not sampler.filter(record())
+    assert sampler.filter(record(level=logging.ERROR))
+    # Other loggers have no policy
+    assert sampler.filter(record(name="routers.orders"))
+
+    monkeypatch.setattr(logs.random, "random", lambda: 0.05)
+    kept = record()
+    assert sampler.filter(kept)
+    assert kept.sample_rate == 0.1
+
+
+def test_rate_limit_reports_suppressed_count(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(logs.time, "monotonic", lambda: clock[0])
+    sampler = SamplingFilter({"app": LogPolicy(per_second=2)})
+    results = [sampler.filter(record(name="app", level=logging.WARNING)) for _ in range(5)]
+    assert results == [True, True, False, False, False]
+
+    clock[0] += 1
+    resumed = record(name="app", level=logging.WARNING)
+    assert sampler.filter(resumed)
+    assert resumed.suppressed == 3
+
+
+def test_parse_policies():
+    assert parse_policies(" core.email=0.1, app=1:20,") == {
+        "core.email": LogPolicy(sample_rate=0.1),
+        "app": LogPolicy(sample_rate=1.0, per_second=20.0),
+    }
+    assert parse_policies("") == {}
+
+
+@pytest.fixture
+def restore_logging():
+    was_configured = logs._handler is not None
+    level = logging.getLogger().level
+    yield
+    stop_logging()
+    if was_configured:
+        configure_logging(core.LOG_LEVEL, core.LOG_FORMAT, core.LOG_POLICIES)
+    logging.getLogger().setLevel(level)
+
+
+def test_configure_logging_writes_json_through_the_queue(restore_logging):
+    stream = io.StringIO()
+    configure_logging("INFO", "json", {"noisy": LogPolicy(sample_rate=0)}, stream=stream)
+    logging.getLogger("routers.orders").info("Reconciled tickets_sold for %s", "comp_1")
+    logging.getLogger("noisy.child").info("dropped")
+    logging.getLogger("uvicorn.access").warning("through the queue too")
+    stop_logging()  # drains the queue
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == ["Reconciled tickets_sold for comp_1", "through the queue too"]
+    assert logging.getLogger("uvicorn.access").handlers == []
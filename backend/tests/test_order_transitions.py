@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from routers import orders
+
+pytestmark = pytest.mark.anyio
+
+
+async def _orders(db, user_id, count, quantity=3):
+    await db.competitions.insert_one({"competition_id": "comp_1", "tickets_sold": 0, "total_tickets": 1000})
+    await db.orders.insert_many([{
+        "order_id": f"order_{i}", "user_id": user_id, "competition_id": "comp_1",
+        "competition_title": "Comp", "ticket_numbers": list(range(i * quantity + 1, (i + 1) * quantity + 1)),
+        "quantity": quantity, "total_price": 3.0, "payment_status": "pending",
+        "created_at": "2026-01-01T00:00:00+00:00"
+    } for i in range(count)])
+
+
+async def test_concurrent_confirms_count_once(api, db, make_user, mode):
+    user, headers = await make_user()
+    await _orders(db, user["user_id"], count=5)
+    responses = await asyncio.gather(*[
+        api.post(f"/api/orders/order_{i % 5}/confirm", headers=headers) for i in range(50)
+    ])
+    assert sum(r.status_code == 200 for r in responses) == 5
+    assert {r.status_code for r in responses} == {200, 400}
+    comp = await db.competitions.find_one({"competition_id": "comp_1"})
+    assert comp["tickets_sold"] == 15
+    assert await db.orders.count_documents({"counter_pending": {"$exists": True}}) == 0
+
+
+async def test_concurrent_refunds_count_once(api, db, make_user, mode):
+    user, headers = await make_user()
+    admin, admin_headers = await make_user(role="admin")
+    await _orders(db, user["user_id"], count=2)
+    for i in range(2):
+        assert (await api.post(f"/api/orders/order_{i}/confirm", headers=headers)).status_code == 200
+    responses = await asyncio.gather(*[
+        api.post(f"/api/admin/orders/order_{i % 2}/refund", headers=admin_headers) for i in range(20)
+    ])
+    assert sum(r.status_code == 200 for r in responses) == 2
+    comp = await db.competitions.find_one({"competition_id": "comp_1"})
+    assert comp["tickets_sold"] == 0
+    # Refunded orders can't be confirmed back into the draw
+    assert (await api.post("/api/orders/order_0/confirm", headers=headers)).status_code == 400
+
+
+async def test_reconcile_counts_archived_orders_and_keeps_fresh_markers(db):
+    now = datetime.now(timezone.utc)
+    await _orders(db, "user_1", count=3)
+    await db.orders_archive.insert_one({
+        "order_id": "order_archived", "user_id": "user_1", "competition_id": "comp_1",
+        "quantity": 10, "payment_status": "completed"
+    })
+    await db.orders.update_one({"order_id": "order_0"}, {"$set": {"payment_status": "completed", "counter_pending": now - timedelta(minutes=5)}})
+    # Completed a moment ago; its own counter write may still be on the way
+    await db.orders.update_one({"order_id": "order_1"}, {"$set": {"payment_status": "completed", "counter_pending": now}})
+
+    await orders.reconcile_ticket_counts()
+
+    comp = await db.competitions.find_one({"competition_id": "comp_1"})
+    assert comp["tickets_sold"] == 16
+    assert "counter_pending" not in await db.orders.find_one({"order_id": "order_0"})
+    assert "counter_pending" in await db.orders.find_one({"order_id": "order_1"})
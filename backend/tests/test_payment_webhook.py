@@ -0,0 +1,142 @@
+from datetime import timedelta
+
+import pytest
+
+import core
+import payment_events
+from payment_events import EVENT_FAILED, PaymentEventWorker, ensure_indexes
+from routers import orders as orders_router
+from fake_payment_provider import FakePaymentProvider
+
+pytestmark = pytest.mark.anyio
+
+SECRET = "test-webhook-secret"
+
+
+@pytest.fixture
+async def provider(api, db, monkeypatch):
+    monkeypatch.setattr(core, "PAYMENT_WEBHOOK_SECRET", SECRET)
+    await ensure_indexes(db)
+    return FakePaymentProvider(api, SECRET)
+
+
+async def _pending_orders(db, count, quantity=2):
+    await db.competitions.insert_one({"competition_id": "comp_1", "tickets_sold": 0, "total_tickets": 1000})
+    orders = [{
+        "order_id": f"order_{i}", "user_id": "user_1", "competition_id": "comp_1",
+        "ticket_numbers": [i * 2 + 1, i * 2 + 2], "quantity": quantity, "total_price": 2.0,
+        "payment_status": "pending", "created_at": "2026-01-01T00:00:00+00:00"
+    } for i in range(count)]
+    await db.orders.insert_many(orders)
+    return orders
+
+
+async def test_rejects_bad_signature(provider):
+    response = await provider.send(provider.event("order_0"), secret="wrong")
+    assert response.status_code == 401
+
+
+async def test_replayed_events_confirm_once(provider, db):
+    orders = await _pending_orders(db, 20)
+    for order in orders:
+        event = provider.event(order["order_id"], amount=order["total_price"])
+        assert (await provider.send(event)).json() == {"status": "ok"}
+    replies = await provider.replay(times=2)
+    assert {r.json()["status"] for r in replies} == {"duplicate"}
+    assert await db.payment_events.count_documents({}) == 20
+
+    worker = PaymentEventWorker(batch_size=8)
+    worker.db = db
+    while await worker.process_batch():
+        pass
+
+    comp = await db.competitions.find_one({"competition_id": "comp_1"})
+    assert comp["tickets_sold"] == 40
+    assert await db.orders.count_documents({"payment_status": "completed"}) == 20
+    assert await db.payment_events.count_documents({"status": "processed"}) == 20
+
+
+async def test_failed_event_and_duplicate_order_event(provider, db):
+    await _pending_orders(db, 2)
+    await provider.send(provider.event("order_0", amount=2.0))
+    await provider.send(provider.event("order_0", amount=2.0))  # second provider event for the same order
+    await provider.send(provider.event("order_1", event_type=EVENT_FAILED))
+
+    worker = PaymentEventWorker()
+    worker.db = db
+    await worker.process_batch()
+
+    comp = await db.competitions.find_one({"competition_id": "comp_1"})
+    assert comp["tickets_sold"] == 2
+    assert (await db.orders.find_one({"order_id": "order_1"}))["payment_status"] == "failed"
+
+
+async def test_amount_must_match_the_order(provider, db):
+    await _pending_orders(db, 3)
+    await provider.send(provider.event("order_0", amount=0.01))
+    await provider.send(provider.event("order_1"))  # no amount at all
+    await provider.send(provider.event("order_2", amount="2.00"))
+
+    worker = PaymentEventWorker()
+    worker.db = db
+    await worker.process_batch()
+
+    statuses = {o["order_id"]: o["payment_status"] for o in await db.orders.find().to_list(None)}
+    assert statuses == {"order_0": "pending", "order_1": "pending", "order_2": "completed"}
+    rejected = await db.payment_events.find({"status": "rejected"}).to_list(None)
+    assert sorted(e["order_id"] for e in rejected) == ["order_0", "order_1"]
+    assert {e["error"] for e in rejected} == {"amount_mismatch"}
+    assert (await db.competitions.find_one({"competition_id": "comp_1"}))["tickets_sold"] == 2
+
+
+async def test_counts_lost_to_a_crash_are_reconciled(provider, db, monkeypatch):
+    orders = await _pending_orders(db, 3)
+    for order in orders:
+        await provider.send(provider.event(order["order_id"], amount=order["total_price"]))
+
+    async def crash(db, orders):
+        raise RuntimeError("worker died")
+    monkeypatch.setattr(payment_events, "apply_ticket_counts", crash)
+    worker = PaymentEventWorker()
+    worker.db = db
+    with pytest.raises(RuntimeError):
+        await worker.process_batch()
+    assert await db.orders.count_documents({"payment_status": "completed", "counter_pending": {"$exists": True}}) == 3
+    assert (await db.competitions.find_one({"competition_id": "comp_1"}))["tickets_sold"] == 0
+
+    await orders_router.reconcile_ticket_counts(older_than=timedelta(0))
+    assert (await db.competitions.find_one({"competition_id": "comp_1"}))["tickets_sold"] == 6
+    assert await db.orders.count_documents({"counter_pending": {"$exists": True}}) == 0
+
+
+async def test_failed_order_is_confirmed_by_a_later_payment(provider, db):
+    await _pending_orders(db, 1)
+    await db.orders.update_one({"order_id": "order_0"}, {"$set": {"payment_status": "failed"}})
+    await provider.send(provider.event("order_0", amount=2.0))
+
+    worker = PaymentEventWorker()
+    worker.db = db
+    await worker.process_batch()
+
+    assert (await db.orders.find_one({"order_id": "order_0"}))["payment_status"] == "completed"
+    assert (await db.competitions.find_one({"competition_id": "comp_1"}))["tickets_sold"] == 2
+    assert (await db.payment_events.find_one({}))["status"] == "processed"
+
+
+async def test_payment_for_an_unpayable_order_is_unmatched(provider, db):
+    await _pending_orders(db, 2)
+    await db.orders.update_one({"order_id": "order_0"}, {"$set": {"payment_status": "expired"}})
+    await provider.send(provider.event("order_0", amount=2.0))
+    await provider.send(provider.event("order_missing", amount=2.0))
+    await provider.send(provider.event("order_1", amount=2.0))
+
+    worker = PaymentEventWorker()
+    worker.db = db
+    await worker.process_batch()
+
+    unmatched = await db.payment_events.find({"status": "unmatched"}).to_list(None)
+    assert sorted(e["order_id"] for e in unmatched) == ["order_0", "order_missing"]
+    assert {e["error"] for e in unmatched} == {"order_not_payable"}
+    assert (await db.orders.find_one({"order_id": "order_0"}))["payment_status"] == "expired"
+    assert (await db.payment_events.find_one({"order_id": "order_1"}))["status"] == "processed"
+    assert (await db.competitions.find_one({"competition_id": "comp_1"}))["tickets_sold"] == 2
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+
+from profiling import Profiler
+
+pytestmark = pytest.mark.anyio
+
+
+def _busy(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _finished(profiler: Profiler, **options):
+    """Start a session and a future that gets it once the sampler ends it"""
+    done = asyncio.get_running_loop().create_future()
+
+    async def on_done(session):
+        done.set_result(session)
+
+    options = {"path_prefix": "/api", "sample_rate": 1.0, "duration_seconds": 60, "interval_ms": 1, **options}
+    return profiler.start(**options, on_done=on_done), done
+
+
+async def test_samples_profiled_requests():
+    profiler = Profiler()
+    session, _ = await _finished(profiler)
+    assert profiler.should_profile("/api/competitions")
+    assert not profiler.should_profile("/health")
+    with profiler.sampling():
+        _busy(0.1)
+    assert profiler.stop() is session
+    assert profiler.session is None and not profiler.should_profile("/api/competitions")
+    assert session.requests_profiled == 1 and session.samples > 0
+    assert "test_profiling:_busy" in session.collapsed()
+    # stop() doesn't wait for the sampler, so a new session can start right away
+    profiler.start("/api", 1.0, 60, 1)
+    profiler.stop()
+
+
+async def test_session_ends_after_max_requests():
+    profiler = Profiler()
+    session, done = await _finished(profiler, max_requests=2)
+    for _ in range(2):
+        assert profiler.should_profile("/api/orders/my")
+        with profiler.sampling():
+            _busy(0.01)
+    assert not profiler.should_profile("/api/orders/my")
+    assert await asyncio.wait_for(done, timeout=2) is session
+    assert profiler.session is None and session.requests_profiled == 2
+
+
+async def test_session_ends_when_it_expires():
+    profiler = Profiler()
+    session, done = await _finished(profiler, duration_seconds=0)
+    assert not profiler.should_profile("/api/competitions")
+    assert await asyncio.wait_for(done, timeout=2) is session
+    assert profiler.session is None and session.requests_profiled == 0
+
+
+async def test_stopped_session_is_not_handed_over():
+    profiler = Profiler()
+    _, done = await _finished(profiler, duration_seconds=0)
+    profiler.stop()
+    await asyncio.sleep(0.05)
+    assert not done.done()
+
+
+async def test_admin_session_is_saved_when_done(api, db, make_user):
+    admin, headers = await make_user("admin")
+    started = await api.post("/api/admin/profiling", headers=headers,
+                             json={"path_prefix": "/api/competitions", "max_requests": 1, "interval_ms": 1})
+    assert started.status_code == 200
+    await api.get("/api/competitions")
+    for _ in range(100):
+        if await db.profiles.find_one({"profile_id": started.json()["profile_id"]}):
+            break
+        await asyncio.sleep(0.01)
+    profiles = (await api.get("/api/admin/profiling", headers=headers)).json()
+    assert [p["requests_profiled"] for p in profiles] == [1]
+    assert (await api.delete("/api/admin/profiling", headers=headers)).status_code == 404
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import core
+from query_budget import QueryBudget, assert_max_queries, command_shape, track_queries
+
+pytestmark = pytest.mark.anyio
+
+
+def test_command_shape_ignores_filter_values():
+    first = command_shape("find", {"find": "competitions", "filter": {"competition_id": "comp_a"}})
+    second = command_shape("find", {"find": "competitions", "filter": {"competition_id": "comp_b"}})
+    assert first == second == ("find", "competitions", ("competition_id",))
+
+
+def test_nested_budgets_roll_up():
+    with track_queries() as outer:
+        with track_queries() as inner:
+            inner.record_command(("find", "users", ()))
+            inner.record_reply(2, 100)
+    assert (inner.commands, inner.documents, inner.bytes) == (1, 2, 100)
+    assert (outer.commands, outer.documents, outer.bytes) == (1, 2, 100)
+
+
+def test_repeated_shapes_flags_n_plus_one():
+    budget = QueryBudget()
+    for _ in range(3):
+        budget.record_command(("find", "competitions", ("competition_id",)))
+    assert budget.repeated_shapes() == {("find", "competitions", ("competition_id",)): 3}
+
+
+async def _seed_orders(db, user_id, competitions):
+    draw_date = (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()
+    for i in range(competitions):
+        comp_id = f"comp_{i}"
+        await db.competitions.insert_one({
+            "competition_id": comp_id, "title": f"Comp {i}", "total_tickets": 100,
+            "tickets_sold": 1, "draw_date": draw_date
+        })
+        await db.orders.insert_one({
+            "order_id": f"order_{i}", "user_id": user_id, "competition_id": comp_id,
+            "ticket_numbers": [i + 1], "quantity": 1, "total_price": 1.0,
+            "payment_status": "completed", "created_at": draw_date
+        })
+
+
+async def test_my_tickets_does_not_scale_with_competitions(api, db, make_user):
+    user, headers = await make_user()
+    await _seed_orders(db, user["user_id"], competitions=5)
+    with assert_max_queries(3):
+        response = await api.get("/api/tickets/my", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+
+
+async def test_update_profile_single_write(api, db, make_user):
+    user, headers = await make_user()
+    with assert_max_queries(2):
+        response = await api.put("/api/auth/profile", json={"full_name": "Renamed"}, headers=headers)
+    assert response.json()["full_name"] == "Renamed"
+
+
+async def test_admin_stats_budget(api, db, make_user):
+    admin, headers = await make_user(role="admin")
+    await _seed_orders(db, admin["user_id"], competitions=3)
+    with assert_max_queries(5):
+        response = await api.get("/api/admin/stats", headers=headers)
+    assert response.json()["total_orders"] == 3
+
+
+async def test_debug_headers(api, db, make_user, monkeypatch):
+    monkeypatch.setattr(core, "DB_QUERY_DEBUG", True)
+    user, headers = await make_user()
+    response = await api.get("/api/auth/me", headers=headers)
+    assert response.headers["X-DB-Commands"] == "1"
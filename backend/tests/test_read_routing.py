@@ -0,0 +1,160 @@
+"""Public reads go to secondaries, read-your-writes paths stay on the primary.
+
+Starts a throwaway 3-node replica set with the local ``mongod`` binary
+(skipped when it isn't installed). Member 0 is the only electable node, so
+the primary is known up front.
+"""
+import shutil
+import socket
+import subprocess
+import time
+from datetime import datetime, timezone, timedelta
+
+import httpx
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, WriteConcern, monitoring
+from pymongo.errors import PyMongoError
+
+import core
+import security
+import server
+
+pytestmark = pytest.mark.anyio
+
+REPLICA_SET = "x67_rs_test"
+DB_NAME = "x67_digital_rs_test"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def replica_set(tmp_path_factory):
+    mongod = shutil.which("mongod")
+    if mongod is None:
+        pytest.skip("mongod not installed")
+    ports = [_free_port() for _ in range(3)]
+    processes = [
+        subprocess.Popen(
+            [mongod, "--replSet", REPLICA_SET, "--port", str(port), "--bind_ip", "127.0.0.1",
+             "--dbpath", str(tmp_path_factory.mktemp(f"rs{i}")), "--quiet"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for i, port in enumerate(ports)
+    ]
+    try:
+        seed = MongoClient(port=ports[0], directConnection=True, serverSelectionTimeoutMS=30000)
+        seed.admin.command("replSetInitiate", {"_id": REPLICA_SET, "members": [
+            {"_id": i, "host": f"127.0.0.1:{port}", "priority": 1 if i == 0 else 0}
+            for i, port in enumerate(ports)
+        ]})
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                states = [m["stateStr"] for m in seed.admin.command("replSetGetStatus")["members"]]
+            except PyMongoError:
+                states = []
+            if sorted(states) == ["PRIMARY", "SECONDARY", "SECONDARY"]:
+                break
+            if time.monotonic() > deadline:
+                pytest.fail(f"Replica set did not come up: {states}")
+            time.sleep(0.5)
+        seed.close()
+        yield {
+            "url": f"mongodb://{','.join(f'127.0.0.1:{p}' for p in ports)}/?replicaSet={REPLICA_SET}",
+            "primary": ("127.0.0.1", ports[0]),
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+
+class CommandLog(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self.commands.append((event.command_name, collection, event.connection_id))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def servers_for(self, command_name, collection):
+        return {address for name, coll, address in self.commands if name == command_name and coll == collection}
+
+
+@pytest.fixture
+async def rs(replica_set, monkeypatch):
+    log = CommandLog()
+    client = AsyncIOMotorClient(replica_set["url"], event_listeners=[log])
+    await client.drop_database(DB_NAME)
+    rs_db = client[DB_NAME]
+    monkeypatch.setattr(core, "client", client)
+    monkeypatch.setattr(core, "db", rs_db)
+    core.local_cache.clear()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+        yield api, rs_db.with_options(write_concern=WriteConcern(w=3)), log, replica_set["primary"]
+    await client.drop_database(DB_NAME)
+    client.close()
+
+
+async def test_public_listing_reads_from_secondary(rs):
+    api, seeded_db, log, primary = rs
+    draw_date = datetime.now(timezone.utc) + timedelta(days=7)
+    # w=3 so every secondary already has the document
+    await seeded_db.competitions.insert_one({
+        "competition_id": "comp_1", "title": "Replica prize", "description": "", "category": "cash",
+        "prize_value": 100, "ticket_price": 1.0, "total_tickets": 100, "tickets_sold": 0,
+        "draw_date": draw_date, "image_url": "", "featured": False, "auto_draw": True,
+        "is_visible": True, "created_at": datetime.now(timezone.utc)
+    })
+
+    response = await api.get("/api/competitions")
+
+    assert [c["competition_id"] for c in response.json()] == ["comp_1"]
+    servers = log.servers_for("find", "competitions")
+    assert servers and primary not in servers
+
+
+async def test_own_orders_read_from_primary(rs):
+    api, seeded_db, log, primary = rs
+    await seeded_db.users.insert_one({
+        "user_id": "user_1", "email": "rs@example.com", "full_name": "RS", "role": "user",
+        "email_verified": True, "created_at": "2026-01-01T00:00:00+00:00"
+    })
+    headers = {"Authorization": f"Bearer {security.create_token('user_1')}"}
+
+    assert (await api.get("/api/auth/me", headers=headers)).status_code == 200
+    assert (await api.get("/api/orders/my", headers=headers)).status_code == 200
+
+    assert log.servers_for("find", "users") == {primary}
+    assert log.servers_for("find", "orders") == {primary}
+
+
+async def test_refill_after_invalidation_reads_from_primary(rs):
+    api, seeded_db, log, primary = rs
+    await seeded_db.users.insert_one({
+        "user_id": "admin_1", "email": "rs-admin@example.com", "full_name": "RS", "role": "admin",
+        "email_verified": True, "created_at": "2026-01-01T00:00:00+00:00"
+    })
+    headers = {"Authorization": f"Bearer {security.create_token('admin_1', 'admin')}"}
+    assert (await api.get("/api/content/faq")).json() == {"items": []}
+    assert primary not in log.servers_for("find", "content")
+
+    faq = [{"question": "When is the draw?", "answer": "On the draw date."}]
+    assert (await api.put("/api/admin/content/faq", json=faq, headers=headers)).status_code == 200
+    log.commands.clear()
+    # The write went to the primary with w=1; a secondary may not have it yet
+    assert (await api.get("/api/content/faq")).json()["items"] == faq
+    assert log.servers_for("find", "content") == {primary}
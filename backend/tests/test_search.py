@@ -0,0 +1,47 @@
+import pytest
+
+from search import PrefixIndex
+
+pytestmark = pytest.mark.anyio
+
+
+def test_prefix_matches_any_word_and_phrases():
+    index = PrefixIndex()
+    index.rebuild([
+        {"competition_id": "c1", "title": "BMW M4 Competition"},
+        {"competition_id": "c2", "title": "Mercedes AMG GT 63"},
+        {"competition_id": "c3", "title": "£10,000 Cash Prize"},
+    ])
+    assert [r["competition_id"] for r in index.complete("bmw m")] == ["c1"]
+    assert [r["competition_id"] for r in index.complete("AMG")] == ["c2"]
+    assert [r["competition_id"] for r in index.complete("cash")] == ["c3"]
+    assert index.complete("   ") == []
+
+
+def test_incremental_add_update_remove():
+    index = PrefixIndex()
+    index.add("c1", "PS5 Pro Bundle")
+    assert index.complete("ps5") == [{"competition_id": "c1", "title": "PS5 Pro Bundle"}]
+    index.add("c1", "Xbox Series X")
+    assert index.complete("ps5") == []
+    assert len(index.complete("xbox")) == 1
+    index.remove("c1")
+    assert index.complete("xbox") == []
+    assert len(index) == 0
+
+
+async def test_autocomplete_follows_admin_changes(api, db, make_user):
+    admin, headers = await make_user(role="admin")
+    payload = {
+        "title": "Audi RS6 Avant", "description": "Super estate", "category": "cars",
+        "prize_value": 1000, "ticket_price": 1, "total_tickets": 100,
+        "draw_date": "2030-01-01T00:00:00+00:00", "image_url": "https://example.com/a.jpg"
+    }
+    created = (await api.post("/api/admin/competitions", json=payload, headers=headers)).json()
+    assert (await api.get("/api/competitions/autocomplete", params={"q": "rs6"})).json()[0]["title"] == "Audi RS6 Avant"
+
+    await api.put(f"/api/admin/competitions/{created['competition_id']}", json={"title": "Audi RS7"}, headers=headers)
+    assert (await api.get("/api/competitions/autocomplete", params={"q": "rs6"})).json() == []
+
+    await api.delete(f"/api/admin/competitions/{created['competition_id']}", headers=headers)
+    assert (await api.get("/api/competitions/autocomplete", params={"q": "audi"})).json() == []
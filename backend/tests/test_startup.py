@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Same list benchmarks.importtime gates on (importing benchmarks would repoint MONGO_URL)
+LAZY_MODULES = ("resend", "httpx", "bcrypt", "jwt", "PIL", "email_validator")
+
+
+def _import_in_fresh_interpreter(code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=os.environ, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+def test_import_skips_lazy_dependencies():
+    loaded = _import_in_fresh_interpreter(
+        f"import sys, server; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    assert loaded == ""
+
+
+def test_core_import_does_not_connect():
+    assert _import_in_fresh_interpreter("import core, routers.admin; print(core.client)") == "None"
+
+
+def test_routes_keep_their_precedence():
+    import server
+
+    paths = [route.path for route in server.app.routes]
+    assert paths.index("/api/competitions/search") < paths.index("/api/competitions/{competition_id}")
+    assert paths.index("/api/admin/content/faq") < paths.index("/api/admin/content/{content_type}")
@@ -0,0 +1,135 @@
+import asyncio
+import base64
+import zlib
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import core
+import order_holds
+import ticket_map
+from ticket_map import CHANGE_LOG, TicketMap
+from tickets import encode_tickets
+
+pytestmark = pytest.mark.anyio
+
+
+def _bitmap_numbers(payload: dict) -> set:
+    bits = zlib.decompress(base64.b64decode(payload["bitmap"]))
+    return {i + 1 for i in range(len(bits) * 8) if bits[i >> 3] >> (i & 7) & 1}
+
+
+def test_map_round_trip_and_delta():
+    current = TicketMap("comp_1", 100, 0, bytearray(13), [])
+    current.apply(1, claimed=[1, 64, 100])
+    current.apply(2, claimed=[7], released=[64])
+    assert 1 in current and 64 not in current and 101 not in current
+    assert current.taken() == {1, 7, 100}
+    payload = current.payload()
+    assert payload["taken"] == 3 and payload["version"] == 2
+    assert _bitmap_numbers(payload) == {1, 7, 100}
+
+    assert current.delta(0) == {"competition_id": "comp_1", "version": 2, "claimed": [1, 7, 100], "released": [64]}
+    assert current.delta(2)["claimed"] == []
+    assert current.delta(3) is None  # from the future, e.g. another database
+
+    for version in range(3, CHANGE_LOG + 4):
+        current.apply(version, claimed=[version])
+    assert current.delta(1) is None  # older than the change log
+
+
+async def test_map_is_built_from_held_orders(api, db, make_competition):
+    await make_competition(competition_id="comp_1")
+    await db.orders.insert_many([
+        {"competition_id": "comp_1", "user_id": "user_1", "quantity": 2, "payment_status": "completed", "ticket_numbers": [3, 4]},
+        {"competition_id": "comp_1", "user_id": "user_1", "quantity": 1, "payment_status": "pending", "ticket_pack": encode_tickets([9])},
+        {"competition_id": "comp_1", "user_id": "user_2", "quantity": 1, "payment_status": "refunded", "ticket_numbers": [5]},
+    ])
+    response = await api.get("/api/competitions/comp_1/tickets")
+    assert response.status_code == 200
+    assert _bitmap_numbers(response.json()) == {3, 4, 9}
+    assert (await api.get("/api/competitions/missing/tickets")).status_code == 404
+
+
+async def test_concurrent_claims_of_one_number(api, db, make_user, make_competition):
+    await make_competition(competition_id="comp_1")
+    buyers = [await make_user() for _ in range(10)]
+    responses = await asyncio.gather(*[
+        api.post("/api/tickets/purchase", json={"competition_id": "comp_1", "quantity": 2, "ticket_numbers": [7, 8]}, headers=headers)
+        for _, headers in buyers
+    ])
+    assert sorted(r.status_code for r in responses) == [200] + [409] * 9
+    assert await db.orders.count_documents({}) == 1
+
+    core.local_cache.clear()
+    assert _bitmap_numbers((await api.get("/api/competitions/comp_1/tickets")).json()) == {7, 8}
+
+
+async def test_random_picks_avoid_claimed_numbers(api, db, make_user, make_competition):
+    await make_competition(competition_id="comp_1", total_tickets=10)
+    user, headers = await make_user()
+    chosen = await api.post("/api/tickets/purchase", json={"competition_id": "comp_1", "quantity": 5, "ticket_numbers": [1, 2, 3, 4, 5]}, headers=headers)
+    assert chosen.status_code == 200
+    rest = await api.post("/api/tickets/purchase", json={"competition_id": "comp_1", "quantity": 5}, headers=headers)
+    assert sorted(rest.json()["ticket_numbers"]) == [6, 7, 8, 9, 10]
+
+    bad = await api.post("/api/tickets/purchase", json={"competition_id": "comp_1", "quantity": 1, "ticket_numbers": [11]}, headers=headers)
+    assert bad.status_code == 400
+
+
+async def test_refund_releases_numbers_in_delta(api, db, make_user, make_competition):
+    await make_competition(competition_id="comp_1")
+    user, headers = await make_user()
+    admin, admin_headers = await make_user("admin")
+    version = (await api.get("/api/competitions/comp_1/tickets")).json()["version"]
+
+    order = (await api.post("/api/tickets/purchase", json={"competition_id": "comp_1", "quantity": 1, "ticket_numbers": [42]}, headers=headers)).json()
+    assert (await api.post(f"/api/orders/{order['order_id']}/confirm", headers=headers)).status_code == 200
+    assert (await api.post(f"/api/admin/orders/{order['order_id']}/refund", headers=admin_headers)).status_code == 200
+
+    core.local_cache.clear()
+    delta = (await api.get(f"/api/competitions/comp_1/tickets?since={version}")).json()
+    assert delta["claimed"] == [] and delta["released"] == [42]
+    assert "bitmap" not in delta
+
+    again = await api.post("/api/tickets/purchase", json={"competition_id": "comp_1", "quantity": 1, "ticket_numbers": [42]}, headers=headers)
+    assert again.status_code == 200
+
+
+async def test_abandoned_order_frees_its_numbers(api, db, make_user, make_competition):
+    await make_competition(competition_id="comp_1")
+    await db.competitions.update_one({"competition_id": "comp_1"}, {"$set": {"max_tickets_per_user": 1}})
+    user, headers = await make_user()
+    other, other_headers = await make_user()
+    purchase = {"competition_id": "comp_1", "quantity": 1, "ticket_numbers": [42]}
+    order = (await api.post("/api/tickets/purchase", json=purchase, headers=headers)).json()
+    assert (await api.post("/api/tickets/purchase", json=purchase, headers=other_headers)).status_code == 409
+
+    # Still within the hold: nothing expires
+    assert await order_holds.expire_orders(db, core.ORDER_HOLD) == []
+    later = datetime.now(timezone.utc) + core.ORDER_HOLD + timedelta(seconds=1)
+    expired = await order_holds.expire_orders(db, core.ORDER_HOLD, now=later)
+    assert [o["order_id"] for o in expired] == [order["order_id"]]
+    assert await order_holds.expire_orders(db, core.ORDER_HOLD, now=later) == []
+
+    assert (await db.orders.find_one({"order_id": order["order_id"]}))["payment_status"] == "expired"
+    assert (await db.entry_counts.find_one({"competition_id": "comp_1", "user_id": user["user_id"]}))["tickets"] == 0
+    assert (await api.post(f"/api/orders/{order['order_id']}/confirm", headers=headers)).status_code == 400
+    assert (await api.post("/api/tickets/purchase", json=purchase, headers=other_headers)).status_code == 200
+    # The abandoned order no longer counts against its buyer's cap either
+    retry = {"competition_id": "comp_1", "quantity": 1}
+    assert (await api.post("/api/tickets/purchase", json=retry, headers=headers)).status_code == 200
+
+
+async def test_cache_catches_up_from_change_log(db, make_competition):
+    await make_competition(competition_id="comp_1")
+    comp = await db.competitions.find_one({"competition_id": "comp_1"}, {"_id": 0})
+    cache = ticket_map.TicketMapCache(core.local_cache, refresh_interval=0)
+    first = await cache.get(db, comp)
+    assert await ticket_map.claim(db, "comp_1", [10, 20]) == 1
+    assert await ticket_map.claim(db, "comp_1", [20]) is None
+    await ticket_map.release(db, [{"competition_id": "comp_1", "ticket_numbers": [10]}])
+
+    current = await cache.get(db, comp)
+    assert current is first  # updated in place, not reloaded
+    assert current.version == 2 and current.taken() == {20}
@@ -0,0 +1,60 @@
+import random
+
+import bson
+import pytest
+
+from models import OrderResponse
+from migrations.order_tickets import migrate
+from tickets import decode_tickets, encode_tickets, order_tickets
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("numbers", [[], [7], [1, 2, 3, 4], [1, 300, 70000, 5_000_000]])
+def test_pack_round_trip(numbers):
+    assert decode_tickets(encode_tickets(numbers)) == numbers
+
+
+def test_pack_is_smaller_than_int_array():
+    numbers = sorted(random.sample(range(1, 100_001), 100))
+    legacy = len(bson.encode({"ticket_numbers": numbers}))
+    packed = len(bson.encode({"ticket_pack": encode_tickets(numbers)}))
+    assert packed * 3 < legacy
+
+
+def test_order_response_reads_both_formats():
+    base = {"order_id": "o", "user_id": "u", "competition_id": "c", "quantity": 2,
+            "total_price": 2.0, "payment_status": "completed", "created_at": "2026-01-01T00:00:00+00:00"}
+    assert OrderResponse(**base, ticket_numbers=[3, 9]).ticket_numbers == [3, 9]
+    assert OrderResponse(**base, ticket_pack=encode_tickets([3, 9])).ticket_numbers == [3, 9]
+
+
+async def test_migration_repacks_legacy_orders(db):
+    await db.orders.insert_many([
+        {"order_id": f"order_{i}", "ticket_numbers": [i * 10 + 1, i * 10 + 5]} for i in range(25)
+    ] + [{"order_id": "order_packed", "ticket_pack": encode_tickets([2])}])
+
+    stats = await migrate(db, batch_size=10)
+
+    assert stats["orders"] == 25
+    assert await db.orders.count_documents({"ticket_numbers": {"$exists": True}}) == 0
+    order = await db.orders.find_one({"order_id": "order_3"})
+    assert order_tickets(order) == [31, 35]
+    assert (await migrate(db, batch_size=10))["orders"] == 0
+
+
+async def test_draw_picks_from_mixed_formats(api, db, make_user):
+    admin, headers = await make_user("admin")
+    buyer, _ = await make_user()
+    await db.competitions.insert_one({"competition_id": "comp_1", "title": "Prize", "prize_value": 10})
+    await db.orders.insert_many([
+        {"order_id": "order_a", "user_id": buyer["user_id"], "competition_id": "comp_1", "quantity": 2,
+         "ticket_numbers": [4, 8], "payment_status": "completed"},
+        {"order_id": "order_b", "user_id": buyer["user_id"], "competition_id": "comp_1", "quantity": 3,
+         "ticket_pack": encode_tickets([1, 2, 3]), "payment_status": "completed"},
+    ])
+
+    response = await api.post("/api/admin/competitions/comp_1/draw", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["winner"]["winning_ticket"] in {1, 2, 3, 4, 8}
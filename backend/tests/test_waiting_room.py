@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from routers import queue
+from waiting_room import ConcurrencyLimiter, Overloaded, WaitingRoom, read_token, sign_token
+
+pytestmark = pytest.mark.anyio
+
+
+def test_tokens_are_signed():
+    token = sign_token("secret", {"c": "comp_1", "s": 10})
+    assert read_token("secret", token) == {"c": "comp_1", "s": 10}
+    assert read_token("other", token) is None
+    body, _, signature = token.partition(".")
+    forged = sign_token("secret", {"c": "comp_1", "s": 0}).partition(".")[0]
+    assert read_token("secret", f"{forged}.{signature}") is None
+    assert read_token("secret", "garbage") is None
+    assert read_token("secret", f"{token}é") is None
+
+
+def test_status_counts_down_to_admission():
+    room = WaitingRoom("secret", admission_window=60)
+    token = sign_token("secret", {"c": "comp_1", "u": "user_1", "s": 1000.0, "r": 5})
+    waiting = room.status(token, "comp_1", now=990.0)
+    assert waiting["position"] == 50 and waiting["eta_seconds"] == 10 and not waiting["admitted"]
+    assert room.status(token, "comp_1", now=1000.0)["admitted"]
+    late = room.status(token, "comp_1", now=1061.0)
+    assert late["expired"] and not late["admitted"]
+    assert room.status(token, "comp_2") is None
+    assert room.status(token, "comp_1", user_id="user_2") is None
+
+
+async def test_limiter_sheds_beyond_waiting_room():
+    limiter = ConcurrencyLimiter(limit=2, max_waiting=3, wait_timeout=5)
+    release = asyncio.Event()
+    outcomes = []
+
+    async def buyer():
+        try:
+            async with limiter.slot("comp_1"):
+                await release.wait()
+            outcomes.append("served")
+        except Overloaded as e:
+            outcomes.append(e.retry_after)
+
+    tasks = [asyncio.create_task(buyer()) for _ in range(8)]
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.gather(*tasks)
+    assert outcomes.count("served") == 5
+    assert all(retry >= 1 for retry in outcomes if retry != "served")
+    assert not limiter._keys  # state is dropped once the rush is over
+
+
+async def test_join_then_purchase(api, db, make_user, make_competition):
+    await make_competition(competition_id="comp_1", queue_rate=10)
+    user, headers = await make_user()
+    purchase = {"competition_id": "comp_1", "quantity": 1}
+    assert (await api.post("/api/tickets/purchase", json=purchase, headers=headers)).status_code == 403
+
+    joined = await api.post("/api/queue/comp_1/join", headers=headers)
+    assert joined.status_code == 200 and joined.json()["admitted"]  # within the burst
+    token = joined.json()["token"]
+    polled = await api.get("/api/queue/comp_1", headers={"X-Queue-Token": token})
+    assert polled.json()["admitted"]
+    assert (await api.get("/api/queue/comp_1", headers={"X-Queue-Token": token + "0"})).status_code == 400
+
+    response = await api.post("/api/tickets/purchase", json=purchase, headers={**headers, "X-Queue-Token": token})
+    assert response.status_code == 200
+
+
+async def test_joins_beyond_max_wait_are_shed(api, db, make_user, make_competition, monkeypatch):
+    await make_competition(competition_id="comp_1", queue_rate=1)
+    monkeypatch.setattr(queue, "waiting_room", WaitingRoom("secret", burst=0, max_wait=2))
+    buyers = [(await make_user())[1] for _ in range(5)]
+    slots = [(await api.post("/api/queue/comp_1/join", headers=headers)) for headers in buyers]
+    assert [r.status_code for r in slots[:3]] == [200, 200, 200]
+    assert [r.json()["position"] for r in slots[:3]] == [1, 2, 3]
+    assert slots[3].status_code == 503 and int(slots[3].headers["Retry-After"]) >= 1
+
+    await make_competition(competition_id="comp_2")
+    assert (await api.post("/api/queue/comp_2/join", headers=buyers[0])).status_code == 400
+
+
+async def test_repeat_joins_return_the_same_slot(api, db, make_user, make_competition, monkeypatch):
+    await make_competition(competition_id="comp_1", queue_rate=1)
+    monkeypatch.setattr(queue, "waiting_room", WaitingRoom("secret", burst=0, max_wait=60))
+    user, headers = await make_user()
+    joins = await asyncio.gather(*[api.post("/api/queue/comp_1/join", headers=headers) for _ in range(5)])
+    assert len({r.json()["token"] for r in joins}) == 1
+    again = await api.post("/api/queue/comp_1/join", headers=headers)
+    assert again.json()["token"] == joins[0].json()["token"]
+    assert await db.queue_slots.count_documents({}) == 1
+    other, other_headers = await make_user()
+    assert (await api.post("/api/queue/comp_1/join", headers=other_headers)).json()["token"] != again.json()["token"]
+
+
+async def test_concurrent_joins_respect_max_wait(db):
+    room = WaitingRoom("secret", burst=0, max_wait=4)
+
+    async def join(user_id):
+        try:
+            return await room.join(db, "comp_1", 1, user_id)
+        except Overloaded:
+            return None
+
+    joined = await asyncio.gather(*[join(f"user_{i}") for i in range(20)])
+    admitted = [j for j in joined if j is not None]
+    assert len(admitted) == 5
+    assert sorted(j["position"] for j in admitted) == [1, 2, 3, 4, 5]
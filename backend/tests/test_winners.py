@@ -0,0 +1,89 @@
+import asyncio
+import base64
+import json
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def _winner(i: int, drawn_at: str, prize_value: float = 100) -> dict:
+    return {
+        "winner_id": f"win_{i:03d}", "competition_id": f"comp_{i}", "competition_title": f"Prize {i}",
+        "user_id": "user_1", "user_name": "Winner", "winning_ticket": i, "prize_value": prize_value,
+        "drawn_at": drawn_at
+    }
+
+
+async def test_feed_pages_through_every_winner_once(api, db):
+    # Pairs share a drawn_at, so pages have to break ties on winner_id
+    await db.winners.insert_many([_winner(i, f"2026-0{1 + i // 2}-01T00:00:00+00:00") for i in range(7)])
+    seen, cursor = [], None
+    for _ in range(10):
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = (await api.get("/api/winners/feed", params=params)).json()
+        seen += [w["winner_id"] for w in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [f"win_{i:03d}" for i in (6, 5, 4, 3, 2, 1, 0)]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(json.dumps(1).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps(["2026-01-01", "win_1", "extra"]).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps({"a": 1, "b": 2}).encode()).decode(),
+    base64.urlsafe_b64encode(json.dumps([1, 2]).encode()).decode(),
+])
+async def test_feed_rejects_malformed_cursors(api, db, cursor):
+    response = await api.get("/api/winners/feed", params={"cursor": cursor})
+    assert response.status_code == 400
+
+
+async def test_stats_are_kept_up_to_date_by_draws(api, db, make_user, make_competition):
+    admin, headers = await make_user("admin")
+    now = datetime.now(timezone.utc)
+    await db.winners.insert_many([
+        _winner(1, "2020-01-01T00:00:00+00:00", prize_value=500),
+        _winner(2, now.isoformat(), prize_value=250),
+    ])
+    stats = (await api.get("/api/winners/stats")).json()  # built from winners the first time
+    assert (stats["total_winners"], stats["total_prize_value"]) == (2, 750)
+    assert (stats["winners_this_month"], stats["prize_value_this_month"]) == (1, 250)
+
+    await make_competition(competition_id="comp_draw", prize_value=1000, total_tickets=10, tickets_sold=1,
+                           draw_date=now - timedelta(days=1))
+    await db.orders.insert_one({
+        "order_id": "order_1", "user_id": admin["user_id"], "competition_id": "comp_draw", "quantity": 1,
+        "ticket_numbers": [4], "total_price": 1.0, "payment_status": "completed", "created_at": now.isoformat()
+    })
+    assert (await api.post("/api/admin/competitions/comp_draw/draw", headers=headers)).status_code == 200
+
+    stats = (await api.get("/api/winners/stats")).json()
+    assert (stats["total_winners"], stats["total_prize_value"]) == (3, 1750)
+    assert (stats["winners_this_month"], stats["prize_value_this_month"]) == (2, 1250)
+    newest = (await api.get("/api/winners/feed", params={"limit": 1})).json()["items"][0]
+    assert newest["competition_id"] == "comp_draw"
+
+
+async def test_concurrent_draws_record_one_winner(api, db, make_user, make_competition):
+    admin, headers = await make_user("admin")
+    now = datetime.now(timezone.utc)
+    await make_competition(competition_id="comp_draw", prize_value=1000, total_tickets=10, tickets_sold=2,
+                           draw_date=now - timedelta(days=1))
+    await db.orders.insert_many([{
+        "order_id": f"order_{i}", "user_id": admin["user_id"], "competition_id": "comp_draw", "quantity": 1,
+        "ticket_numbers": [i + 1], "total_price": 1.0, "payment_status": "completed", "created_at": now.isoformat()
+    } for i in range(2)])
+    await api.get("/api/winners/stats")
+
+    responses = await asyncio.gather(*[
+        api.post("/api/admin/competitions/comp_draw/draw", headers=headers) for _ in range(5)
+    ])
+    assert sorted(r.status_code for r in responses) == [200, 400, 400, 400, 400]
+    assert await db.winners.count_documents({"competition_id": "comp_draw"}) == 1
+    stats = (await api.get("/api/winners/stats")).json()
+    assert (stats["total_winners"], stats["total_prize_value"]) == (1, 1000)
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+import core
+from write_buffer import BufferFull, WriteBehindBuffer
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_flushes_on_size_and_on_stop(db):
+    buffer = WriteBehindBuffer("contacts", max_batch=10, flush_interval=60)
+    buffer.start(db)
+    try:
+        for i in range(25):
+            await buffer.add({"contact_id": f"contact_{i}"})
+        for _ in range(40):
+            if await db.contacts.count_documents({}) >= 20:
+                break
+            await asyncio.sleep(0.05)
+        # Two full batches went out; the remainder waits for the interval
+        assert await db.contacts.count_documents({}) == 20
+    finally:
+        await buffer.stop()
+    assert await db.contacts.count_documents({}) == 25
+
+
+async def test_backpressure_when_full(db):
+    buffer = WriteBehindBuffer("contacts", max_batch=100, max_pending=2, backpressure_timeout=0.05)
+    buffer.db = db  # not started, so nothing drains
+    await buffer.add({"n": 1})
+    await buffer.add({"n": 2})
+    with pytest.raises(BufferFull):
+        await buffer.add({"n": 3})
+    await buffer.stop()
+    assert await db.contacts.count_documents({}) == 2
+
+
+async def test_admin_actions_are_audited(api, db, make_user, monkeypatch):
+    writer = WriteBehindBuffer("audit_log")
+    monkeypatch.setattr(core, "audit_writer", writer)
+    writer.start(db)
+    admin, headers = await make_user("admin")
+    user, _ = await make_user()
+    response = await api.put(f"/api/admin/users/{user['user_id']}/role", params={"role": "admin"}, headers=headers)
+    assert response.status_code == 200
+    await writer.stop()
+    event = await db.audit_log.find_one({"action": "user.role"})
+    assert event["admin_id"] == admin["user_id"]
+    assert event["target"] == user["user_id"]
+    assert event["details"] == {"role": "admin"}
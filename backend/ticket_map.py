@@ -0,0 +1,245 @@
+"""Which ticket numbers are taken, kept as one bitmap per competition.
+
+``ticket_maps`` has a document per competition (``_id`` is the competition
+id) with ``words``, Int64 bit words where ticket n is bit (n - 1) % 64 of
+word (n - 1) // 64, a ``version`` and ``changes``, the numbers claimed or
+released by the last CHANGE_LOG updates. A claim is one conditional update
+that only matches while every requested bit is clear (``$bitsAllClear``)
+and sets them with ``$bit``, so two orders can never hold the same number.
+The same write bumps the version and logs the change. Numbers stay taken
+while their order is pending, failed or completed (entry_caps.HELD_STATUSES)
+and are released on refund, or when an unpaid order's hold expires
+(``order_holds``).
+
+Readers never scan orders. ``TicketMapCache`` keeps each map in the local
+cache, and once it is older than ``refresh_interval`` compares versions and
+replays just the missing changes. A competition's map is built from its
+orders the first time it is needed, for competitions that predate it.
+"""
+from typing import Dict, Iterable, List, Optional
+import base64
+import time
+import zlib
+
+from bson import Int64
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from cache import LocalCache
+from entry_caps import HELD_STATUSES
+from tickets import TICKET_PROJECTION, order_tickets
+
+# Changes kept per map; clients (and workers) further behind get the full map
+CHANGE_LOG = 64
+
+_WORD_MASK = (1 << 64) - 1
+
+
+def word_count(total_tickets: int) -> int:
+    return max(1, (total_tickets + 63) // 64)
+
+
+def _to_int64(word: int) -> Int64:
+    """Unsigned 64-bit word as the signed value BSON stores"""
+    return Int64(word - (1 << 64) if word >= 1 << 63 else word)
+
+
+def _bit_positions(numbers: Iterable[int]) -> Dict[int, List[int]]:
+    """Word index -> bit positions of the given ticket numbers"""
+    positions = {}
+    for number in numbers:
+        positions.setdefault((number - 1) // 64, []).append((number - 1) % 64)
+    return positions
+
+
+def _mask(bits: List[int]) -> int:
+    return sum(1 << bit for bit in set(bits))
+
+
+class TicketMap:
+    """Taken numbers of one competition at a version: bit n - 1 (least significant first) is ticket n"""
+
+    def __init__(self, competition_id: str, total_tickets: int, version: int, bits: bytearray, changes: list):
+        self.competition_id = competition_id
+        self.total_tickets = total_tickets
+        self.version = version
+        self.bits = bits
+        # (version, claimed, released) for the most recent updates, oldest first
+        self.changes = changes
+        self.checked_at = time.monotonic()
+        self._payload = None
+
+    @classmethod
+    def from_doc(cls, doc: dict, total_tickets: int) -> "TicketMap":
+        raw = b"".join((word & _WORD_MASK).to_bytes(8, "little") for word in doc["words"])
+        bits = bytearray(raw[:(total_tickets + 7) // 8].ljust((total_tickets + 7) // 8, b"\0"))
+        first = doc["version"] - len(doc["changes"]) + 1
+        changes = [
+            (first + i, change.get("claimed", []), change.get("released", []))
+            for i, change in enumerate(doc["changes"])
+        ]
+        return cls(doc["_id"], total_tickets, doc["version"], bits, changes)
+
+    def __contains__(self, number: int) -> bool:
+        index = number - 1
+        return 0 <= index < len(self.bits) * 8 and bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+    def taken(self) -> set:
+        return {
+            byte_index * 8 + bit + 1
+            for byte_index, byte in enumerate(self.bits) if byte
+            for bit in range(8) if byte >> bit & 1
+        }
+
+    def apply(self, version: int, claimed: List[int] = (), released: List[int] = ()):
+        for number in released:
+            if 0 < number <= len(self.bits) * 8:
+                self.bits[(number - 1) >> 3] &= ~(1 << ((number - 1) & 7)) & 0xFF
+        for number in claimed:
+            if 0 < number <= len(self.bits) * 8:
+                self.bits[(number - 1) >> 3] |= 1 << ((number - 1) & 7)
+        self.version = version
+        self.changes = (self.changes + [(version, list(claimed), list(released))])[-CHANGE_LOG:]
+
+    def payload(self) -> dict:
+        """The whole map, zlib-compressed and base64-encoded; built once per version"""
+        if self._payload is None or self._payload["version"] != self.version:
+            self._payload = {
+                "competition_id": self.competition_id,
+                "version": self.version,
+                "total_tickets": self.total_tickets,
+                "taken": int.from_bytes(self.bits, "little").bit_count(),
+                "bitmap": base64.b64encode(zlib.compress(bytes(self.bits), 6)).decode(),
+            }
+        return self._payload
+
+    def delta(self, since: int) -> Optional[dict]:
+        """Numbers whose state changed after version ``since``; None if the log doesn't reach back that far"""
+        if since > self.version or (since < self.version and (not self.changes or self.changes[0][0] > since + 1)):
+            return None
+        touched = set()
+        for version, claimed, released in self.changes:
+            if version > since:
+                touched.update(claimed)
+                touched.update(released)
+        return {
+            "competition_id": self.competition_id,
+            "version": self.version,
+            "claimed": sorted(n for n in touched if n in self),
+            "released": sorted(n for n in touched if n not in self),
+        }
+
+
+async def build(db, comp: dict):
+    """Create the map from the competition's held orders, or grow it after total_tickets went up"""
+    competition_id = comp["competition_id"]
+    words = word_count(comp["total_tickets"])
+    existing = await db.ticket_maps.find_one({"_id": competition_id}, {"size": 1})
+    if existing is not None:
+        if existing["size"] < words:
+            await db.ticket_maps.update_one(
+                {"_id": competition_id, "size": existing["size"]},
+                {"$push": {"words": {"$each": [Int64(0)] * (words - existing["size"])}}, "$set": {"size": words}}
+            )
+        return
+    orders = await db.orders.find(
+        {"competition_id": competition_id, "payment_status": {"$in": HELD_STATUSES}}, {"_id": 0, **TICKET_PROJECTION}
+    ).to_list(None)
+    values = [0] * words
+    for order in orders:
+        for word, bits in _bit_positions(n for n in order_tickets(order) if 0 < n <= words * 64).items():
+            values[word] |= _mask(bits)
+    try:
+        await db.ticket_maps.insert_one({
+            "_id": competition_id, "words": [_to_int64(v) for v in values], "size": words, "version": 0, "changes": []
+        })
+    except DuplicateKeyError:
+        pass  # another request built it first
+
+
+async def claim(db, competition_id: str, numbers: List[int]) -> Optional[int]:
+    """Take all of the numbers or none of them; the map's new version, or None if any was taken"""
+    positions = _bit_positions(numbers)
+    doc = await db.ticket_maps.find_one_and_update(
+        {"_id": competition_id, **{f"words.{word}": {"$bitsAllClear": bits} for word, bits in positions.items()}},
+        {
+            "$bit": {f"words.{word}": {"or": _to_int64(_mask(bits))} for word, bits in positions.items()},
+            "$inc": {"version": 1},
+            "$push": {"changes": {"$each": [{"claimed": numbers}], "$slice": -CHANGE_LOG}},
+        },
+        projection={"_id": 0, "version": 1}, return_document=ReturnDocument.AFTER
+    )
+    return doc["version"] if doc else None
+
+
+async def release(db, orders: List[dict]):
+    """Free the numbers of orders that no longer hold them"""
+    for order in orders:
+        numbers = order_tickets(order)
+        if not numbers:
+            continue
+        positions = _bit_positions(numbers)
+        await db.ticket_maps.update_one({"_id": order["competition_id"]}, {
+            "$bit": {f"words.{word}": {"and": _to_int64(~_mask(bits) & _WORD_MASK)} for word, bits in positions.items()},
+            "$inc": {"version": 1},
+            "$push": {"changes": {"$each": [{"released": numbers}], "$slice": -CHANGE_LOG}},
+        })
+
+
+class TicketMapCache:
+    """Per-worker copies of the maps, caught up from the change log"""
+
+    NAMESPACE = "ticket_maps"
+    TTL = 3600  # entries are revalidated by version; the TTL only bounds memory for finished competitions
+
+    def __init__(self, cache: LocalCache, refresh_interval: float = 1.0):
+        self.cache = cache
+        self.refresh_interval = refresh_interval
+
+    async def get(self, db, comp: dict, max_age: Optional[float] = None) -> TicketMap:
+        """The competition's map, at most ``max_age`` (default refresh_interval) seconds behind"""
+        ticket_map = self.cache.get(self.NAMESPACE, comp["competition_id"])
+        if ticket_map is None or ticket_map.total_tickets != comp["total_tickets"]:
+            return await self._load(db, comp)
+        if time.monotonic() - ticket_map.checked_at >= (self.refresh_interval if max_age is None else max_age):
+            if not await self._catch_up(db, ticket_map):
+                return await self._load(db, comp)
+        return ticket_map
+
+    def claimed(self, competition_id: str, numbers: List[int], version: int):
+        """Apply this worker's own claim without waiting for the next refresh"""
+        ticket_map = self.cache.get(self.NAMESPACE, competition_id)
+        if ticket_map is not None and ticket_map.version == version - 1:
+            ticket_map.apply(version, claimed=numbers)
+
+    async def _load(self, db, comp: dict) -> TicketMap:
+        doc = await db.ticket_maps.find_one({"_id": comp["competition_id"]})
+        if doc is None or doc["size"] < word_count(comp["total_tickets"]):
+            await build(db, comp)
+            doc = await db.ticket_maps.find_one({"_id": comp["competition_id"]})
+        ticket_map = TicketMap.from_doc(doc, comp["total_tickets"])
+        self.cache.set(self.NAMESPACE, comp["competition_id"], ticket_map, self.TTL)
+        return ticket_map
+
+    async def _catch_up(self, db, ticket_map: TicketMap) -> bool:
+        """Replay changes newer than the cached version; False if the map has to be reloaded"""
+        current = await db.ticket_maps.find_one({"_id": ticket_map.competition_id}, {"_id": 0, "version": 1})
+        if current is None or current["version"] < ticket_map.version:
+            return False  # rebuilt or removed since we loaded it
+        behind = current["version"] - ticket_map.version
+        if behind > CHANGE_LOG:
+            return False
+        if behind:
+            # A little extra in case more updates land between the two reads
+            doc = await db.ticket_maps.find_one(
+                {"_id": ticket_map.competition_id}, {"_id": 0, "version": 1, "changes": {"$slice": -min(behind + 8, CHANGE_LOG)}}
+            )
+            changes = doc["changes"]
+            first = doc["version"] - len(changes) + 1
+            if first > ticket_map.version + 1:
+                return False
+            for version, change in enumerate(changes, start=first):
+                if version > ticket_map.version:
+                    ticket_map.apply(version, change.get("claimed", []), change.get("released", []))
+        ticket_map.checked_at = time.monotonic()
+        return True
@@ -0,0 +1,56 @@
+"""Compact ticket number storage for orders.
+
+Orders used to store ``ticket_numbers`` as a BSON int array, which costs
+about 8 bytes per ticket (type byte, array index key, int32). New orders
+store ``ticket_pack`` instead: the sorted numbers as gaps from the previous
+number, packed into a fixed-width array. The first byte is the array
+typecode (``B``, ``H`` or ``I``), chosen from the largest gap, followed by
+the little-endian values. A random 100-ticket order in a 100k-ticket
+competition packs into about 200 bytes.
+
+Fixed widths keep decoding in C (``array.frombytes`` plus ``accumulate``),
+so reading a packed order is as fast as reading the int array. Readers
+should call ``order_tickets``, which accepts either format.
+"""
+from array import array
+from itertools import accumulate
+from typing import Iterable, List
+import sys
+
+from bson import Binary
+
+PACK_FIELD = "ticket_pack"
+LEGACY_FIELD = "ticket_numbers"
+
+# Both fields, for projections that only need tickets
+TICKET_PROJECTION = {PACK_FIELD: 1, LEGACY_FIELD: 1}
+
+_TYPECODES = (("B", 0xFF), ("H", 0xFFFF), ("I", 0xFFFFFFFF))
+
+
+def encode_tickets(numbers: Iterable[int]) -> Binary:
+    numbers = sorted(numbers)
+    gaps = [number - previous for previous, number in zip([0] + numbers, numbers)]
+    largest = max(gaps, default=0)
+    typecode = next(code for code, limit in _TYPECODES if largest <= limit)
+    packed = array(typecode, gaps)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return Binary(typecode.encode() + packed.tobytes())
+
+
+def decode_tickets(data: bytes) -> List[int]:
+    if not data:
+        return []
+    packed = array(chr(data[0]))
+    packed.frombytes(bytes(data[1:]))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return list(accumulate(packed))
+
+
+def order_tickets(order: dict) -> List[int]:
+    """Ticket numbers of an order in either storage format"""
+    if PACK_FIELD in order:
+        return decode_tickets(order[PACK_FIELD])
+    return order.get(LEGACY_FIELD, [])
@@ -0,0 +1,174 @@
+"""Admission control for launch rushes.
+
+Competitions with a ``queue_rate`` (buyers admitted per second) put buyers
+through a virtual waiting room before they can purchase. Joining reserves
+the next admission slot on the competition's ``waiting_rooms`` document in
+two updates: ``$max`` pulls ``next_slot`` up to now minus the burst
+allowance, so an idle room admits straight away, then ``$inc`` moves it on
+by 1 / queue_rate and returns the caller's slot. The ``$inc`` only matches
+while ``next_slot`` is within ``max_wait`` of now, so concurrent joins can't
+all slip past the limit. Each buyer holds at most one slot per competition
+(``queue_slots``); joining again returns it until it expires. The caller
+gets an HMAC-signed token carrying the slot, so polling for position and
+ETA, and checking admission at purchase time, need no database access. A
+token admits its holder for ``admission_window`` seconds after its slot.
+
+Load is shed with 503 and Retry-After in two places: joins that would wait
+longer than ``max_wait``, and purchases once this worker already has
+``ConcurrencyLimiter.limit`` purchases for the competition in flight and
+``max_waiting`` more queued behind them. Together they bound the purchase
+work that reaches Mongo however big the rush is.
+"""
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import math
+import time
+
+from pymongo import ReturnDocument
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Overloaded, retry after {retry_after:.0f}s")
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def sign_token(secret: str, claims: dict) -> str:
+    body = base64.urlsafe_b64encode(json.dumps(claims, separators=(",", ":")).encode()).decode().rstrip("=")
+    return body + "." + hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+
+
+def read_token(secret: str, token: str) -> Optional[dict]:
+    """The token's claims, or None if it is malformed or the signature doesn't match"""
+    body, _, signature = token.strip().partition(".")
+    expected = hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+    # Bytes, since compare_digest rejects str with non-ASCII characters
+    if not hmac.compare_digest(expected.encode(), signature.encode()):
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+    except ValueError:
+        return None
+
+
+class WaitingRoom:
+    def __init__(self, secret: str, burst: int = 20, max_wait: float = 1800, admission_window: float = 600):
+        self.secret = secret
+        self.burst = burst  # buyers admitted at once when the room is idle
+        self.max_wait = max_wait
+        self.admission_window = admission_window
+
+    async def ensure_indexes(self, db):
+        await db.queue_slots.create_index("expires_at", expireAfterSeconds=0)
+
+    async def join(self, db, competition_id: str, rate: float, user_id: str) -> dict:
+        """The user's slot, reserving the next one if they don't hold one yet; Overloaded if the wait is too long"""
+        now = time.time()
+        key = f"{competition_id}:{user_id}"
+        held = await db.queue_slots.find_one({"_id": key})
+        if held and now > held["slot"] + self.admission_window:
+            # The TTL monitor only runs once a minute
+            await db.queue_slots.delete_one({"_id": key, "slot": held["slot"]})
+            held = None
+        if held is None:
+            slot = await self._reserve(db, competition_id, rate, now)
+            # Concurrent joins by the same user all get whichever slot was stored first
+            held = await db.queue_slots.find_one_and_update(
+                {"_id": key},
+                {"$setOnInsert": {
+                    "slot": slot,
+                    "rate": rate,
+                    "expires_at": datetime.fromtimestamp(slot + self.admission_window, timezone.utc)
+                }},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+        token = sign_token(self.secret, {"c": competition_id, "u": user_id, "s": held["slot"], "r": held["rate"]})
+        return {"token": token, **self.status(token, competition_id, user_id, now=now)}
+
+    async def _reserve(self, db, competition_id: str, rate: float, now: float) -> float:
+        interval = 1 / rate
+        room = await db.waiting_rooms.find_one_and_update(
+            {"_id": competition_id}, {"$max": {"next_slot": now - self.burst * interval}},
+            projection={"next_slot": 1}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        reserved = await db.waiting_rooms.find_one_and_update(
+            {"_id": competition_id, "next_slot": {"$lte": now + self.max_wait}},
+            {"$inc": {"next_slot": interval, "joined": 1}},
+            projection={"next_slot": 1}, return_document=ReturnDocument.AFTER
+        )
+        if reserved is None:
+            raise Overloaded(room["next_slot"] - now - self.max_wait)
+        return reserved["next_slot"]
+
+    def status(self, token: str, competition_id: str, user_id: Optional[str] = None,
+               now: Optional[float] = None) -> Optional[dict]:
+        """Position and ETA for a token; None if it isn't valid for this competition (and user)"""
+        claims = read_token(self.secret, token)
+        if not claims or claims.get("c") != competition_id or (user_id and claims.get("u") != user_id):
+            return None
+        now = time.time() if now is None else now
+        wait = claims["s"] - now
+        return {
+            "competition_id": competition_id,
+            "admitted": wait <= 0 and now <= claims["s"] + self.admission_window,
+            "expired": now > claims["s"] + self.admission_window,
+            # Slots are 1 / rate apart, so the wait says how many buyers are still ahead
+            "position": max(0, math.ceil(wait * claims["r"])),
+            "eta_seconds": max(0, round(wait, 1)),
+        }
+
+    def admits(self, tokens: Optional[str], competition_id: str, user_id: str) -> bool:
+        """Whether any of the comma-separated tokens admits the user to the competition now"""
+        for token in (tokens or "").split(","):
+            state = self.status(token, competition_id, user_id)
+            if state and state["admitted"]:
+                return True
+        return False
+
+
+class ConcurrencyLimiter:
+    """At most ``limit`` holders per key on this worker, with at most ``max_waiting`` queued behind them"""
+
+    def __init__(self, limit: int = 8, max_waiting: int = 64, wait_timeout: float = 5):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._keys: Dict[str, dict] = {}
+        self._hold_time = 0.05  # moving average of seconds per holder, for Retry-After
+
+    def _retry_after(self, waiting: int) -> float:
+        return (waiting + 1) / self.limit * self._hold_time
+
+    @asynccontextmanager
+    async def slot(self, key: str):
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = {"semaphore": asyncio.Semaphore(self.limit), "waiting": 0, "users": 0}
+        # Counted here rather than from the semaphore, whose acquire wait_for may not have started yet
+        if state["users"] >= self.limit + self.max_waiting:
+            raise Overloaded(self._retry_after(self.max_waiting))
+        state["users"] += 1
+        try:
+            state["waiting"] += 1
+            try:
+                await asyncio.wait_for(state["semaphore"].acquire(), self.wait_timeout)
+            except asyncio.TimeoutError:
+                raise Overloaded(self._retry_after(state["waiting"]))
+            finally:
+                state["waiting"] -= 1
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                state["semaphore"].release()
+                self._hold_time += (time.monotonic() - started - self._hold_time) * 0.1
+        finally:
+            state["users"] -= 1
+            if not state["users"]:
+                del self._keys[key]
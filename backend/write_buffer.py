@@ -0,0 +1,120 @@
+"""Write-behind buffering for low-priority inserts.
+
+Contact messages and admin audit events don't need to be durable before
+the response goes out. ``WriteBehindBuffer`` collects them in memory and
+writes them with one ``insert_many`` when ``max_batch`` documents are
+waiting or ``flush_interval`` seconds have passed, so bursts of these writes
+use one connection briefly instead of one per request.
+
+A crash loses at most what is buffered: no more than ``max_pending``
+documents, normally no older than ``flush_interval`` seconds (longer only
+while Mongo is failing and batches are being retried). When ``max_pending``
+documents are waiting, ``add`` waits up to ``backpressure_timeout`` for a
+flush to make room and then raises ``BufferFull``. ``stop`` flushes what is
+left.
+"""
+from typing import List, Optional
+import asyncio
+import logging
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    pass
+
+
+class WriteBehindBuffer:
+    def __init__(self, collection: str, max_batch: int = 500, flush_interval: float = 1.0,
+                 max_pending: int = 10000, backpressure_timeout: float = 5.0):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.backpressure_timeout = backpressure_timeout
+        self.db = None
+        self.written = 0
+        self.dropped = 0
+        self._pending: List[dict] = []
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def start(self, db):
+        self.db = db
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.db is not None:
+            while self._pending:
+                if not await self.flush():
+                    logger.error(f"Lost {len(self._pending)} buffered {self.collection} writes on shutdown")
+                    self.dropped += len(self._pending)
+                    self._pending = []
+
+    async def add(self, doc: dict):
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+            self._space.clear()
+            try:
+                await asyncio.wait_for(self._space.wait(), timeout=self.backpressure_timeout)
+            except asyncio.TimeoutError:
+                raise BufferFull(f"{self.collection} write buffer is full")
+        self._pending.append(doc)
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Write one batch; returns False if Mongo failed and the batch was kept"""
+        async with self._flush_lock:
+            batch = self._pending[:self.max_batch]
+            if not batch:
+                return True
+            try:
+                await self.db[self.collection].insert_many(batch, ordered=False)
+                self.written += len(batch)
+            except BulkWriteError as e:
+                # Unordered: everything except the reported documents was written
+                errors = e.details.get("writeErrors", [])
+                logger.error(f"Dropped {len(errors)} {self.collection} writes: {errors[0].get('errmsg') if errors else e}")
+                self.written += len(batch) - len(errors)
+                self.dropped += len(errors)
+            except PyMongoError as e:
+                logger.error(f"Buffered {self.collection} write failed, will retry: {e}")
+                return False
+            # Adds made during the insert were appended after the batch
+            del self._pending[:len(batch)]
+            self._space.set()
+            return True
+
+    async def _run(self):
+        backoff = self.flush_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                if not await self.flush():
+                    backoff = min(backoff * 2, 30)
+                    break
+                backoff = self.flush_interval
+                if len(self._pending) < self.max_batch:
+                    break